@@ -1,4 +1,5 @@
 import os
+import click
 from flask import Flask, render_template, redirect, url_for, flash, request, session, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -6,7 +7,8 @@ from datetime import datetime, timedelta
 from functools import wraps
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.sql import func
-from sqlalchemy import text
+from sqlalchemy import text, and_, null
+from sqlalchemy.orm import deferred, undefer
 import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
@@ -16,18 +18,24 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-for-dev')
-# app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{os.environ.get('DB_USER')}:{os.environ.get('DB_PASSWORD')}@{os.environ.get('DB_HOST')}/{os.environ.get('DB_NAME')}"
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-        f"mssql+pyodbc://"
-        f"{os.environ.get('AZURE_SQL_USERNAME')}:"
-        f"{os.environ.get('AZURE_SQL_PASSWORD')}@"
-        f"{os.environ.get('AZURE_SQL_SERVER')}/"
-        f"{os.environ.get('AZURE_SQL_DATABASE')}"
-        "?driver=ODBC+Driver+18+for+SQL+Server"
-        "&Encrypt=yes"
-        "&TrustServerCertificate=no"
-    )
+# Bounded connection pool, shared with the ML pipeline writer (see ml_pipeline/db_pool.py)
+from ml_pipeline.db_pool import pool_settings, configure_pool, database_dialect
+if database_dialect() == 'mysql':
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{os.environ.get('DB_USER')}:{os.environ.get('DB_PASSWORD')}@{os.environ.get('DB_HOST')}/{os.environ.get('DB_NAME')}"
+else:
+    app.config['SQLALCHEMY_DATABASE_URI'] = (
+            f"mssql+pyodbc://"
+            f"{os.environ.get('AZURE_SQL_USERNAME')}:"
+            f"{os.environ.get('AZURE_SQL_PASSWORD')}@"
+            f"{os.environ.get('AZURE_SQL_SERVER')}/"
+            f"{os.environ.get('AZURE_SQL_DATABASE')}"
+            "?driver=ODBC+Driver+18+for+SQL+Server"
+            "&Encrypt=yes"
+            "&TrustServerCertificate=no"
+        )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+from ml_pipeline.response_cache import cached_response
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_settings()
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=1)
 
 # Add now() function to Jinja2 environment as a global
@@ -60,10 +68,31 @@ app.jinja_env.globals['timedelta'] = timedelta
 # Initialize SQLAlchemy
 db = SQLAlchemy(app)
 
-# Helper function for date filtering in SQL Server
+# Let the ML pipeline draw its connections from the app's engine pool
+with app.app_context():
+    configure_pool(db.engine)
+
+# Date filtering on timestamp columns. The predicates compare the bare
+# column against a half-open range, so the (plant_id, timestamp) indexes can
+# seek on them, unlike CAST(timestamp AS DATE) = :date.
+def date_range_filter(column, start_date, end_date):
+    """
+    Rows whose timestamp falls on start_date up to, not including, end_date
+
+    Args:
+        column: Timestamp column
+        start_date (date): First day
+        end_date (date): Day after the last one
+
+    Returns:
+        Boolean clause: column >= start_date AND column < end_date
+    """
+    return and_(column >= datetime.combine(start_date, datetime.min.time()),
+                column < datetime.combine(end_date, datetime.min.time()))
+
 def date_filter(column, date_value):
-    """Helper function to create date filtering for SQL Server compatibility"""
-    return func.cast(column, db.Date) == date_value
+    """Rows whose timestamp falls on the given day"""
+    return date_range_filter(column, date_value, date_value + timedelta(days=1))
 
 # Database configuration
 DB_CONFIG = {
@@ -132,21 +161,64 @@ class HourlySolarPrediction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     plant_id = db.Column(db.Integer, db.ForeignKey('plants.id', ondelete='CASCADE'), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False)
-    weather_data = db.Column(db.JSON, nullable=False)
+    # Weather values as JSON text, or NULL under WEATHER_STORAGE=columns
+    weather_data = db.Column(db.JSON, nullable=True)
+    # Typed weather values (WEATHER_STORAGE=columns/both, see ml_pipeline.aggregate_daily),
+    # deferred so databases without migration 005 can still load rows
+    weather_wind_speed = deferred(db.Column(db.REAL, nullable=True))
+    weather_sunshine = deferred(db.Column(db.REAL, nullable=True))
+    weather_air_pressure = deferred(db.Column(db.REAL, nullable=True))
+    weather_radiation = deferred(db.Column(db.REAL, nullable=True))
+    weather_air_temperature = deferred(db.Column(db.REAL, nullable=True))
+    weather_relative_humidity = deferred(db.Column(db.REAL, nullable=True))
     predicted_generation = db.Column(db.Float, nullable=True)
+    # P10/P50/P90 of the forest's per-tree predictions (FORECAST_QUANTILES).
+    # Deferred, so databases without migration 001 can still load rows
+    predicted_p10 = deferred(db.Column(db.Float, nullable=True))
+    predicted_p50 = deferred(db.Column(db.Float, nullable=True))
+    predicted_p90 = deferred(db.Column(db.Float, nullable=True))
+    # Fingerprint of the forecast inputs the prediction was made from
+    # (REFRESH_SKIP_UNCHANGED); deferred like the bands, for migration 002
+    input_hash = deferred(db.Column(db.BigInteger, nullable=True))
     actual_generation = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # One row per plant and hour; the pipeline upserts on this key
+    __table_args__ = (db.UniqueConstraint('plant_id', 'timestamp', name='uq_hourly_solar_plant_timestamp'),
+                      db.Index('idx_hourly_solar_timestamp', 'timestamp'))
+
 class HourlyWindPrediction(db.Model):
     __tablename__ = 'hourly_wind_predictions'
     id = db.Column(db.Integer, primary_key=True)
     plant_id = db.Column(db.Integer, db.ForeignKey('plants.id', ondelete='CASCADE'), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False)
-    weather_data = db.Column(db.JSON, nullable=False)
+    # Weather values as JSON text, or NULL under WEATHER_STORAGE=columns
+    weather_data = db.Column(db.JSON, nullable=True)
+    # Typed weather values (WEATHER_STORAGE=columns/both, see ml_pipeline.aggregate_daily),
+    # deferred so databases without migration 005 can still load rows
+    weather_wind_speed = deferred(db.Column(db.REAL, nullable=True))
+    weather_temperature = deferred(db.Column(db.REAL, nullable=True))
+    weather_relative_humidity = deferred(db.Column(db.REAL, nullable=True))
+    weather_pressure = deferred(db.Column(db.REAL, nullable=True))
+    weather_gust = deferred(db.Column(db.REAL, nullable=True))
+    weather_wind_dir_dev = deferred(db.Column(db.REAL, nullable=True))
+    weather_precipitation = deferred(db.Column(db.REAL, nullable=True))
     predicted_generation = db.Column(db.Float, nullable=True)
+    # P10/P50/P90 of the forest's per-tree predictions (FORECAST_QUANTILES).
+    # Deferred, so databases without migration 001 can still load rows
+    predicted_p10 = deferred(db.Column(db.Float, nullable=True))
+    predicted_p50 = deferred(db.Column(db.Float, nullable=True))
+    predicted_p90 = deferred(db.Column(db.Float, nullable=True))
+    # Fingerprint of the forecast inputs the prediction was made from
+    # (REFRESH_SKIP_UNCHANGED); deferred like the bands, for migration 002
+    input_hash = deferred(db.Column(db.BigInteger, nullable=True))
     actual_generation = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # One row per plant and hour; the pipeline upserts on this key
+    __table_args__ = (db.UniqueConstraint('plant_id', 'timestamp', name='uq_hourly_wind_plant_timestamp'),
+                      db.Index('idx_hourly_wind_timestamp', 'timestamp'))
+
 class DailySolarPrediction(db.Model):
     __tablename__ = 'daily_solar_predictions'
     id = db.Column(db.Integer, primary_key=True)
@@ -158,6 +230,14 @@ class DailySolarPrediction(db.Model):
     recommendation_message = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.UniqueConstraint('plant_id', 'date', name='uq_daily_solar_plant_date'),)
+
+class ForecastDate(db.Model):
+    """Dates with hourly predictions per plant type, kept by the pipeline writer"""
+    __tablename__ = 'forecast_dates'
+    plant_type = db.Column(db.String(10), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+
 class DailyWindPrediction(db.Model):
     __tablename__ = 'daily_wind_predictions'
     id = db.Column(db.Integer, primary_key=True)
@@ -169,6 +249,8 @@ class DailyWindPrediction(db.Model):
     recommendation_message = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.UniqueConstraint('plant_id', 'date', name='uq_daily_wind_plant_date'),)
+
 # Initialize LoginManager
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -495,12 +577,20 @@ def dashboard():
                 'message': recommendation.recommendation_message or 'Energy generation below threshold'
             })
             
-        # Get available dates for hourly data selection
-        available_dates = db.session.query(
-            func.cast(HourlySolarPrediction.timestamp, db.Date).label('date')
-        ).distinct().order_by(
-            func.cast(HourlySolarPrediction.timestamp, db.Date).desc()
-        ).limit(7).all()
+        # Get available dates for hourly data selection, from the small
+        # forecast_dates index rather than a DISTINCT over every hourly row
+        # once it is kept (migration 003)
+        from ml_pipeline.aggregate_daily import forecast_dates_index
+        if forecast_dates_index():
+            available_dates = db.session.query(ForecastDate.date).filter(
+                ForecastDate.plant_type == 'solar'
+            ).order_by(ForecastDate.date.desc()).limit(7).all()
+        else:
+            available_dates = db.session.query(
+                func.cast(HourlySolarPrediction.timestamp, db.Date).label('date')
+            ).distinct().order_by(
+                func.cast(HourlySolarPrediction.timestamp, db.Date).desc()
+            ).limit(7).all()
         
         date_options = [date[0].strftime('%Y-%m-%d') for date in available_dates]
         
@@ -749,6 +839,7 @@ def register_plant():
         
         db.session.add(new_plant)
         db.session.commit()
+        _invalidate_chart_data(plant_type)
         
         flash(f'Plant "{plant_name}" registered successfully!', 'success')
         
@@ -762,6 +853,36 @@ def register_plant():
     
     return render_template('register_plant.html')
 
+def _fleet_plants(plant_types):
+    """Snapshot plants as plain dicts for the refresh orchestrator"""
+    plants = Plant.query.filter(Plant.type.in_(plant_types)).all()
+    return [_plant_payload(plant) for plant in plants]
+
+def _plant_payload(plant):
+    """Plain dict of the plant fields the refresh pipeline needs"""
+    return {
+        'id': plant.id,
+        'type': plant.type,
+        'location': plant.location,
+        'threshold_value': plant.threshold_value
+    }
+
+def _enqueue_refresh(plants, plant_types, dedupe_key):
+    """Queue a forecast refresh job for the given plant dicts and return its id"""
+    from ml_pipeline.jobs import enqueue
+
+    return enqueue('refresh_forecasts', {
+        'plants': plants,
+        'plant_types': list(plant_types),
+        'requested_by': current_user.id
+    }, dedupe_key=dedupe_key)
+
+def _queue_and_flash(plant_types, label):
+    """Queue a fleet refresh and flash where to follow its progress"""
+    job_id = _enqueue_refresh(_fleet_plants(plant_types), plant_types, f"fleet:{','.join(plant_types)}")
+    flash(f'{label} refresh queued (job {job_id}). Progress: {url_for("job_status", job_id=job_id)}', 'info')
+    return job_id
+
 @app.route('/update_solar_forecasts')
 @login_required
 @admin_required
@@ -769,40 +890,8 @@ def update_solar_forecasts():
     """Route to update solar forecasts for all solar plants"""
     try:
         print("=== Starting update_solar_forecasts route ===")
-        # Import ML pipeline modules - ensure app context is passed along
-        from ml_pipeline.fetch_weather import fetch_weather_data
-        from ml_pipeline.predict_hourly import predict_hourly_generation
-        from ml_pipeline.aggregate_daily import aggregate_daily_generation, filter_daylight_hours, save_predictions_to_db
-        
-        # Get all solar plants
-        solar_plants = Plant.query.filter_by(type='solar').all()
-        print(f"Found {len(solar_plants)} solar plants")
-        
-        for plant in solar_plants:
-            print(f"Processing plant: {plant.name} (ID: {plant.id})")
-            # Fetch weather data with plant location
-            weather_data = fetch_weather_data(location=plant.location)
-            print(f"Fetched {len(weather_data)} weather records for plant {plant.id}")
-            
-            # Predict hourly generation
-            hourly_predictions = predict_hourly_generation(weather_data, "solar", plant.id)
-            print(f"Generated {len(hourly_predictions)} hourly predictions for plant {plant.id}")
-            
-            # Filter to daylight hours for solar predictions
-            filtered_predictions = filter_daylight_hours(hourly_predictions)
-            print(f"Filtered to {len(filtered_predictions)} daylight hour predictions for plant {plant.id}")
-            
-            # Aggregate to daily predictions
-            daily_predictions = aggregate_daily_generation(filtered_predictions, plant.threshold_value)
-            print(f"Aggregated to {len(daily_predictions)} daily predictions for plant {plant.id}")
-            
-            # Save to database with direct MySQL connection
-            print(f"Saving predictions to database for plant {plant.id}...")
-            save_predictions_to_db(hourly_predictions, daily_predictions, plant.id, None, "solar")
-            print(f"Database update completed for plant {plant.id}")
-        
-        flash('Solar forecasts updated successfully', 'success')
-        print("=== Completed update_solar_forecasts route ===")
+        _queue_and_flash(('solar',), 'Solar forecasts')
+        print("=== Queued update_solar_forecasts job ===")
     except Exception as e:
         print(f"Error updating solar forecasts: {str(e)}")
         import traceback
@@ -811,79 +900,16 @@ def update_solar_forecasts():
     
     return redirect(url_for('dashboard'))
 
+
 @app.route('/update_forecasts')
 @login_required
 @admin_required
 def update_forecasts():
     """Route to update both solar and wind forecasts"""
     try:
-        # Update solar forecasts
         print("=== Starting update of all forecasts ===")
-        print("=== Updating solar forecasts ===")
-        
-        # Import solar ML pipeline modules
-        from ml_pipeline.fetch_weather import fetch_weather_data
-        from ml_pipeline.predict_hourly import predict_hourly_generation
-        from ml_pipeline.aggregate_daily import aggregate_daily_generation, filter_daylight_hours, save_predictions_to_db
-        
-        # Get all solar plants
-        solar_plants = Plant.query.filter_by(type='solar').all()
-        print(f"Found {len(solar_plants)} solar plants")
-        
-        for plant in solar_plants:
-            print(f"Processing solar plant: {plant.name} (ID: {plant.id})")
-            # Fetch weather data with plant location
-            weather_data = fetch_weather_data(location=plant.location)
-            print(f"Fetched {len(weather_data)} weather records for plant {plant.id}")
-            
-            # Predict hourly generation
-            hourly_predictions = predict_hourly_generation(weather_data, "solar", plant.id)
-            print(f"Generated {len(hourly_predictions)} hourly predictions for plant {plant.id}")
-            
-            # Filter to daylight hours for solar predictions
-            filtered_predictions = filter_daylight_hours(hourly_predictions)
-            print(f"Filtered to {len(filtered_predictions)} daylight hour predictions for plant {plant.id}")
-            
-            # Aggregate to daily predictions
-            daily_predictions = aggregate_daily_generation(filtered_predictions, plant.threshold_value)
-            print(f"Aggregated to {len(daily_predictions)} daily predictions for plant {plant.id}")
-            
-            # Save to database with direct MySQL connection
-            print(f"Saving predictions to database for plant {plant.id}...")
-            save_predictions_to_db(hourly_predictions, daily_predictions, plant.id, None, "solar")
-            print(f"Database update completed for plant {plant.id}")
-            
-        # Update wind forecasts
-        print("=== Updating wind forecasts ===")
-        
-        # Import wind ML pipeline modules
-        from ml_pipeline.fetch_weather import fetch_wind_weather_data
-        
-        # Get all wind plants
-        wind_plants = Plant.query.filter_by(type='wind').all()
-        print(f"Found {len(wind_plants)} wind plants")
-        
-        for plant in wind_plants:
-            print(f"Processing wind plant: {plant.name} (ID: {plant.id})")
-            # Fetch wind weather data with plant location
-            weather_data = fetch_wind_weather_data(location=plant.location)
-            print(f"Fetched {len(weather_data)} wind weather records for plant {plant.id}")
-            
-            # Predict hourly generation
-            hourly_predictions = predict_hourly_generation(weather_data, "wind", plant.id)
-            print(f"Generated {len(hourly_predictions)} hourly predictions for plant {plant.id}")
-            
-            # Aggregate to daily predictions
-            daily_predictions = aggregate_daily_generation(hourly_predictions, plant.threshold_value)
-            print(f"Aggregated to {len(daily_predictions)} daily predictions for plant {plant.id}")
-            
-            # Save to database
-            print(f"Saving predictions to database for plant {plant.id}...")
-            save_predictions_to_db(hourly_predictions, daily_predictions, plant.id, None, "wind")
-            print(f"Database update completed for plant {plant.id}")
-        
-        flash('All forecasts updated successfully', 'success')
-        print("=== Completed update of all forecasts ===")
+        _queue_and_flash(('solar', 'wind'), 'All forecasts')
+        print("=== Queued update of all forecasts ===")
     except Exception as e:
         print(f"Error updating forecasts: {str(e)}")
         import traceback
@@ -892,6 +918,7 @@ def update_forecasts():
     
     return redirect(url_for('dashboard'))
 
+
 @app.route('/user_profile', methods=['GET', 'POST'])
 @login_required
 def user_profile():
@@ -936,9 +963,52 @@ def user_profile():
     
     return render_template('user_profile.html', user=current_user)
 
+def _quantile_options(prediction):
+    """
+    Query options loading the (deferred) band columns of an hourly prediction
+    model with its rows; none while FORECAST_QUANTILES is off, as the columns
+    exist only once its migration has run
+    """
+    from ml_pipeline.predict_hourly import forecast_quantiles
+    if not forecast_quantiles():
+        return []
+    return [undefer(prediction.predicted_p10), undefer(prediction.predicted_p50),
+            undefer(prediction.predicted_p90)]
+
+def _quantile_bands(hourly_predictions):
+    """
+    P10/P50/P90 generation bands of hourly predictions for the chart APIs,
+    with None where a band was not predicted (every band while
+    FORECAST_QUANTILES is off; the columns are not read then)
+    """
+    from ml_pipeline.predict_hourly import forecast_quantiles
+    if not forecast_quantiles():
+        return {band: [None] * len(hourly_predictions) for band in ('p10', 'p50', 'p90')}
+    return {
+        band: [round(float(value), 2) if value is not None else None
+               for value in (getattr(pred, f'predicted_{band}') for pred in hourly_predictions)]
+        for band in ('p10', 'p50', 'p90')
+    }
+
+def _chart_cache_key():
+    """
+    Response cache key of a chart data request: the endpoint, plant, the
+    caller's role and plant type (admins can ask for 'all', the plant type
+    gates access), the query arguments and today's date for the "upcoming
+    days" queries. cached_response adds the user id.
+    """
+    return (request.endpoint, request.args.get('plant_id', current_user.plant_id), current_user.role,
+            current_user.plant_type, tuple(sorted(request.args.items(multi=True))), datetime.utcnow().date())
+
+def _invalidate_chart_data(plant_type):
+    # Thresholds and plant lists feed the chart responses too
+    from ml_pipeline.response_cache import invalidate
+    invalidate(plant_type)
+
 # Add routes for chart data
 @app.route('/api/solar_chart_data')
 @login_required
+@cached_response('solar', _chart_cache_key)
 def solar_chart_data():
     """API endpoint for solar generation chart data"""
     if current_user.plant_type != 'solar' and current_user.role != 'admin':
@@ -1025,26 +1095,14 @@ def refresh_wind_data():
                 'message': 'Plant not found'
             })
         
-        # Import required modules
-        from ml_pipeline.fetch_weather import fetch_wind_weather_data
-        from ml_pipeline.predict_hourly import predict_hourly_generation
-        from ml_pipeline.aggregate_daily import aggregate_daily_generation, save_predictions_to_db
-        
-        # Get weather forecast for wind
-        weather_data = fetch_wind_weather_data(plant.location)
-        
-        # Predict hourly generation
-        hourly_predictions = predict_hourly_generation(weather_data, "wind", plant.id)
-        
-        # Aggregate to daily
-        daily_predictions = aggregate_daily_generation(hourly_predictions, plant.threshold_value)
-        
-        # Save to database
-        save_predictions_to_db(hourly_predictions, daily_predictions, plant.id, db, "wind")
+        # Run the pipeline in a background job worker
+        job_id = _enqueue_refresh([_plant_payload(plant)], ('wind',), f"plant:{plant.id}")
         
         return jsonify({
             'success': True,
-            'message': 'Wind power forecasts updated successfully'
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id),
+            'message': 'Wind power forecast refresh queued'
         })
         
     except Exception as e:
@@ -1058,6 +1116,7 @@ def refresh_wind_data():
 
 @app.route('/api/wind_chart_data')
 @login_required
+@cached_response('wind', _chart_cache_key)
 def wind_chart_data():
     """API endpoint to get wind chart data for the user's plant"""
     plant_id = request.args.get('plant_id', default=current_user.plant_id, type=int)
@@ -1111,6 +1170,7 @@ def wind_chart_data():
 
 @app.route('/api/hourly_wind_data')
 @login_required
+@cached_response('wind', _chart_cache_key)
 def hourly_wind_data():
     """API endpoint to get hourly wind prediction data for a specific date"""
     plant_id = request.args.get('plant_id', default=current_user.plant_id, type=int)
@@ -1134,7 +1194,7 @@ def hourly_wind_data():
         hourly_predictions = HourlyWindPrediction.query.filter(
             HourlyWindPrediction.plant_id == plant_id,
             date_filter(HourlyWindPrediction.timestamp, date_obj)
-        ).order_by(HourlyWindPrediction.timestamp).all()
+        ).options(*_quantile_options(HourlyWindPrediction)).order_by(HourlyWindPrediction.timestamp).all()
         
         # Format the data for the chart
         hours = []
@@ -1151,7 +1211,8 @@ def hourly_wind_data():
             'date': date_str,
             'hours': hours,
             'predictions': prediction_values,
-            'actuals': actual_values
+            'actuals': actual_values,
+            **_quantile_bands(hourly_predictions)
         })
         
     except Exception as e:
@@ -1186,14 +1247,17 @@ def plant_profile():
                 plant.location = location
                 plant.threshold_value = float(threshold_value)
                 db.session.commit()
+                _invalidate_chart_data(plant.type)
                 flash('Plant updated successfully', 'success')
         
         elif action == 'delete':
             plant_id = request.form.get('plant_id')
             plant = Plant.query.get(plant_id)
             if plant:
+                plant_type = plant.type
                 db.session.delete(plant)
                 db.session.commit()
+                _invalidate_chart_data(plant_type)
                 flash('Plant deleted successfully', 'success')
         
         return redirect(url_for('plant_profile'))
@@ -1338,12 +1402,6 @@ def refresh_solar_data():
         
         print(f"Processing refresh for user: {current_user.username}, plant ID: {plant_id}")
         
-        # Import ML pipeline modules - ensure app instance is available
-        from ml_pipeline.fetch_weather import fetch_weather_data
-        from ml_pipeline.predict_hourly import predict_hourly_generation
-        from ml_pipeline.aggregate_daily import aggregate_daily_generation, filter_daylight_hours, save_predictions_to_db
-        
-        # Fetch weather data with plant location
         plant = Plant.query.get(plant_id)
         if not plant:
             print(f"Error: Plant with ID {plant_id} not found")
@@ -1354,31 +1412,15 @@ def refresh_solar_data():
         
         print(f"Found plant: {plant.name} (Type: {plant.type}, Location: {plant.location})")
         
-        print(f"Fetching weather data for location: {plant.location}")
-        weather_data = fetch_weather_data(location=plant.location)
-        print(f"Fetched {len(weather_data)} weather records")
-        
-        # Predict hourly generation
-        print("Generating hourly predictions...")
-        hourly_predictions = predict_hourly_generation(weather_data, "solar", plant_id)
-        print(f"Generated {len(hourly_predictions)} hourly predictions")
-        
-        # Filter to daylight hours for solar predictions
-        filtered_predictions = filter_daylight_hours(hourly_predictions)
-        print(f"Filtered to {len(filtered_predictions)} daylight hour predictions")
-        
-        # Aggregate to daily predictions
-        daily_predictions = aggregate_daily_generation(filtered_predictions, plant.threshold_value)
-        print(f"Aggregated to {len(daily_predictions)} daily predictions")
-        
-        # Save to database with direct MySQL connection
-        print("Saving predictions to database...")
-        save_predictions_to_db(hourly_predictions, daily_predictions, plant_id, None, "solar") 
-        print("Database update completed")
+        # Run the pipeline in a background job worker
+        job_id = _enqueue_refresh([_plant_payload(plant)], ('solar',), f"plant:{plant.id}")
+        print(f"Queued solar refresh job {job_id} for plant {plant.id}")
         
         return jsonify({
             'success': True,
-            'message': "Solar data refreshed successfully"
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id),
+            'message': "Solar data refresh queued"
         })
     except Exception as e:
         print(f"Error refreshing solar data: {str(e)}")
@@ -1391,6 +1433,7 @@ def refresh_solar_data():
 
 @app.route('/api/hourly_solar_data', methods=['GET', 'POST'])
 @login_required
+@cached_response('solar', _chart_cache_key)
 def hourly_solar_data():
     """API endpoint to get hourly solar prediction data for a specific date"""
     plant_id = request.args.get('plant_id', default=current_user.plant_id, type=int)
@@ -1414,7 +1457,7 @@ def hourly_solar_data():
         hourly_predictions = HourlySolarPrediction.query.filter(
             HourlySolarPrediction.plant_id == plant_id,
             date_filter(HourlySolarPrediction.timestamp, date_obj)
-        ).order_by(HourlySolarPrediction.timestamp).all()
+        ).options(*_quantile_options(HourlySolarPrediction)).order_by(HourlySolarPrediction.timestamp).all()
         
         # Format the data for the chart
         hours = []
@@ -1446,7 +1489,8 @@ def hourly_solar_data():
             'date': date_str,
             'hours': hours,
             'predictions': prediction_values,
-            'actuals': actual_values
+            'actuals': actual_values,
+            **_quantile_bands(hourly_predictions)
         })
         
     except Exception as e:
@@ -1465,36 +1509,8 @@ def update_wind_forecasts():
     """Route to update wind forecasts for all wind plants"""
     try:
         print("=== Starting update_wind_forecasts route ===")
-        # Import ML pipeline modules
-        from ml_pipeline.fetch_weather import fetch_wind_weather_data
-        from ml_pipeline.predict_hourly import predict_hourly_generation
-        from ml_pipeline.aggregate_daily import aggregate_daily_generation, save_predictions_to_db
-        
-        # Get all wind plants
-        wind_plants = Plant.query.filter_by(type='wind').all()
-        print(f"Found {len(wind_plants)} wind plants")
-        
-        for plant in wind_plants:
-            print(f"Processing plant: {plant.name} (ID: {plant.id})")
-            # Fetch wind weather data with plant location
-            weather_data = fetch_wind_weather_data(location=plant.location)
-            print(f"Fetched {len(weather_data)} wind weather records for plant {plant.id}")
-            
-            # Predict hourly generation
-            hourly_predictions = predict_hourly_generation(weather_data, "wind", plant.id)
-            print(f"Generated {len(hourly_predictions)} hourly predictions for plant {plant.id}")
-            
-            # Aggregate to daily predictions
-            daily_predictions = aggregate_daily_generation(hourly_predictions, plant.threshold_value)
-            print(f"Aggregated to {len(daily_predictions)} daily predictions for plant {plant.id}")
-            
-            # Save to database
-            print(f"Saving predictions to database for plant {plant.id}...")
-            save_predictions_to_db(hourly_predictions, daily_predictions, plant.id, None, "wind")
-            print(f"Database update completed for plant {plant.id}")
-        
-        flash('Wind forecasts updated successfully', 'success')
-        print("=== Completed update_wind_forecasts route ===")
+        _queue_and_flash(('wind',), 'Wind forecasts')
+        print("=== Queued update_wind_forecasts job ===")
     except Exception as e:
         print(f"Error updating wind forecasts: {str(e)}")
         import traceback
@@ -1503,6 +1519,50 @@ def update_wind_forecasts():
     
     return redirect(url_for('dashboard'))
 
+
+# Hours shown by the admin hourly charts for a date without predictions
+ADMIN_FALLBACK_HOURS = {'solar': range(6, 19), 'wind': range(0, 24)}
+
+def _admin_hourly_pivot(rows):
+    """
+    Pivot hourly prediction rows (plant_id, plant_name, timestamp, predicted,
+    actual, p10, p50, p90) into the admin hourly chart layout: every plant's
+    arrays run over the same hours, with null for hours the plant has no
+    prediction for, and the totals add up each hour across plants.
+    """
+    import numpy as np
+    from ml_pipeline.aggregate_daily import pivot_hourly
+
+    plant_ids, plant_names, timestamps, *columns = zip(*rows)
+    value_names = ['predicted', 'actual', 'p10', 'p50', 'p90']
+    values = {name: np.array(column, dtype=float) for name, column in zip(value_names, columns)}
+    hours, plants, present, matrices = pivot_hourly(plant_ids, timestamps, values)
+
+    # A stored NULL generation counts as 0, a missing hour stays null
+    for name in ('predicted', 'actual'):
+        matrices[name] = np.where(present, np.nan_to_num(matrices[name]), np.nan)
+    # Bands are per plant only: quantiles do not add up across plants
+    for name in ('p10', 'p50', 'p90'):
+        matrices[name] = np.round(matrices[name], 2)
+
+    # One list per plant and value, from the transposed matrices
+    per_plant = {name: [[None if value != value else value for value in column]
+                        for column in matrices[name].T.tolist()]
+                 for name in value_names}
+    names = dict(zip(plant_ids, plant_names))
+    plant_data = {
+        names[plant_id]: {name: per_plant[name][index] for name in value_names}
+        for index, plant_id in enumerate(plants.tolist())
+    }
+
+    return {
+        'hours': [f"{hour:%H:%M}" for hour in hours.astype('datetime64[us]').tolist()],
+        'plant_names': list(plant_data),
+        'plant_data': plant_data,
+        'total_predicted': np.round(np.nansum(matrices['predicted'], axis=1), 2).tolist(),
+        'total_actual': np.round(np.nansum(matrices['actual'], axis=1), 2).tolist()
+    }
+
 @app.route('/api/admin_hourly_data')
 @login_required
 @admin_required
@@ -1519,195 +1579,74 @@ def admin_hourly_data():
         # Default to today if no date provided
         date_str = datetime.utcnow().date().strftime('%Y-%m-%d')
     
+    if energy_type not in ADMIN_FALLBACK_HOURS:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid energy type: {energy_type}'
+        })
+    
     try:
         # Parse the date string
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         
-        if energy_type == 'solar':
-            # Get hourly solar predictions for the specified date for all plants
-            query = db.session.query(
-                HourlySolarPrediction,
-                Plant.name.label('plant_name')
-            ).join(Plant).filter(
-                date_filter(HourlySolarPrediction.timestamp, date_obj)
-            )
-            
-            # Filter by plant_id if specified
-            if plant_id != 'all':
-                try:
-                    plant_id = int(plant_id)
-                    query = query.filter(Plant.id == plant_id)
-                except ValueError:
-                    return jsonify({'success': False, 'message': 'Invalid plant ID format'}), 400
-                
-            hourly_data = query.order_by(HourlySolarPrediction.timestamp, Plant.name).all()
-            
-            # Group data by hour for all plants
-            hours = []
-            grouped_data = {}
-            
-            # Check if we have data
-            if not hourly_data:
-                print(f"No solar hourly data found for date {date_str} and plant {plant_id}")
-                # Return fallback data
-                current_hour = datetime.now().hour
-                fallback_hours = [(datetime.strptime(f"{date_str} {h:02d}:00", '%Y-%m-%d %H:%M')).strftime('%H:%M') for h in range(6, 19)]  # 6am to 6pm
-                
-                return jsonify({
-                    'success': True,
-                    'type': 'solar',
-                    'date': date_str,
-                    'hours': fallback_hours,
-                    'plant_names': ['No Data'],
-                    'plant_data': {'No Data': {'predicted': [0] * len(fallback_hours), 'actual': [0] * len(fallback_hours)}},
-                    'total_predicted': [0] * len(fallback_hours),
-                    'total_actual': [0] * len(fallback_hours),
-                    'message': 'No data available for the selected date and plant'
-                })
-            
-            for prediction, plant_name in hourly_data:
-                hour = prediction.timestamp.strftime('%H:%M')
-                
-                if hour not in hours:
-                    hours.append(hour)
-                
-                if plant_name not in grouped_data:
-                    grouped_data[plant_name] = {
-                        'predicted': [],
-                        'actual': []
-                    }
-                
-                grouped_data[plant_name]['predicted'].append(float(prediction.predicted_generation) if prediction.predicted_generation else 0)
-                grouped_data[plant_name]['actual'].append(float(prediction.actual_generation) if prediction.actual_generation else 0)
-            
-            # Get plant names array
-            plant_names = list(grouped_data.keys())
-            
-            # Get total predicted and actual for each hour
-            total_predicted = []
-            total_actual = []
-            
-            for hour_idx in range(len(hours)):
-                hour_predicted = 0
-                hour_actual = 0
-                
-                for plant in plant_names:
-                    if hour_idx < len(grouped_data[plant]['predicted']):
-                        hour_predicted += grouped_data[plant]['predicted'][hour_idx]
-                    
-                    if hour_idx < len(grouped_data[plant]['actual']):
-                        hour_actual += grouped_data[plant]['actual'][hour_idx]
-                
-                total_predicted.append(round(hour_predicted, 2))
-                total_actual.append(round(hour_actual, 2))
-            
-            return jsonify({
-                'success': True,
-                'type': 'solar',
-                'date': date_str,
-                'hours': hours,
-                'plant_names': plant_names,
-                'plant_data': grouped_data,
-                'total_predicted': total_predicted,
-                'total_actual': total_actual
-            })
-            
-        elif energy_type == 'wind':
-            # Get hourly wind predictions for the specified date for all plants
-            query = db.session.query(
-                HourlyWindPrediction,
-                Plant.name.label('plant_name')
-            ).join(Plant).filter(
-                date_filter(HourlyWindPrediction.timestamp, date_obj)
-            )
-            
-            # Filter by plant_id if specified
-            if plant_id != 'all':
-                try:
-                    plant_id = int(plant_id)
-                    query = query.filter(Plant.id == plant_id)
-                except ValueError:
-                    return jsonify({'success': False, 'message': 'Invalid plant ID format'}), 400
-                
-            hourly_data = query.order_by(HourlyWindPrediction.timestamp, Plant.name).all()
-            
-            # Group data by hour for all plants
-            hours = []
-            grouped_data = {}
-            
-            # Check if we have data
-            if not hourly_data:
-                print(f"No wind hourly data found for date {date_str} and plant {plant_id}")
-                # Return fallback data - wind data is usually available for all 24 hours
-                fallback_hours = [(datetime.strptime(f"{date_str} {h:02d}:00", '%Y-%m-%d %H:%M')).strftime('%H:%M') for h in range(0, 24)]
-                
-                return jsonify({
-                    'success': True,
-                    'type': 'wind',
-                    'date': date_str,
-                    'hours': fallback_hours,
-                    'plant_names': ['No Data'],
-                    'plant_data': {'No Data': {'predicted': [0] * len(fallback_hours), 'actual': [0] * len(fallback_hours)}},
-                    'total_predicted': [0] * len(fallback_hours),
-                    'total_actual': [0] * len(fallback_hours),
-                    'message': 'No data available for the selected date and plant'
-                })
-            
-            for prediction, plant_name in hourly_data:
-                hour = prediction.timestamp.strftime('%H:%M')
-                
-                if hour not in hours:
-                    hours.append(hour)
-                
-                if plant_name not in grouped_data:
-                    grouped_data[plant_name] = {
-                        'predicted': [],
-                        'actual': []
-                    }
-                
-                grouped_data[plant_name]['predicted'].append(float(prediction.predicted_generation) if prediction.predicted_generation else 0)
-                grouped_data[plant_name]['actual'].append(float(prediction.actual_generation) if prediction.actual_generation else 0)
-            
-            # Get plant names array
-            plant_names = list(grouped_data.keys())
-            
-            # Get total predicted and actual for each hour
-            total_predicted = []
-            total_actual = []
-            
-            for hour_idx in range(len(hours)):
-                hour_predicted = 0
-                hour_actual = 0
-                
-                for plant in plant_names:
-                    if hour_idx < len(grouped_data[plant]['predicted']):
-                        hour_predicted += grouped_data[plant]['predicted'][hour_idx]
-                    
-                    if hour_idx < len(grouped_data[plant]['actual']):
-                        hour_actual += grouped_data[plant]['actual'][hour_idx]
-                
-                total_predicted.append(round(hour_predicted, 2))
-                total_actual.append(round(hour_actual, 2))
+        # Only the columns the chart needs; no ORM objects per row
+        prediction = HourlySolarPrediction if energy_type == 'solar' else HourlyWindPrediction
+        # The band columns exist only once FORECAST_QUANTILES' migration has run
+        from ml_pipeline.predict_hourly import forecast_quantiles
+        if forecast_quantiles():
+            bands = [prediction.predicted_p10, prediction.predicted_p50, prediction.predicted_p90]
+        else:
+            bands = [null(), null(), null()]
+        query = db.session.query(
+            prediction.plant_id,
+            Plant.name,
+            prediction.timestamp,
+            prediction.predicted_generation,
+            prediction.actual_generation,
+            *bands
+        ).join(Plant, Plant.id == prediction.plant_id).filter(
+            date_filter(prediction.timestamp, date_obj)
+        )
+        
+        # Filter by plant_id if specified
+        if plant_id != 'all':
+            try:
+                plant_id = int(plant_id)
+                query = query.filter(Plant.id == plant_id)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid plant ID format'}), 400
             
-            # Debug log to check data structure before sending response
-            print(f"Wind hourly data response: hours={len(hours)}, plants={len(plant_names)}, data points={len(total_predicted)}")
+        # Plants in name order; for duplicate hours the newest row comes last and wins
+        hourly_data = query.order_by(Plant.name, prediction.plant_id, prediction.timestamp, prediction.id).all()
+        
+        # Check if we have data
+        if not hourly_data:
+            print(f"No {energy_type} hourly data found for date {date_str} and plant {plant_id}")
+            # Return fallback data
+            fallback_hours = [f"{h:02d}:00" for h in ADMIN_FALLBACK_HOURS[energy_type]]
             
             return jsonify({
                 'success': True,
-                'type': 'wind',
+                'type': energy_type,
                 'date': date_str,
-                'hours': hours,
-                'plant_names': plant_names,
-                'plant_data': grouped_data,
-                'total_predicted': total_predicted,
-                'total_actual': total_actual
+                'hours': fallback_hours,
+                'plant_names': ['No Data'],
+                'plant_data': {'No Data': {'predicted': [0] * len(fallback_hours), 'actual': [0] * len(fallback_hours)}},
+                'total_predicted': [0] * len(fallback_hours),
+                'total_actual': [0] * len(fallback_hours),
+                'message': 'No data available for the selected date and plant'
             })
         
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'Invalid energy type: {energy_type}'
-            })
+        pivot = _admin_hourly_pivot(hourly_data)
+        print(f"{energy_type.capitalize()} hourly data response: hours={len(pivot['hours'])}, "
+              f"plants={len(pivot['plant_names'])}")
+        
+        return jsonify({
+            'success': True,
+            'type': energy_type,
+            'date': date_str,
+            **pivot
+        })
         
     except Exception as e:
         print(f"Error fetching admin hourly data: {str(e)}")
@@ -1998,6 +1937,147 @@ def wind_recommendation():
                           future_date=future_date,
                           time_period=time_period)
 
+@app.route('/api/model_stats')
+@login_required
+@admin_required
+def model_stats():
+    """API endpoint reporting load time and memory of the forecasting models"""
+    from ml_pipeline.model_registry import model_stats as registry_stats
+
+    return jsonify({
+        'success': True,
+        'models': registry_stats()
+    })
+
+@app.route('/api/db_pool_stats')
+@login_required
+@admin_required
+def db_pool_stats():
+    """API endpoint reporting database pool usage and checkout/wait times"""
+    from ml_pipeline.db_pool import pool_stats
+
+    return jsonify({
+        'success': True,
+        'pool': pool_stats()
+    })
+
+@app.route('/api/weather_cache_stats')
+@login_required
+@admin_required
+def weather_cache_stats():
+    """API endpoint reporting weather cache hit/miss counters"""
+    from ml_pipeline.weather_cache import cache_stats
+
+    return jsonify({
+        'success': True,
+        'cache': cache_stats()
+    })
+
+@app.route('/api/response_cache_stats')
+@login_required
+@admin_required
+def response_cache_stats():
+    """API endpoint reporting chart response cache hit ratio and hit/miss latency"""
+    from ml_pipeline.response_cache import cache_stats
+
+    return jsonify({
+        'success': True,
+        'cache': cache_stats()
+    })
+
+@app.route('/api/refresh_forecasts', methods=['POST'])
+@login_required
+@admin_required
+def refresh_forecasts_api():
+    """API endpoint queueing a fleet refresh; poll the returned status_url for progress"""
+    from ml_pipeline.orchestrator import PLANT_TYPES
+
+    plant_types = tuple(request.args.getlist('type')) or PLANT_TYPES
+    try:
+        job_id = _enqueue_refresh(_fleet_plants(plant_types), plant_types, f"fleet:{','.join(plant_types)}")
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id)
+        })
+    except Exception as e:
+        print(f"Error queueing forecast refresh: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        })
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """API endpoint reporting a background job's status and progress"""
+    from ml_pipeline.jobs import get_job
+
+    job = get_job(job_id)
+    # Users may only follow their own jobs; admins see all of them
+    if not job or (current_user.role != 'admin' and job['payload'].get('requested_by') != current_user.id):
+        return jsonify({
+            'success': False,
+            'message': 'Job not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'job': {
+            'id': job['id'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'progress': job['progress'],
+            'message': job['message'],
+            'error': job['error'],
+            'result': job['result'],
+            'created_at': datetime.utcfromtimestamp(job['created_at']).isoformat(),
+            'elapsed_seconds': job['elapsed_seconds']
+        }
+    })
+
+@app.route('/api/job_queue_stats')
+@login_required
+@admin_required
+def job_queue_stats():
+    """API endpoint reporting queued/running/finished job counts"""
+    from ml_pipeline.jobs import queue_stats
+
+    return jsonify({
+        'success': True,
+        'queue': queue_stats()
+    })
+
+@app.cli.command('run-job-workers')
+@click.option('--workers', default=1, show_default=True, help='Number of worker processes')
+def run_job_workers_command(workers):
+    """Run background job workers in the foreground until interrupted"""
+    import time
+    from ml_pipeline.jobs import run_worker, start_workers, stop_workers
+
+    if workers == 1:
+        run_worker()
+        return
+
+    start_workers(workers)
+    try:
+        # The supervisor thread replaces workers that die; wait until interrupted
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_workers()
+
+@app.cli.command('refresh-forecasts')
+@click.option('--type', 'plant_types', multiple=True, type=click.Choice(['solar', 'wind']),
+              help='Plant type to refresh (repeatable, default: all)')
+def refresh_forecasts_command(plant_types):
+    """Refresh forecasts for all plants from the command line"""
+    from ml_pipeline.orchestrator import refresh_forecasts, summarize, PLANT_TYPES
+
+    plant_types = plant_types or PLANT_TYPES
+    reports = refresh_forecasts(_fleet_plants(plant_types), plant_types)
+    print(summarize(reports))
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for Docker and load balancers"""
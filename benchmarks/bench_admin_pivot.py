@@ -0,0 +1,117 @@
+"""
+Measure the /api/admin_hourly_data pivot: the previous per-row loop (hour
+list membership checks, then totals over hours x plants) against
+pivot_hourly's one-scatter (hours x plants) matrices, on synthetic rows for
+one date with some hours missing per plant.
+
+    python -m benchmarks.bench_admin_pivot --plants 500
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.bench_flat_forest import best_time
+from ml_pipeline.aggregate_daily import pivot_hourly
+
+def synthetic_rows(plants, missing=0.1, seed=0):
+    """
+    (plant_id, plant_name, timestamp, predicted, actual, p10, p50, p90) rows
+    ordered like the endpoint's query, with a share of each plant's hours missing
+    """
+    rng = np.random.default_rng(seed)
+    day = datetime(2025, 6, 1)
+    rows = []
+    for plant_id in range(1, plants + 1):
+        for hour in range(24):
+            if rng.random() < missing:
+                continue
+            predicted = float(rng.gamma(2.0, 40.0))
+            rows.append((plant_id, f"Plant {plant_id:04d}", day + timedelta(hours=hour), predicted, None,
+                         predicted * 0.8, predicted, predicted * 1.2))
+    return rows
+
+def old_pivot(rows):
+    """
+    The previous loop: hours appended in row order with a list membership
+    check, per-plant arrays appended without alignment
+    """
+    hours = []
+    grouped_data = {}
+    for _, plant_name, timestamp, predicted, actual, p10, p50, p90 in rows:
+        hour = timestamp.strftime('%H:%M')
+        if hour not in hours:
+            hours.append(hour)
+        if plant_name not in grouped_data:
+            grouped_data[plant_name] = {'predicted': [], 'actual': [], 'p10': [], 'p50': [], 'p90': []}
+        grouped_data[plant_name]['predicted'].append(float(predicted) if predicted else 0)
+        grouped_data[plant_name]['actual'].append(float(actual) if actual else 0)
+        for band, value in (('p10', p10), ('p50', p50), ('p90', p90)):
+            grouped_data[plant_name][band].append(round(float(value), 2) if value is not None else None)
+
+    plant_names = list(grouped_data.keys())
+    total_predicted = []
+    for hour_idx in range(len(hours)):
+        hour_predicted = 0
+        for plant in plant_names:
+            if hour_idx < len(grouped_data[plant]['predicted']):
+                hour_predicted += grouped_data[plant]['predicted'][hour_idx]
+        total_predicted.append(round(hour_predicted, 2))
+    return hours, total_predicted
+
+def new_pivot(rows):
+    """
+    pivot_hourly plus the conversion to the endpoint's JSON lists, as
+    app._admin_hourly_pivot does
+    """
+    plant_ids, plant_names, timestamps, *columns = zip(*rows)
+    values = {name: np.array(column, dtype=float)
+              for name, column in zip(['predicted', 'actual', 'p10', 'p50', 'p90'], columns)}
+    hours, plants, present, matrices = pivot_hourly(plant_ids, timestamps, values)
+    for name in ('predicted', 'actual'):
+        matrices[name] = np.where(present, np.nan_to_num(matrices[name]), np.nan)
+    for name in ('p10', 'p50', 'p90'):
+        matrices[name] = np.round(matrices[name], 2)
+    per_plant = {name: [[None if value != value else value for value in column]
+                        for column in matrix.T.tolist()]
+                 for name, matrix in matrices.items()}
+    predicted = matrices['predicted']
+    labels = [f"{hour:%H:%M}" for hour in hours.astype('datetime64[us]').tolist()]
+    return labels, np.round(np.nansum(predicted, axis=1), 2).tolist(), per_plant
+
+def expected_totals(rows):
+    totals = {}
+    for _, _, timestamp, predicted, *_ in rows:
+        totals[timestamp] = totals.get(timestamp, 0.0) + predicted
+    return [round(totals[timestamp], 2) for timestamp in sorted(totals)]
+
+def expected_series(rows):
+    """
+    Each plant's predictions on the common hour axis, None where it has no row
+    """
+    hours = sorted({timestamp for _, _, timestamp, *_ in rows})
+    series = {}
+    for plant_id, _, timestamp, predicted, *_ in rows:
+        series.setdefault(plant_id, [None] * len(hours))[hours.index(timestamp)] = predicted
+    return [series[plant_id] for plant_id in sorted(series)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'plants':>7}{'rows':>8}{'loop ms':>10}{'pivot ms':>10}{'loop totals right':>19}{'pivot totals right':>20}"
+          f"{'pivot series aligned':>22}")
+    for plants in (10, 100, args.plants):
+        rows = synthetic_rows(plants)
+        loop_s = best_time(lambda: old_pivot(rows), max_repeats=5)
+        pivot_s = best_time(lambda: new_pivot(rows), max_repeats=5)
+        expected = expected_totals(rows)
+        _, totals, per_plant = new_pivot(rows)
+        print(f"{plants:>7}{len(rows):>8}{loop_s * 1000:>10.2f}{pivot_s * 1000:>10.2f}"
+              f"{str(np.allclose(old_pivot(rows)[1], expected)):>19}"
+              f"{str(np.allclose(totals, expected)):>20}"
+              f"{str(per_plant['predicted'] == expected_series(rows)):>22}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare the model backends (ml_pipeline.backends) on accuracy and predict
+cost: each backend is trained on the bundled training split as
+train_models would, scored on the held-out rows (with the zero rules) and
+timed through its backend predict function on synthetic fleet batches.
+
+    python -m benchmarks.bench_backends --max-rows 1000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from benchmarks.bench_flat_forest import best_time, synthetic_features
+from ml_pipeline.backends import BACKENDS
+from ml_pipeline.predict_hourly import zero_generation_mask
+from ml_pipeline.train_models import TRAINING_DATA, _fit
+
+def backend_entry(artifact):
+    """
+    The registry entry predict_hourly would hold for a freshly trained artifact
+    """
+    if isinstance(artifact, dict):
+        return {'model': artifact['model'], 'scaler': artifact['scaler'], 'format': 'pickle'}
+    return {'model': artifact, 'scaler': None, 'format': 'pickle'}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-rows', type=int, default=1_000_000)
+    parser.add_argument('--types', default='solar,wind')
+    parser.add_argument('--n-estimators', type=int, default=100)
+    args = parser.parse_args()
+
+    sizes = [size for size in (120, 10_000, 100_000, 1_000_000) if size <= args.max_rows]
+
+    for plant_type in args.types.split(','):
+        spec = TRAINING_DATA[plant_type]
+        df = pd.read_csv(spec['path'])
+        X = df[spec['features']]
+        y = df[spec['target']].to_numpy(dtype=np.float64)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=spec['test_size'], random_state=42)
+        theoretical_train = df.loc[X_train.index, spec['theoretical']].to_numpy() if 'theoretical' in spec else None
+        zero = zero_generation_mask(X_test, plant_type)
+        features = synthetic_features(plant_type, sizes[-1])
+
+        print(f"\n{plant_type}: MAE on {len(X_test)} held-out rows, predict ms per batch (single core)")
+        print(f"{'backend':<13}{'MAE':>9}" + ''.join(f"{f'{size:,} rows':>15}" for size in sizes))
+
+        for name, predict in BACKENDS[plant_type].items():
+            artifact = _fit(plant_type, X_train, y_train, args.n_estimators, None, -1, 42, name, theoretical_train)
+            if name == 'rf':
+                # Predict single-threaded, as the deployed forests do
+                forest = artifact['model'] if isinstance(artifact, dict) else artifact[-1]
+                forest.set_params(n_jobs=None)
+            entry = backend_entry(artifact)
+
+            mae = np.mean(np.abs(np.where(zero, 0.0, predict(entry, X_test)) - y_test))
+            timings = [best_time(lambda: predict(entry, features.iloc[:size]), max_repeats=5) * 1000
+                       for size in sizes]
+            print(f"{name:<13}{mae:>9.2f}" + ''.join(f"{ms:>15.1f}" for ms in timings))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Time the backtest engine on a multi-plant history built by repeating the
+bundled wind CSV for --plants plants (2.8 years of hourly rows each), in
+process and across a process pool.
+
+    python -m benchmarks.bench_backtest --plants 40 --workers 1,4
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ml_pipeline.backtest import BACKTEST_FILES, run_backtest
+
+def fleet_history(plants, path, seed=0):
+    """
+    Write a history CSV with a plant_id column: every plant gets the bundled
+    wind history with its own noise on the weather and the measured output
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(BACKTEST_FILES['wind'])
+
+    for plant_id in range(1, plants + 1):
+        history = base.copy()
+        history.insert(0, 'plant_id', plant_id)
+        history['wind_speed'] = np.maximum(0.0, history['wind_speed'] + rng.normal(0, 0.3, len(history))).round(2)
+        history['actual_output_kW'] = (history['actual_output_kW'] * rng.uniform(0.9, 1.1)).round(2)
+        history.to_csv(path, mode='a', header=plant_id == 1, index=False)
+
+    return plants * len(base)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=40)
+    parser.add_argument('--workers', default=f"1,{os.cpu_count() or 1}")
+    parser.add_argument('--chunk-rows', type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'wind_history.csv')
+        rows = fleet_history(args.plants, path)
+        print(f"{args.plants} plants, {rows} hourly rows, {os.path.getsize(path) / 2**20:.0f} MB CSV, "
+              f"{os.cpu_count()} CPUs")
+
+        results = {}
+        for workers in sorted({int(w) for w in args.workers.split(',')}):
+            report = run_backtest('wind', path, workers=workers, chunk_rows=args.chunk_rows, plant_column='plant_id')
+            results[workers] = report
+            print(f"workers={workers:<3} {report['seconds']:>7.2f}s {report['rows'] / report['seconds']:>12,.0f} rows/s "
+                  f"({report['chunks']} chunks, {len(report['failed_chunks'])} failed)")
+
+        overall = [report['overall'][['mae', 'rmse', 'bias']].to_numpy() for report in results.values()]
+        print(f"Same metrics for every worker count: {all(np.allclose(overall[0], o) for o in overall)}")
+        print(next(iter(results.values()))['overall'].round(3).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure date filtering on the hourly prediction tables: the previous
+CAST(timestamp AS DATE) = :day predicate against the half-open timestamp
+range app.date_filter now emits, and the available-dates DISTINCT over every
+hourly row against the forecast_dates index, on a seeded SQLite replica of
+hourly_solar_predictions with the production indexes. Prints each query's
+plan (SCAN is a full pass, SEARCH an index seek) and best-of timings.
+
+    python -m benchmarks.bench_date_filter --plants 500 --days 170
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.bench_flat_forest import best_time
+
+START = datetime(2025, 1, 1)
+
+def build_database(path, plants, days):
+    """
+    Hourly solar predictions for every plant and hour, indexed like the
+    production table, plus forecast_dates as the writer maintains it
+    """
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE hourly_solar_predictions (id INTEGER PRIMARY KEY, plant_id INTEGER NOT NULL, "
+                 "timestamp TEXT NOT NULL, predicted_generation REAL, actual_generation REAL)")
+    conn.execute("CREATE TABLE forecast_dates (plant_type TEXT NOT NULL, date TEXT NOT NULL, "
+                 "PRIMARY KEY (plant_type, date))")
+
+    hours = [(START + timedelta(hours=hour)).strftime('%Y-%m-%d %H:%M:%S') for hour in range(days * 24)]
+    for plant_id in range(1, plants + 1):
+        generation = rng.gamma(2.0, 40.0, len(hours)).tolist()
+        conn.executemany("INSERT INTO hourly_solar_predictions (plant_id, timestamp, predicted_generation) "
+                         "VALUES (?, ?, ?)", zip([plant_id] * len(hours), hours, generation))
+    conn.executemany("INSERT INTO forecast_dates (plant_type, date) VALUES ('solar', ?)",
+                     [((START + timedelta(days=day)).date().isoformat(),) for day in range(days)])
+
+    conn.execute("CREATE INDEX idx_hourly_solar_plant_timestamp ON hourly_solar_predictions (plant_id, timestamp)")
+    conn.execute("CREATE INDEX idx_hourly_solar_timestamp ON hourly_solar_predictions (timestamp)")
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+def day_range(day):
+    return (datetime.combine(day, datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S'),
+            datetime.combine(day + timedelta(days=1), datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S'))
+
+def query_cases(plants, days):
+    """
+    (label, old SQL, old params, new SQL, new params) for the endpoint queries
+    """
+    day = (START + timedelta(days=days // 2)).date()
+    start, end = day_range(day)
+    plant_id = plants // 2
+    return [
+        ("one plant, one day (user dashboard, hourly API)",
+         "SELECT timestamp, predicted_generation FROM hourly_solar_predictions "
+         "WHERE plant_id = ? AND date(timestamp) = ? ORDER BY timestamp", (plant_id, day.isoformat()),
+         "SELECT timestamp, predicted_generation FROM hourly_solar_predictions "
+         "WHERE plant_id = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp", (plant_id, start, end)),
+        ("all plants, one day (admin dashboard, admin_hourly_data)",
+         "SELECT plant_id, timestamp, predicted_generation FROM hourly_solar_predictions "
+         "WHERE date(timestamp) = ?", (day.isoformat(),),
+         "SELECT plant_id, timestamp, predicted_generation FROM hourly_solar_predictions "
+         "WHERE timestamp >= ? AND timestamp < ?", (start, end)),
+        ("available dates (latest 7)",
+         "SELECT DISTINCT date(timestamp) AS day FROM hourly_solar_predictions ORDER BY day DESC LIMIT 7", (),
+         "SELECT date FROM forecast_dates WHERE plant_type = 'solar' ORDER BY date DESC LIMIT 7", ()),
+    ]
+
+def plan(conn, sql, params):
+    return '; '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=500)
+    parser.add_argument('--days', type=int, default=170)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'hourly.sqlite3'), args.plants, args.days)
+        rows = conn.execute("SELECT COUNT(*) FROM hourly_solar_predictions").fetchone()[0]
+        print(f"{rows:,} hourly rows ({args.plants} plants x {args.days} days)")
+
+        for label, old_sql, old_params, new_sql, new_params in query_cases(args.plants, args.days):
+            old_s = best_time(lambda: conn.execute(old_sql, old_params).fetchall(), max_repeats=5)
+            new_s = best_time(lambda: conn.execute(new_sql, new_params).fetchall(), max_repeats=5)
+            same = sorted(conn.execute(old_sql, old_params).fetchall()) == sorted(conn.execute(new_sql, new_params).fetchall())
+            print(f"\n{label}: {old_s * 1000:.2f} ms -> {new_s * 1000:.2f} ms "
+                  f"({old_s / new_s:.0f}x), same rows {same}")
+            print(f"  before: {plan(conn, old_sql, old_params)}")
+            print(f"  after:  {plan(conn, new_sql, new_params)}")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
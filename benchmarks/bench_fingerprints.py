@@ -0,0 +1,96 @@
+"""
+Measure forecast input fingerprinting: a fleet refresh's predict stage with
+every row recomputed against one where only the hours whose inputs changed
+since the stored run go through the model, for several shares of changed
+hours. The stored fingerprints come from the first run instead of the
+database, and the output is checked against a full recompute.
+
+    python -m benchmarks.bench_fingerprints --plants 500
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_flat_forest import best_time, synthetic_features
+from ml_pipeline.predict_hourly import QUANTILE_COLUMNS, input_fingerprints, predict_hourly_generation_batch
+from ml_pipeline.prediction_batch import PredictionBatch
+
+# Column whose value is changed in the "updated" hours: one that the solar
+# Radiation median adjustment does not see, so other hours keep their inputs
+CHANGED_COLUMN = {'solar': 'AirTemperature', 'wind': 'wind_speed'}
+
+KNOWN_COLUMNS = ['plant_id', 'time', 'input_hash', 'predicted_generation'] + QUANTILE_COLUMNS
+
+def fleet_frames(plant_type, plants, hours=168):
+    """
+    Per-plant hourly weather frames shaped like fetch_weather_batch output
+    """
+    times = pd.date_range('2025-06-01', periods=hours, freq='h')
+    features = synthetic_features(plant_type, plants * hours)
+    features.insert(0, 'time', np.tile(times.to_numpy(), plants))
+    if plant_type == 'solar':
+        features['Month'] = features['time'].dt.month
+        features['Hour'] = features['time'].dt.hour
+    return {plant_id: features.iloc[index * hours:(index + 1) * hours].reset_index(drop=True)
+            for index, plant_id in enumerate(range(1, plants + 1))}
+
+def known_from(predictions):
+    """
+    The stored rows load_input_fingerprints would return after saving predictions
+    """
+    frame = PredictionBatch.concat(predictions.values()).to_frame()
+    return frame.reindex(columns=KNOWN_COLUMNS)
+
+def update_hours(frames, plant_type, share, seed=1):
+    """
+    Copy of the fleet frames with a share of each plant's hours changed
+    """
+    rng = np.random.default_rng(seed)
+    column = CHANGED_COLUMN[plant_type]
+    updated = {}
+    for plant_id, frame in frames.items():
+        frame = frame.copy()
+        rows = rng.random(len(frame)) < share
+        frame.loc[rows, column] = frame.loc[rows, column] + 0.5
+        updated[plant_id] = frame
+    return updated
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=500)
+    parser.add_argument('--types', default='solar,wind')
+    args = parser.parse_args()
+
+    for plant_type in args.types.split(','):
+        frames = fleet_frames(plant_type, args.plants)
+        # Nothing stored yet: every row is predicted and fingerprinted
+        first = predict_hourly_generation_batch(frames, plant_type, output="batch",
+                                                known=pd.DataFrame(columns=KNOWN_COLUMNS))
+        known = known_from(first)
+        rows = len(known)
+
+        stacked = pd.concat(frames.values(), ignore_index=True)
+        hash_s = best_time(lambda: input_fingerprints(stacked, plant_type, True), max_repeats=5)
+        print(f"\n{plant_type}: {args.plants} plants, {rows:,} hourly rows, fingerprinting "
+              f"{hash_s * 1000:.1f} ms ({rows / hash_s / 1e6:.1f}M rows/s)")
+        print(f"{'changed':>9}{'recomputed':>12}{'skipped':>10}{'full ms':>10}{'skip ms':>10}{'speedup':>9}{'same':>7}")
+
+        for share in (0.0, 0.05, 0.25, 1.0):
+            updated = update_hours(frames, plant_type, share)
+            full_s = best_time(lambda: predict_hourly_generation_batch(updated, plant_type, output="batch"),
+                               max_repeats=3)
+            skip_s = best_time(lambda: predict_hourly_generation_batch(updated, plant_type, output="batch",
+                                                                       known=known), max_repeats=3)
+
+            full = PredictionBatch.concat(predict_hourly_generation_batch(updated, plant_type, output="batch").values())
+            skip = PredictionBatch.concat(predict_hourly_generation_batch(updated, plant_type, output="batch",
+                                                                          known=known).values())
+            same = (np.array_equal(full.predictions, skip.predictions) and
+                    np.array_equal(full.bands, skip.bands, equal_nan=True))
+            skipped = int(skip.reused.sum())
+            print(f"{share:>9.0%}{rows - skipped:>12,}{skipped:>10,}{full_s * 1000:>10.1f}{skip_s * 1000:>10.1f}"
+                  f"{full_s / skip_s:>8.1f}x{str(same):>7}")
+
+if __name__ == "__main__":
+    main()
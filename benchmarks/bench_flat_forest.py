@@ -0,0 +1,102 @@
+"""
+Benchmark the flattened forest engine (FOREST_ENGINE=flat) against sklearn's
+predict() for the deployed solar and wind models at batch sizes from 1 to 1M
+rows, checking the predictions agree to within 1e-9.
+
+    python -m benchmarks.bench_flat_forest --max-rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ml_pipeline.model_registry import get_model, get_estimator
+from ml_pipeline.flat_forest import FlatForest
+from ml_pipeline.predict_hourly import SOLAR_FEATURES, WIND_FEATURES
+
+TOLERANCE = 1e-9
+
+def synthetic_features(plant_type, rows, seed=0):
+    """
+    Random feature rows in the ranges the Open-Meteo forecasts produce
+    """
+    rng = np.random.default_rng(seed)
+    if plant_type == 'solar':
+        radiation = np.where(rng.random(rows) < 0.4, 0.0, rng.uniform(0, 1000, rows))
+        return pd.DataFrame({
+            'WindSpeed': np.round(rng.uniform(0, 12, rows), 1),
+            'Sunshine': np.where(radiation > 120, np.round(rng.uniform(0, 60, rows), 1), 0.0),
+            'AirPressure': np.round(rng.uniform(995, 1015, rows), 1),
+            'Radiation': np.round(radiation, 1),
+            'AirTemperature': np.round(rng.uniform(15, 40, rows), 1),
+            'RelativeAirHumidity': np.round(rng.uniform(20, 90, rows), 0),
+            'Month': rng.integers(1, 13, rows),
+            'Hour': rng.integers(0, 24, rows)
+        })[SOLAR_FEATURES]
+
+    return pd.DataFrame({
+        'wind_speed': np.round(rng.uniform(0, 28, rows), 1),
+        'temperature': np.round(rng.uniform(-5, 40, rows), 1),
+        'RH': np.round(rng.uniform(20, 100, rows), 0),
+        'pressure': np.round(rng.uniform(980, 1030, rows), 1),
+        'gust': np.round(rng.uniform(0, 40, rows), 1),
+        'wind_dir_dev': np.round(rng.uniform(0, 180, rows), 0),
+        'precipitation': np.round(rng.exponential(0.5, rows), 1)
+    })[WIND_FEATURES]
+
+def model_inputs(plant_type, rows):
+    """
+    The estimator both engines evaluate and its input, as _predict_frame
+    passes them (solar is pre-scaled; wind is a scaler + forest pipeline)
+    """
+    bundle = get_model(plant_type)
+    features = synthetic_features(plant_type, rows)
+    if plant_type == 'solar':
+        return get_estimator(bundle), bundle['scaler'].transform(features)
+    return get_estimator(bundle), features
+
+def best_time(func, min_seconds=0.2, max_repeats=50):
+    """
+    Best-of time for func(), repeating small calls until min_seconds elapse
+    """
+    best, spent, repeats = float('inf'), 0.0, 0
+    while repeats < 2 or (spent < min_seconds and repeats < max_repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best, spent, repeats = min(best, elapsed), spent + elapsed, repeats + 1
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-rows', type=int, default=1_000_000)
+    parser.add_argument('--types', default='solar,wind')
+    args = parser.parse_args()
+
+    sizes = [size for size in (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000) if size <= args.max_rows]
+
+    for plant_type in args.types.split(','):
+        model, X = model_inputs(plant_type, sizes[-1])
+
+        start = time.perf_counter()
+        forest = FlatForest.from_model(model)
+        flatten_seconds = time.perf_counter() - start
+        print(f"\n{plant_type}: {forest!r}, {forest.nbytes / 2**20:.1f} MB, flattened in {flatten_seconds * 1000:.1f} ms")
+        print(f"{'rows':>9}{'sklearn ms':>13}{'flat ms':>11}{'speedup':>9}{'max |diff|':>12}")
+
+        for size in sizes:
+            batch = X[:size]
+            expected = model.predict(batch)
+            actual = forest.predict(batch)
+            diff = float(np.max(np.abs(actual - expected)))
+            if diff > TOLERANCE:
+                raise AssertionError(f"{plant_type} flat forest differs from sklearn by {diff} at {size} rows")
+
+            sklearn_seconds = best_time(lambda: model.predict(batch))
+            flat_seconds = best_time(lambda: forest.predict(batch))
+            print(f"{size:>9,}{sklearn_seconds * 1000:>13.2f}{flat_seconds * 1000:>11.2f}"
+                  f"{sklearn_seconds / flat_seconds:>9.2f}{diff:>12.1e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Report cold-start load time and per-worker memory for the source model
+artifacts (pickle / gzipped pickle) against the packed, memory-mapped ones
+written by ml_pipeline.package_models.
+
+Each format starts --workers fresh processes that load both models and
+predict a plant's 5-day forecast, like a gunicorn or job worker would, then
+reads their memory from /proc/<pid>/smaps_rollup while all of them are alive.
+Private memory is what each extra worker really costs; mapped forest pages
+are shared and only counted once in PSS.
+
+    python -m ml_pipeline.package_models
+    python -m benchmarks.bench_model_load --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CHILD = r"""
+import json, os, sys, time
+start = time.perf_counter()
+import sklearn.ensemble, sklearn.pipeline, sklearn.preprocessing
+from ml_pipeline.model_registry import get_model
+from ml_pipeline.predict_hourly import _predict_frame
+from benchmarks.bench_solar_mask import synthetic_weather
+from benchmarks.bench_flat_forest import synthetic_features
+imported = time.perf_counter()
+
+load = 0.0
+if not os.environ.get('BASELINE'):
+    load = sum(get_model(plant_type)['load_seconds'] for plant_type in ('solar', 'wind'))
+loaded = time.perf_counter()
+
+if not os.environ.get('BASELINE'):
+    solar = next(iter(synthetic_weather(1, 120).values()))
+    _predict_frame(solar, 'solar')
+    _predict_frame(synthetic_features('wind', 120), 'wind')
+ready = time.perf_counter()
+
+print(json.dumps({'import': imported - start, 'load': load, 'first_predict': ready - loaded,
+                  'ready': ready - start}), flush=True)
+sys.stdin.read()
+"""
+
+def smaps_rollup(pid):
+    """
+    Memory counters of a process in bytes (Rss, Pss, Private_*, Shared_*)
+    """
+    counters = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                counters[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return counters
+
+def run_workers(mode, workers, engine, baseline=False):
+    """
+    Start workers with MODEL_ARTIFACTS=mode one after another (so load times
+    are not skewed by workers competing for CPU), keep them all alive, and
+    collect their timings and memory. Baseline workers import the same
+    libraries but load no model.
+    """
+    env = dict(os.environ, MODEL_ARTIFACTS=mode, PYTHONPATH=os.getcwd())
+    if engine:
+        env['FOREST_ENGINE'] = engine
+    if baseline:
+        env['BASELINE'] = '1'
+
+    processes, results = [], []
+    try:
+        for _ in range(workers):
+            process = subprocess.Popen([sys.executable, '-c', CHILD], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, env=env, text=True)
+            processes.append(process)
+            line = process.stdout.readline()
+            while line and not line.startswith('{'):
+                line = process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"{mode} worker exited before loading the models")
+            results.append(json.loads(line))
+
+        for process, timings in zip(processes, results):
+            timings.update(smaps_rollup(process.pid))
+        return results
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--engine', default=None, help="FOREST_ENGINE for the workers (default: per format)")
+    args = parser.parse_args()
+
+    from ml_pipeline.model_registry import packed_manifest
+    if packed_manifest('solar') is None or packed_manifest('wind') is None:
+        sys.exit("No packed models found - run python -m ml_pipeline.package_models first")
+
+    # Warm the page cache so both formats are timed reading from memory
+    run_workers('pickle', 1, args.engine)
+    run_workers('packed', 1, args.engine)
+
+    def summary(results):
+        average = lambda key: sum(result[key] for result in results) / len(results)
+        return {
+            'load': average('load'),
+            'ready': average('ready'),
+            'rss': average('Rss'),
+            'private': average('Private_Clean') + average('Private_Dirty'),
+            'pss': sum(result['Pss'] for result in results)
+        }
+
+    baseline = summary(run_workers('pickle', args.workers, args.engine, baseline=True))
+
+    mb = 2 ** 20
+    print(f"{args.workers} workers per format, started one at a time; each loads both models and "
+          f"predicts 120 hours per type. Memory is over a worker importing the same libraries "
+          f"(RSS {baseline['rss'] / mb:.0f} MB, {baseline['private'] / mb:.0f} MB private).")
+    print(f"{'format':<8}{'load s':>8}{'ready s':>9}{'+RSS MB':>9}{'+private MB':>13}{'+PSS all workers MB':>21}")
+    for mode in ('pickle', 'packed'):
+        result = summary(run_workers(mode, args.workers, args.engine))
+        print(f"{mode:<8}{result['load']:>8.3f}{result['ready']:>9.2f}{(result['rss'] - baseline['rss']) / mb:>9.1f}"
+              f"{(result['private'] - baseline['private']) / mb:>13.1f}{(result['pss'] - baseline['pss']) / mb:>21.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure memory and stage throughput of hourly predictions held as a list of
+dicts versus a PredictionBatch, per 1M rows.
+
+    python -m benchmarks.bench_prediction_batch --rows 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ml_pipeline.predict_hourly import SOLAR_WEATHER_COLUMNS, prediction_frame_to_records
+from ml_pipeline.prediction_batch import PredictionBatch
+from ml_pipeline.aggregate_daily import (aggregate_daily_generation, aggregate_daily_frame,
+                                         filter_daylight_hours, _hourly_rows)
+
+def synthetic_frame(rows, hours=120):
+    rng = np.random.default_rng(0)
+    plants = -(-rows // hours)
+    times = pd.date_range('2025-06-01', periods=hours, freq='h')
+
+    frame = pd.DataFrame({
+        'plant_id': np.repeat(np.arange(1, plants + 1), hours)[:rows],
+        'time': np.tile(times.to_numpy(), plants)[:rows],
+        'predicted_generation': rng.gamma(2.0, 40.0, rows)
+    })
+    for column in SOLAR_WEATHER_COLUMNS:
+        frame[column] = np.round(rng.uniform(0, 1000, rows), 2)
+    return frame
+
+def measure(build):
+    """
+    Peak-free retained size of the object built by build(), via tracemalloc
+    """
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    frame = synthetic_frame(args.rows)
+    scale = 1_000_000 / args.rows
+
+    records, records_bytes = measure(lambda: prediction_frame_to_records(frame, 'solar'))
+    batch, batch_bytes = measure(lambda: PredictionBatch.from_frame(frame, 'solar'))
+
+    print(f"{args.rows} hourly rows ({len(SOLAR_WEATHER_COLUMNS)} weather columns)")
+    print(f"{'representation':<20}{'MB per 1M rows':>16}{'bytes/row':>12}")
+    print(f"{'list of dicts':<20}{records_bytes * scale / 2**20:>16.1f}{records_bytes / args.rows:>12.0f}")
+    print(f"{'PredictionBatch':<20}{batch_bytes * scale / 2**20:>16.1f}{batch_bytes / args.rows:>12.0f}")
+    print(f"(PredictionBatch.nbytes = {batch.nbytes / args.rows:.0f} bytes/row)")
+
+    # Slicing is zero-copy
+    per_plant = batch.split_by_plant()
+    first = next(iter(per_plant.values()))
+    print(f"split_by_plant: {len(per_plant)} plants, views share memory: "
+          f"{np.shares_memory(first.features, batch.features)}")
+
+    # Stage throughput over the whole fleet: daylight filter, daily
+    # aggregation and building the DB staging rows for every plant
+    plant_records = {}
+    for record in records:
+        plant_records.setdefault(record['plant_id'], []).append(record)
+
+    def records_stages():
+        for plant_id, preds in plant_records.items():
+            aggregate_daily_generation(filter_daylight_hours(preds), 1000.0)
+            _hourly_rows(plant_id, preds)
+
+    def batch_stages():
+        thresholds = dict.fromkeys(per_plant, 1000.0)
+        aggregate_daily_frame(filter_daylight_hours(batch), thresholds)
+        for plant_id, plant_batch in per_plant.items():
+            _hourly_rows(plant_id, plant_batch)
+
+    _, records_seconds = timed(records_stages)
+    _, batch_seconds = timed(batch_stages)
+    print(f"filter + aggregate + staging rows: list of dicts {records_seconds:.2f}s "
+          f"({args.rows / records_seconds:,.0f} rows/s), PredictionBatch {batch_seconds:.2f}s "
+          f"({args.rows / batch_seconds:,.0f} rows/s)")
+
+    # Round trip keeps timestamps and weather JSON exactly; predictions are float32
+    round_trip = PredictionBatch.from_records(records[:1000], 'solar').to_records()
+    same_text = all(a['timestamp'] == b['timestamp'] and a['weather_data'] == b['weather_data']
+                    for a, b in zip(records, round_trip))
+    max_error = max(abs(a['predicted_generation'] - b['predicted_generation']) for a, b in zip(records, round_trip))
+    print(f"Round trip: timestamps/weather identical: {same_text}, max prediction error (float32): {max_error:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure the cost of the quantile output mode (P10/P50/P90 bands from the
+forest's per-tree predictions) against the point forecast, through
+_predict_frame with the deployed models, and check the bands against
+np.percentile over every estimator's own predict().
+
+    python -m benchmarks.bench_quantiles --max-rows 120000
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.bench_flat_forest import best_time, synthetic_features
+from ml_pipeline.backends import _forest_engine
+from ml_pipeline.model_registry import get_model, get_estimator
+from ml_pipeline.predict_hourly import (PREDICTION_QUANTILES, QUANTILE_COLUMNS, SOLAR_FEATURES, WIND_FEATURES,
+                                       _predict_frame)
+
+def naive_bands(plant_type, features):
+    """
+    Bands from calling every estimator's predict() separately and stacking
+    the results, the per-estimator dispatch the quantile mode avoids
+    """
+    entry = get_model(plant_type)
+    model = get_estimator(entry)
+    features = features[SOLAR_FEATURES if plant_type == 'solar' else WIND_FEATURES]
+    X = features if entry['scaler'] is None else entry['scaler'].transform(features)
+    if hasattr(model, 'steps'):
+        X, model = model[:-1].transform(X), model.steps[-1][1]
+    X = np.asarray(X, dtype=np.float32)
+    per_tree = np.stack([estimator.predict(X) for estimator in model.estimators_], axis=1)
+    return np.percentile(per_tree, np.asarray(PREDICTION_QUANTILES) * 100, axis=1).T
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-rows', type=int, default=120_000)
+    parser.add_argument('--types', default='solar,wind')
+    args = parser.parse_args()
+
+    sizes = [size for size in (120, 1_200, 12_000, 120_000) if size <= args.max_rows]
+
+    for plant_type in args.types.split(','):
+        entry = get_model(plant_type)
+
+        # Every row through the model, so both modes do the same work
+        check = synthetic_features(plant_type, 2_000)
+        check['time'] = 0
+        if plant_type == 'solar':
+            check['Sunshine'] = 1.0
+        frame = _predict_frame(check.copy(), plant_type, quantiles=True)
+        point = _predict_frame(check.copy(), plant_type, quantiles=False)['predicted_generation'].to_numpy()
+        bands = frame[QUANTILE_COLUMNS].to_numpy()
+        naive = naive_bands(plant_type, check)
+        keep = ~((frame['wind_speed'] < 3) | (frame['wind_speed'] > 25)).to_numpy() if plant_type == 'wind' \
+            else np.ones(len(frame), dtype=bool)
+        print(f"\n{plant_type} ({entry['format']} model, FOREST_ENGINE={_forest_engine(entry)}): "
+              f"point forecast unchanged {np.array_equal(point, frame['predicted_generation'].to_numpy())}, "
+              f"bands match per-estimator percentiles {np.allclose(bands[keep], naive[keep])}")
+
+        print(f"{'rows':>9}{'point ms':>11}{'quantile ms':>13}{'ratio':>8}{'per-tree loop ms':>18}")
+        for size in sizes:
+            features = synthetic_features(plant_type, size)
+            features['time'] = 0
+            point_s = best_time(lambda: _predict_frame(features.copy(), plant_type, quantiles=False), max_repeats=10)
+            quantile_s = best_time(lambda: _predict_frame(features.copy(), plant_type, quantiles=True), max_repeats=10)
+            naive_s = best_time(lambda: naive_bands(plant_type, features), max_repeats=3)
+            print(f"{size:>9,}{point_s * 1000:>11.2f}{quantile_s * 1000:>13.2f}{quantile_s / point_s:>8.2f}"
+                  f"{naive_s * 1000:>18.2f}")
+
+if __name__ == "__main__":
+    main()
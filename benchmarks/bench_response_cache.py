@@ -0,0 +1,142 @@
+"""
+Measure the chart response cache (ml_pipeline.response_cache) on dashboard
+traffic: a Flask endpoint with the solar_chart_data queries, over a SQLite
+replica of the plants and daily prediction tables, is called for random
+plants with a forecast write (version bump) every --write-every requests.
+Reports the hit ratio, 304 rate and p50/p95 latency with the cache off and
+on. SQLite is in-process, so the misses here are cheaper than against
+Azure SQL.
+
+    python -m benchmarks.bench_response_cache --plants 200 --requests 5000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from flask import Flask, jsonify, request
+from flask_login import LoginManager, UserMixin
+
+from ml_pipeline import response_cache
+
+def build_database(path, plants, days=30):
+    """
+    Plants and daily solar predictions, indexed like the production tables
+    """
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE plants (id INTEGER PRIMARY KEY, type TEXT, threshold_value REAL)")
+    conn.execute("CREATE TABLE daily_solar_predictions (id INTEGER PRIMARY KEY, plant_id INTEGER, date TEXT, "
+                 "total_predicted_generation REAL, total_actual_generation REAL)")
+    conn.execute("CREATE INDEX ix_daily_plant_date ON daily_solar_predictions (plant_id, date)")
+    conn.executemany("INSERT INTO plants (id, type, threshold_value) VALUES (?, 'solar', ?)",
+                     [(plant_id, 1500.0) for plant_id in range(1, plants + 1)])
+    start = date(2025, 6, 1)
+    conn.executemany(
+        "INSERT INTO daily_solar_predictions (plant_id, date, total_predicted_generation, total_actual_generation) "
+        "VALUES (?, ?, ?, ?)",
+        [(plant_id, (start + timedelta(days=day)).isoformat(), float(rng.gamma(4.0, 500.0)), None)
+         for plant_id in range(1, plants + 1) for day in range(days)])
+    conn.commit()
+    conn.close()
+
+def make_app(path):
+    app = Flask(__name__)
+    login_manager = LoginManager(app)
+
+    @login_manager.request_loader
+    def load_user(request):
+        # Every request comes from the same logged-in user
+        user = UserMixin()
+        user.id = 1
+        return user
+
+    def cache_key():
+        return (request.endpoint, request.args.get('plant_id'), 'user')
+
+    @app.route('/api/solar_chart_data')
+    @response_cache.cached_response('solar', cache_key)
+    def solar_chart_data():
+        conn = sqlite3.connect(path)
+        plant_id = request.args.get('plant_id')
+        if plant_id == 'all':
+            rows = conn.execute("SELECT date, SUM(total_predicted_generation), SUM(total_actual_generation) "
+                                "FROM daily_solar_predictions GROUP BY date ORDER BY date DESC LIMIT 7").fetchall()
+            threshold = conn.execute("SELECT AVG(threshold_value) FROM plants WHERE type = 'solar'").fetchone()[0]
+        else:
+            rows = conn.execute("SELECT date, total_predicted_generation, total_actual_generation "
+                                "FROM daily_solar_predictions WHERE plant_id = ? ORDER BY date DESC LIMIT 7",
+                                (int(plant_id),)).fetchall()
+            threshold = conn.execute("SELECT threshold_value FROM plants WHERE id = ?", (int(plant_id),)).fetchone()[0]
+        conn.close()
+        return jsonify({
+            'dates': [row[0] for row in rows],
+            'predictions': [float(row[1]) for row in rows],
+            'actuals': [float(row[2]) if row[2] else 0 for row in rows],
+            'threshold': float(threshold)
+        })
+
+    return app
+
+def run(client, plants, requests, write_every, revalidate):
+    """
+    Replay dashboard traffic; returns per-request latencies and 304 count
+    """
+    rng = np.random.default_rng(1)
+    # Each dashboard page load fetches its plant's chart data several times,
+    # and admins look at 'all' now and then
+    plant_ids = np.where(rng.random(requests) < 0.05, 0, rng.integers(1, plants + 1, requests))
+    etags = {}
+    latencies = []
+    not_modified = 0
+
+    for index, plant_id in enumerate(plant_ids.tolist()):
+        if write_every and index % write_every == write_every - 1:
+            response_cache.invalidate('solar')
+        plant_arg = 'all' if plant_id == 0 else str(plant_id)
+        headers = {'If-None-Match': etags[plant_arg]} if revalidate and plant_arg in etags else {}
+
+        start = time.perf_counter()
+        response = client.get(f'/api/solar_chart_data?plant_id={plant_arg}', headers=headers)
+        latencies.append(time.perf_counter() - start)
+
+        if response.status_code == 304:
+            not_modified += 1
+        elif response.headers.get('ETag'):
+            etags[plant_arg] = response.headers['ETag']
+
+    return np.array(latencies), not_modified
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--write-every', type=int, default=1000,
+                        help="Requests between forecast writes (refresh jobs)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['RESPONSE_CACHE_VERSION_DIR'] = os.path.join(tmp, 'versions')
+        path = os.path.join(tmp, 'forecasts.sqlite3')
+        build_database(path, args.plants)
+        client = make_app(path).test_client()
+
+        print(f"{args.requests} chart requests over {args.plants} plants, a forecast write every "
+              f"{args.write_every} requests")
+        print(f"{'mode':<28}{'hit ratio':>10}{'304s':>7}{'p50 ms':>9}{'p95 ms':>9}")
+        for label, size, revalidate in (('no cache', '0', False), ('cache', '1024', False),
+                                        ('cache + browser ETags', '1024', True)):
+            os.environ['RESPONSE_CACHE_SIZE'] = size
+            response_cache._memory.clear()
+            response_cache._stats.update(dict.fromkeys(response_cache._stats, 0))
+
+            latencies, not_modified = run(client, args.plants, args.requests, args.write_every, revalidate)
+            stats = response_cache.cache_stats()
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+            print(f"{label:<28}{stats['hit_ratio']:>10.2f}{not_modified:>7}{p50:>9.3f}{p95:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark the prediction writer: the old per-row SELECT + UPDATE/INSERT loop
+against the bulk staging-table + MERGE path in save_predictions_bulk.
+
+Needs the Azure SQL credentials from .env. Temporary plants are created for
+the run and deleted afterwards along with their predictions.
+
+    python -m benchmarks.bench_save_predictions --plants 20
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from ml_pipeline.aggregate_daily import PREDICTION_TABLES, save_predictions_bulk
+from ml_pipeline.db_pool import get_connection, pool_stats
+
+def make_predictions(plant_id, hours=120, threshold=1500):
+    """
+    Build synthetic hourly and daily predictions shaped like the pipeline output
+    """
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    hourly = []
+    daily_totals = {}
+
+    for h in range(hours):
+        ts = start + timedelta(hours=h)
+        generation = float((h % 24) * 10)
+        hourly.append({
+            'plant_id': plant_id,
+            'timestamp': ts.strftime('%Y-%m-%d %H:%M:%S'),
+            'weather_data': json.dumps({'WindSpeed': 3.2, 'Sunshine': 0.5, 'Radiation': 120.0}),
+            'predicted_generation': generation
+        })
+        date_str = ts.strftime('%Y-%m-%d')
+        daily_totals[date_str] = daily_totals.get(date_str, 0.0) + generation
+
+    daily = [
+        {'date': d, 'total_predicted_generation': round(t, 2), 'below_threshold': t < threshold}
+        for d, t in sorted(daily_totals.items())
+    ]
+    return hourly, daily
+
+def save_rowwise(cursor, plant_predictions, plant_type):
+    """
+    The previous save_predictions_to_db loop: one SELECT and one UPDATE or
+    INSERT per hourly and daily row
+    """
+    hourly_table, daily_table = PREDICTION_TABLES[plant_type]
+    counts = {'created_hourly': 0, 'updated_hourly': 0, 'created_daily': 0, 'updated_daily': 0}
+
+    for plant_id, (hourly, daily) in plant_predictions.items():
+        for pred in hourly:
+            cursor.execute(f"SELECT id FROM {hourly_table} WHERE plant_id = ? AND timestamp = ?",
+                           (plant_id, pred['timestamp']))
+            if cursor.fetchone():
+                cursor.execute(f"UPDATE {hourly_table} SET weather_data = ?, predicted_generation = ?, "
+                               f"created_at = GETDATE() WHERE plant_id = ? AND timestamp = ?",
+                               (pred['weather_data'], pred['predicted_generation'], plant_id, pred['timestamp']))
+                counts['updated_hourly'] += 1
+            else:
+                cursor.execute(f"INSERT INTO {hourly_table} (plant_id, timestamp, weather_data, predicted_generation, "
+                               f"created_at) VALUES (?, ?, ?, ?, GETDATE())",
+                               (plant_id, pred['timestamp'], pred['weather_data'], pred['predicted_generation']))
+                counts['created_hourly'] += 1
+
+        for pred in daily:
+            is_below = 1 if pred['below_threshold'] else 0
+            message = "Energy generation below threshold" if pred['below_threshold'] else None
+            cursor.execute(f"SELECT id FROM {daily_table} WHERE plant_id = ? AND date = ?", (plant_id, pred['date']))
+            if cursor.fetchone():
+                cursor.execute(f"UPDATE {daily_table} SET total_predicted_generation = ?, recommendation_status = ?, "
+                               f"recommendation_message = ?, created_at = GETDATE() WHERE plant_id = ? AND date = ?",
+                               (pred['total_predicted_generation'], is_below, message, plant_id, pred['date']))
+                counts['updated_daily'] += 1
+            else:
+                cursor.execute(f"INSERT INTO {daily_table} (plant_id, date, total_predicted_generation, "
+                               f"recommendation_status, recommendation_message, created_at) "
+                               f"VALUES (?, ?, ?, ?, ?, GETDATE())",
+                               (plant_id, pred['date'], pred['total_predicted_generation'], is_below, message))
+                counts['created_daily'] += 1
+
+    return counts
+
+def create_plants(cursor, count, plant_type):
+    plant_ids = []
+    for i in range(count):
+        cursor.execute("INSERT INTO plants (name, location, type, threshold_value, created_at, updated_at) "
+                       "OUTPUT INSERTED.id VALUES (?, ?, ?, ?, GETDATE(), GETDATE())",
+                       (f"bench-{plant_type}-{i}", "23.276474°N 77.460590°E", plant_type, 1500.0))
+        plant_ids.append(cursor.fetchone()[0])
+    return plant_ids
+
+def clear_predictions(cursor, plant_ids, plant_type):
+    placeholders = ', '.join('?' for _ in plant_ids)
+    for table in PREDICTION_TABLES[plant_type]:
+        cursor.execute(f"DELETE FROM {table} WHERE plant_id IN ({placeholders})", plant_ids)
+
+def delete_plants(cursor, plant_ids, plant_type):
+    clear_predictions(cursor, plant_ids, plant_type)
+    placeholders = ', '.join('?' for _ in plant_ids)
+    cursor.execute(f"DELETE FROM plants WHERE id IN ({placeholders})", plant_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=10)
+    parser.add_argument('--hours', type=int, default=120)
+    parser.add_argument('--type', default='solar', choices=sorted(PREDICTION_TABLES))
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = get_connection()
+    cursor = conn.cursor()
+    plant_ids = create_plants(cursor, args.plants, args.type)
+    conn.commit()
+
+    try:
+        plant_predictions = {pid: make_predictions(pid, args.hours) for pid in plant_ids}
+        rows = sum(len(h) + len(d) for h, d in plant_predictions.values())
+
+        # Each method runs twice: first pass inserts, second pass updates
+        results = {}
+        for name in ('rowwise', 'bulk'):
+            clear_predictions(cursor, plant_ids, args.type)
+            conn.commit()
+
+            for phase in ('insert', 'update'):
+                start = time.perf_counter()
+                if name == 'rowwise':
+                    counts = save_rowwise(cursor, plant_predictions, args.type)
+                    conn.commit()
+                else:
+                    counts = save_predictions_bulk(plant_predictions, args.type)
+                elapsed = time.perf_counter() - start
+                results[(name, phase)] = (elapsed, counts)
+
+        print(f"\n{args.plants} plants x ({args.hours} hourly + daily) = {rows} rows per pass")
+        print(f"{'method':<10}{'phase':<8}{'seconds':>10}{'rows/sec':>12}  counts")
+        for (name, phase), (elapsed, counts) in results.items():
+            print(f"{name:<10}{phase:<8}{elapsed:>10.3f}{rows / elapsed:>12.0f}  {counts}")
+
+        for phase in ('insert', 'update'):
+            if results[('rowwise', phase)][1] != results[('bulk', phase)][1]:
+                print(f"WARNING: {phase} counts differ between methods")
+
+        print(f"Connection pool: {pool_stats()}")
+    finally:
+        delete_plants(cursor, plant_ids, args.type)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark solar inference with and without the pre-inference night mask
+(SOLAR_INFERENCE_MASK = none / rules / elevation) on a synthetic fleet with
+realistic day/night weather, and check the 'rules' output is identical.
+
+    python -m benchmarks.bench_solar_mask --plants 1000 --hours 120
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ml_pipeline.model_registry import get_model
+from ml_pipeline.predict_hourly import (predict_hourly_generation_batch, solar_elevation_degrees,
+                                       _prepare_weather_frame, _predict_frame, _sun_down_for)
+
+def synthetic_weather(plants, hours, seed=0):
+    """
+    Forecast frames whose radiation and sunshine follow the real sun position
+    at random plant locations, in local time like the Open-Meteo API returns
+    """
+    rng = np.random.default_rng(seed)
+    frames = {}
+    start = pd.Timestamp.now().normalize()
+
+    for plant_id in range(1, plants + 1):
+        latitude, longitude = rng.uniform(8, 35), rng.uniform(68, 97)
+        utc_offset = 19800  # IST
+        local = pd.date_range(start, periods=hours, freq='h')
+        utc = local.to_numpy() - np.timedelta64(utc_offset, 's')
+
+        elevation = solar_elevation_degrees(utc, latitude, longitude)
+        clearness = rng.uniform(0.3, 1.0, hours)
+        radiation = np.round(np.maximum(0.0, np.sin(np.radians(elevation))) * 900 * clearness, 1)
+        sunshine = np.where(radiation > 120, np.round(60 * clearness, 1), 0.0)
+
+        df = pd.DataFrame({
+            'time': local,
+            'WindSpeed': np.round(rng.uniform(0, 12, hours), 1),
+            'Sunshine': sunshine,
+            'AirPressure': np.round(rng.uniform(995, 1015, hours), 1),
+            'Radiation': radiation,
+            'AirTemperature': np.round(rng.uniform(15, 40, hours), 1),
+            'RelativeAirHumidity': np.round(rng.uniform(20, 90, hours), 0),
+            'Month': local.month,
+            'Hour': local.hour
+        })
+        df.attrs.update(latitude=latitude, longitude=longitude, utc_offset_seconds=utc_offset)
+        frames[plant_id] = df
+
+    return frames
+
+def run(frames, mask, repeats):
+    """
+    Best-of-repeats time of the inference step alone (mask + scaler + forest
+    on the stacked fleet) and of the whole batch prediction
+    """
+    os.environ['SOLAR_INFERENCE_MASK'] = mask
+    prepared = [_prepare_weather_frame(df, 'solar') for df in frames.values()]
+    stacked = pd.concat(prepared, ignore_index=True)
+
+    inference = end_to_end = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _predict_frame(stacked.copy(), 'solar', _sun_down_for(prepared, stacked, 'solar'))
+        inference = min(inference, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = predict_hourly_generation_batch(frames, 'solar', output='frame')
+        end_to_end = min(end_to_end, time.perf_counter() - start)
+
+    return pd.concat(result.values(), ignore_index=True), inference, end_to_end
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=1000)
+    parser.add_argument('--hours', type=int, default=120)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    frames = synthetic_weather(args.plants, args.hours)
+    get_model('solar')
+
+    results = {mask: run(frames, mask, args.repeats) for mask in ('none', 'rules', 'elevation')}
+    baseline, base_inference, base_total = results['none']
+    masked = results['rules'][0]
+    elevation = results['elevation'][0]
+
+    rows = len(baseline)
+    rule_rows = int(((baseline['Sunshine'] == 0.0) & (baseline['Radiation'] < 0.0)).sum())
+    changed = int((elevation['predicted_generation'] != baseline['predicted_generation']).sum())
+
+    print(f"\n{args.plants} plants x {args.hours} hours = {rows} rows, "
+          f"{rule_rows} ({rule_rows / rows:.0%}) zeroed by the Sunshine/Radiation rule")
+    os.environ['SOLAR_INFERENCE_MASK'] = 'elevation'
+    prepared = [_prepare_weather_frame(df, 'solar') for df in frames.values()]
+    sun_down = _sun_down_for(prepared, pd.concat(prepared, ignore_index=True), 'solar')
+    rule = ((baseline['Sunshine'] == 0.0) & (baseline['Radiation'] < 0.0)).to_numpy()
+    forest_rows = {'none': rows, 'rules': rows - rule_rows, 'elevation': int((~(rule | sun_down)).sum())}
+
+    print(f"{'mask':<12}{'forest rows':>12}{'inference s':>13}{'speedup':>9}{'end-to-end s':>14}{'speedup':>9}")
+    for mask, (_, inference, total) in results.items():
+        print(f"{mask:<12}{forest_rows[mask] / rows:>12.0%}{inference:>13.3f}{base_inference / inference:>9.2f}"
+              f"{total:>14.2f}{base_total / total:>9.2f}")
+    print(f"'rules' output identical to unmasked: {baseline.equals(masked)}")
+    print(f"'elevation' changed {changed} night rows to 0.0 that the rule left to the model")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark fleet weather fetching: one fetch_weather_data call per plant
+against fetch_weather_batch, using a local stand-in for the Open-Meteo API
+with a fixed per-request latency.
+
+    python -m benchmarks.bench_weather_batch --plants 200 --latency-ms 80
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+def _location_payload(latitude, longitude, variables, forecast_days):
+    hours = 24 * forecast_days
+    rng = np.random.default_rng(abs(hash((latitude, longitude))) % (2 ** 32))
+    times = pd.date_range(pd.Timestamp.now().normalize(), periods=hours, freq='h')
+    hourly = {'time': times.strftime('%Y-%m-%dT%H:%M').tolist()}
+    for variable in variables:
+        hourly[variable] = np.round(rng.uniform(0, 100, hours), 2).tolist()
+    return {'latitude': latitude, 'longitude': longitude, 'utc_offset_seconds': 0, 'hourly': hourly}
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers /v1/forecast like Open-Meteo, including multi-location lists"""
+    latency = 0.0
+    requests_served = 0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        latitudes = [float(v) for v in query['latitude'][0].split(',')]
+        longitudes = [float(v) for v in query['longitude'][0].split(',')]
+        variables = query['hourly'][0].split(',')
+        forecast_days = int(query.get('forecast_days', ['5'])[0])
+
+        time.sleep(self.latency)
+        payload = [_location_payload(lat, lng, variables, forecast_days) for lat, lng in zip(latitudes, longitudes)]
+        body = json.dumps(payload[0] if len(payload) == 1 else payload).encode()
+
+        type(self).requests_served += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--duplicate-share', type=float, default=0.1,
+                        help='Fraction of plants sharing coordinates with another plant')
+    args = parser.parse_args()
+
+    StandInHandler.latency = args.latency_ms / 1000.0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['OPEN_METEO_URL'] = f"http://127.0.0.1:{server.server_port}/v1/forecast"
+
+    # Imported after OPEN_METEO_URL is set
+    from ml_pipeline.fetch_weather import fetch_weather_batch, fetch_weather_data
+
+    rng = np.random.default_rng(0)
+    locations = {}
+    for plant_id in range(1, args.plants + 1):
+        if plant_id > 1 and rng.random() < args.duplicate_share:
+            locations[plant_id] = locations[int(rng.integers(1, plant_id))]
+        else:
+            locations[plant_id] = f"{rng.uniform(8, 35):.6f},{rng.uniform(68, 97):.6f}"
+
+    StandInHandler.requests_served = 0
+    start = time.perf_counter()
+    sequential = {pid: fetch_weather_data(location=loc, use_cache=False) for pid, loc in locations.items()}
+    sequential_seconds = time.perf_counter() - start
+    sequential_requests = StandInHandler.requests_served
+
+    StandInHandler.requests_served = 0
+    start = time.perf_counter()
+    batched = fetch_weather_batch(locations, use_cache=False)
+    batch_seconds = time.perf_counter() - start
+    batch_requests = StandInHandler.requests_served
+
+    mismatches = [pid for pid in locations if not sequential[pid].equals(batched.get(pid))]
+
+    print(f"\n{args.plants} plants, {args.latency_ms:.0f} ms simulated API latency")
+    print(f"{'method':<12}{'requests':>10}{'seconds':>10}{'plants/sec':>12}")
+    print(f"{'per-plant':<12}{sequential_requests:>10}{sequential_seconds:>10.2f}{args.plants / sequential_seconds:>12.1f}")
+    print(f"{'batch':<12}{batch_requests:>10}{batch_seconds:>10.2f}{args.plants / batch_seconds:>12.1f}")
+    print(f"Speedup: {sequential_seconds / batch_seconds:.1f}x, frames identical: {not mismatches}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
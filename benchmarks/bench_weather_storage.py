@@ -0,0 +1,113 @@
+"""
+Measure the hourly weather storage modes (WEATHER_STORAGE): weather_data
+JSON text per row against the typed weather columns. For each mode a fleet's
+hourly rows go through the writer's row building (_hourly_rows) into a
+SQLite replica of the hourly table, then are read back for a backtest with
+load_hourly_weather. Reports write throughput, table size and read speed.
+SQLite stores every REAL in 8 bytes and text as UTF-8, so the estimated SQL
+Server row payload (NVARCHAR: 2 bytes per character; REAL: 4 bytes) is
+printed as well.
+
+    python -m benchmarks.bench_weather_storage --plants 200 --hours 720
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from benchmarks.bench_flat_forest import best_time, synthetic_features
+from ml_pipeline import aggregate_daily
+from ml_pipeline.db_pool import configure_pool
+from ml_pipeline.prediction_batch import PredictionBatch, weather_columns_for
+
+def fleet_batch(plant_type, plants, hours):
+    """
+    One PredictionBatch of every plant's hourly predictions
+    """
+    columns = weather_columns_for(plant_type)
+    times = pd.date_range('2025-01-01', periods=hours, freq='h').to_numpy()
+    features = synthetic_features(plant_type, plants * hours).reindex(columns=columns)
+    return PredictionBatch(np.repeat(np.arange(1, plants + 1), hours), np.tile(times, plants),
+                           np.random.default_rng(0).gamma(2.0, 40.0, plants * hours),
+                           features.to_numpy(dtype=np.float64), columns, plant_type)
+
+def create_table(conn, plant_type):
+    hourly_table, _ = aggregate_daily.PREDICTION_TABLES[plant_type]
+    weather = ', '.join(f"{column} REAL" for column in aggregate_daily.WEATHER_STORAGE_COLUMNS[plant_type].values())
+    conn.execute(f"CREATE TABLE {hourly_table} (id INTEGER PRIMARY KEY, plant_id INTEGER NOT NULL, "
+                 f"timestamp TEXT NOT NULL, weather_data TEXT, {weather}, predicted_generation REAL, "
+                 f"actual_generation REAL, UNIQUE (plant_id, timestamp))")
+
+def write(conn, batch, plant_type, storage):
+    """
+    Build the writer's rows for the batch and insert them; returns the seconds taken
+    """
+    hourly_table, _ = aggregate_daily.PREDICTION_TABLES[plant_type]
+    extra_columns = [] if storage == 'json' else list(aggregate_daily.WEATHER_STORAGE_COLUMNS[plant_type].values())
+    columns = ['plant_id', 'timestamp', 'weather_data', 'predicted_generation'] + extra_columns
+
+    start = time.perf_counter()
+    # One plant at a time, as save_predictions_bulk builds them
+    starts = np.flatnonzero(np.r_[True, batch.plant_ids[1:] != batch.plant_ids[:-1]])
+    rows = []
+    for first, stop in zip(starts, np.r_[starts[1:], len(batch)]):
+        rows.extend(aggregate_daily._hourly_rows(int(batch.plant_ids[first]), batch[first:stop], extra_columns,
+                                                 plant_type, store_json=storage != 'columns'))
+    conn.executemany(f"INSERT INTO {hourly_table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                     [(plant_id, str(timestamp), *values) for plant_id, timestamp, *values in rows])
+    conn.commit()
+    return time.perf_counter() - start
+
+def sqlserver_row_bytes(conn, plant_type, storage):
+    """
+    Estimated SQL Server bytes of the weather values per row
+    """
+    hourly_table, _ = aggregate_daily.PREDICTION_TABLES[plant_type]
+    json_chars = conn.execute(f"SELECT AVG(LENGTH(weather_data)) FROM {hourly_table}").fetchone()[0] or 0
+    typed = 0 if storage == 'json' else 4 * len(aggregate_daily.WEATHER_STORAGE_COLUMNS[plant_type])
+    return 2 * json_chars + typed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plants', type=int, default=200)
+    parser.add_argument('--hours', type=int, default=720)
+    parser.add_argument('--types', default='solar,wind')
+    args = parser.parse_args()
+
+    for plant_type in args.types.split(','):
+        batch = fleet_batch(plant_type, args.plants, args.hours)
+        print(f"\n{plant_type}: {len(batch):,} hourly rows ({args.plants} plants x {args.hours} hours)")
+        print(f"{'storage':<9}{'write rows/s':>14}{'table MB':>10}{'est. SQL Server B/row':>23}"
+              f"{'backtest read ms':>18}{'same values':>13}")
+
+        for storage in ('json', 'both', 'columns'):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'hourly.sqlite3')
+                conn = sqlite3.connect(path)
+                create_table(conn, plant_type)
+                write_s = write(conn, batch, plant_type, storage)
+                conn.execute("VACUUM")
+                size_mb = os.path.getsize(path) / 1e6
+                row_bytes = sqlserver_row_bytes(conn, plant_type, storage)
+
+                os.environ['WEATHER_STORAGE'] = storage
+                engine = configure_pool(create_engine(f'sqlite:///{path}'))
+                plant_ids = range(1, args.plants + 1)
+                read_s = best_time(lambda: aggregate_daily.load_hourly_weather(plant_ids, plant_type),
+                                   max_repeats=3)
+                frame = aggregate_daily.load_hourly_weather(plant_ids, plant_type)
+                # The typed columns are REAL (float32) on SQL Server; SQLite keeps float64
+                same = np.allclose(frame[list(batch.feature_names)].to_numpy(), batch.features, rtol=1e-6)
+                engine.dispose()
+                conn.close()
+
+            print(f"{storage:<9}{len(batch) / write_s:>14,.0f}{size_mb:>10.1f}{row_bytes:>23.0f}"
+                  f"{read_s * 1000:>18.1f}{str(same):>13}")
+
+if __name__ == "__main__":
+    main()
@@ -27,10 +27,21 @@ CREATE TABLE IF NOT EXISTS hourly_solar_predictions (
     id INT AUTO_INCREMENT PRIMARY KEY,
     plant_id INT NOT NULL,
     timestamp DATETIME NOT NULL,
-    weather_data JSON NOT NULL,
+    weather_data JSON,
+    weather_wind_speed FLOAT,
+    weather_sunshine FLOAT,
+    weather_air_pressure FLOAT,
+    weather_radiation FLOAT,
+    weather_air_temperature FLOAT,
+    weather_relative_humidity FLOAT,
     predicted_generation DECIMAL(10,2),
+    predicted_p10 DECIMAL(10,2),
+    predicted_p50 DECIMAL(10,2),
+    predicted_p90 DECIMAL(10,2),
+    input_hash BIGINT,
     actual_generation DECIMAL(10,2),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_hourly_solar_plant_timestamp (plant_id, timestamp),
     FOREIGN KEY (plant_id) REFERENCES plants (id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -39,10 +50,22 @@ CREATE TABLE IF NOT EXISTS hourly_wind_predictions (
     id INT AUTO_INCREMENT PRIMARY KEY,
     plant_id INT NOT NULL,
     timestamp DATETIME NOT NULL,
-    weather_data JSON NOT NULL,
+    weather_data JSON,
+    weather_wind_speed FLOAT,
+    weather_temperature FLOAT,
+    weather_relative_humidity FLOAT,
+    weather_pressure FLOAT,
+    weather_gust FLOAT,
+    weather_wind_dir_dev FLOAT,
+    weather_precipitation FLOAT,
     predicted_generation DECIMAL(10,2),
+    predicted_p10 DECIMAL(10,2),
+    predicted_p50 DECIMAL(10,2),
+    predicted_p90 DECIMAL(10,2),
+    input_hash BIGINT,
     actual_generation DECIMAL(10,2),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_hourly_wind_plant_timestamp (plant_id, timestamp),
     FOREIGN KEY (plant_id) REFERENCES plants (id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -56,6 +79,7 @@ CREATE TABLE IF NOT EXISTS daily_solar_predictions (
     recommendation_status TINYINT(1) DEFAULT 0,
     recommendation_message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_daily_solar_plant_date (plant_id, date),
     FOREIGN KEY (plant_id) REFERENCES plants (id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -69,12 +93,18 @@ CREATE TABLE IF NOT EXISTS daily_wind_predictions (
     recommendation_status TINYINT(1) DEFAULT 0,
     recommendation_message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_daily_wind_plant_date (plant_id, date),
     FOREIGN KEY (plant_id) REFERENCES plants (id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Dates with hourly predictions per plant type, written with the hourly rows
+CREATE TABLE IF NOT EXISTS forecast_dates (
+    plant_type VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    PRIMARY KEY (plant_type, date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- Create indexes for performance
-CREATE INDEX idx_hourly_solar_plant_timestamp ON hourly_solar_predictions (plant_id, timestamp);
-CREATE INDEX idx_hourly_wind_plant_timestamp ON hourly_wind_predictions (plant_id, timestamp);
-CREATE INDEX idx_daily_solar_plant_date ON daily_solar_predictions (plant_id, date);
-CREATE INDEX idx_daily_wind_plant_date ON daily_wind_predictions (plant_id, date);
+CREATE INDEX idx_hourly_solar_timestamp ON hourly_solar_predictions (timestamp);
+CREATE INDEX idx_hourly_wind_timestamp ON hourly_wind_predictions (timestamp);
 CREATE INDEX idx_users_plant_id ON users (plant_id); 
\ No newline at end of file
@@ -0,0 +1,14 @@
+-- P10/P50/P90 generation bands next to predicted_generation (MySQL, for
+-- databases created from create_tables.sql before the bands were added).
+-- Run once:
+--   mysql -h <host> -u <user> -p <database> < database/migrations/001_prediction_quantiles.mysql.sql
+
+ALTER TABLE hourly_solar_predictions
+    ADD COLUMN predicted_p10 DECIMAL(10,2) NULL AFTER predicted_generation,
+    ADD COLUMN predicted_p50 DECIMAL(10,2) NULL AFTER predicted_p10,
+    ADD COLUMN predicted_p90 DECIMAL(10,2) NULL AFTER predicted_p50;
+
+ALTER TABLE hourly_wind_predictions
+    ADD COLUMN predicted_p10 DECIMAL(10,2) NULL AFTER predicted_generation,
+    ADD COLUMN predicted_p50 DECIMAL(10,2) NULL AFTER predicted_p10,
+    ADD COLUMN predicted_p90 DECIMAL(10,2) NULL AFTER predicted_p50;
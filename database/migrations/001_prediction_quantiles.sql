@@ -0,0 +1,15 @@
+-- P10/P50/P90 generation bands next to predicted_generation (Azure SQL / SQL Server).
+-- db.create_all() does not add columns to existing tables; run once per database:
+--   sqlcmd -S <server> -d <database> -U <user> -i database/migrations/001_prediction_quantiles.sql
+
+IF COL_LENGTH('hourly_solar_predictions', 'predicted_p10') IS NULL
+    ALTER TABLE hourly_solar_predictions ADD
+        predicted_p10 FLOAT NULL,
+        predicted_p50 FLOAT NULL,
+        predicted_p90 FLOAT NULL;
+
+IF COL_LENGTH('hourly_wind_predictions', 'predicted_p10') IS NULL
+    ALTER TABLE hourly_wind_predictions ADD
+        predicted_p10 FLOAT NULL,
+        predicted_p50 FLOAT NULL,
+        predicted_p90 FLOAT NULL;
@@ -0,0 +1,8 @@
+-- Fingerprint of the forecast inputs each hourly prediction was made from, so
+-- refreshes can skip hours whose inputs are unchanged (MySQL). Rows with a
+-- NULL input_hash are always recomputed. Run once:
+--   mysql -h <host> -u <user> -p <database> < database/migrations/002_input_fingerprints.mysql.sql
+
+ALTER TABLE hourly_solar_predictions ADD COLUMN input_hash BIGINT NULL AFTER predicted_p90;
+
+ALTER TABLE hourly_wind_predictions ADD COLUMN input_hash BIGINT NULL AFTER predicted_p90;
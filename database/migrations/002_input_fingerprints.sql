@@ -0,0 +1,10 @@
+-- Fingerprint of the forecast inputs each hourly prediction was made from, so
+-- refreshes can skip hours whose inputs are unchanged (Azure SQL / SQL Server).
+-- Rows with a NULL input_hash are always recomputed. Run once per database:
+--   sqlcmd -S <server> -d <database> -U <user> -i database/migrations/002_input_fingerprints.sql
+
+IF COL_LENGTH('hourly_solar_predictions', 'input_hash') IS NULL
+    ALTER TABLE hourly_solar_predictions ADD input_hash BIGINT NULL;
+
+IF COL_LENGTH('hourly_wind_predictions', 'input_hash') IS NULL
+    ALTER TABLE hourly_wind_predictions ADD input_hash BIGINT NULL;
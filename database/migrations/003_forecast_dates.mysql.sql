@@ -0,0 +1,20 @@
+-- Timestamp indexes for the all-plant date-range filters, and the
+-- forecast_dates table the dashboards list available dates from (MySQL).
+-- create_tables.sql already has the (plant_id, timestamp) indexes. Run once:
+--   mysql -h <host> -u <user> -p <database> < database/migrations/003_forecast_dates.mysql.sql
+
+CREATE INDEX idx_hourly_solar_timestamp ON hourly_solar_predictions (timestamp);
+CREATE INDEX idx_hourly_wind_timestamp ON hourly_wind_predictions (timestamp);
+
+CREATE TABLE IF NOT EXISTS forecast_dates (
+    plant_type VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    PRIMARY KEY (plant_type, date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Backfill from the rows already stored
+INSERT IGNORE INTO forecast_dates (plant_type, date)
+SELECT DISTINCT 'solar', DATE(timestamp) FROM hourly_solar_predictions;
+
+INSERT IGNORE INTO forecast_dates (plant_type, date)
+SELECT DISTINCT 'wind', DATE(timestamp) FROM hourly_wind_predictions;
@@ -0,0 +1,40 @@
+-- Indexes for the date-range filters on hourly timestamps, and the
+-- forecast_dates table the dashboards list available dates from (Azure SQL /
+-- SQL Server). db.create_all() only creates missing tables, so existing
+-- databases need this once:
+--   sqlcmd -S <server> -d <database> -U <user> -i database/migrations/003_forecast_dates.sql
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_hourly_solar_plant_timestamp'
+               AND object_id = OBJECT_ID('hourly_solar_predictions'))
+    CREATE INDEX idx_hourly_solar_plant_timestamp ON hourly_solar_predictions (plant_id, timestamp);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_hourly_wind_plant_timestamp'
+               AND object_id = OBJECT_ID('hourly_wind_predictions'))
+    CREATE INDEX idx_hourly_wind_plant_timestamp ON hourly_wind_predictions (plant_id, timestamp);
+
+-- Admin views filter every plant by date, which the plant-leading index can't seek
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_hourly_solar_timestamp'
+               AND object_id = OBJECT_ID('hourly_solar_predictions'))
+    CREATE INDEX idx_hourly_solar_timestamp ON hourly_solar_predictions (timestamp);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_hourly_wind_timestamp'
+               AND object_id = OBJECT_ID('hourly_wind_predictions'))
+    CREATE INDEX idx_hourly_wind_timestamp ON hourly_wind_predictions (timestamp);
+
+IF OBJECT_ID('forecast_dates') IS NULL
+    CREATE TABLE forecast_dates (
+        plant_type VARCHAR(10) NOT NULL,
+        date DATE NOT NULL,
+        CONSTRAINT pk_forecast_dates PRIMARY KEY (plant_type, date)
+    );
+
+-- Backfill from the rows already stored
+INSERT INTO forecast_dates (plant_type, date)
+SELECT DISTINCT 'solar', CAST(timestamp AS DATE) FROM hourly_solar_predictions h
+WHERE NOT EXISTS (SELECT 1 FROM forecast_dates f
+                  WHERE f.plant_type = 'solar' AND f.date = CAST(h.timestamp AS DATE));
+
+INSERT INTO forecast_dates (plant_type, date)
+SELECT DISTINCT 'wind', CAST(timestamp AS DATE) FROM hourly_wind_predictions h
+WHERE NOT EXISTS (SELECT 1 FROM forecast_dates f
+                  WHERE f.plant_type = 'wind' AND f.date = CAST(h.timestamp AS DATE));
@@ -0,0 +1,74 @@
+-- Unique (plant_id, timestamp) / (plant_id, date) keys on the prediction tables
+-- (MySQL, for databases created from create_tables.sql before the keys were
+-- added), so INSERT ... ON DUPLICATE KEY UPDATE upserts rows in place.
+-- Duplicates written before are removed first, keeping the newest row per
+-- key and any actual generation recorded on the others. Run once:
+--   mysql -h <host> -u <user> -p <database> < database/migrations/004_unique_prediction_keys.mysql.sql
+
+-- hourly_solar_predictions
+UPDATE hourly_solar_predictions keep
+JOIN (SELECT MAX(id) AS keep_id, MAX(actual_generation) AS actual_generation
+      FROM hourly_solar_predictions GROUP BY plant_id, timestamp HAVING COUNT(*) > 1) d ON keep.id = d.keep_id
+SET keep.actual_generation = d.actual_generation
+WHERE keep.actual_generation IS NULL;
+
+DELETE p FROM hourly_solar_predictions p
+JOIN (SELECT plant_id, timestamp, MAX(id) AS keep_id
+      FROM hourly_solar_predictions GROUP BY plant_id, timestamp HAVING COUNT(*) > 1) d
+  ON p.plant_id = d.plant_id AND p.timestamp = d.timestamp AND p.id <> d.keep_id;
+
+-- The unique key also serves the plant_id foreign key, replacing the old index
+ALTER TABLE hourly_solar_predictions
+    ADD CONSTRAINT uq_hourly_solar_plant_timestamp UNIQUE (plant_id, timestamp),
+    DROP INDEX idx_hourly_solar_plant_timestamp;
+
+-- hourly_wind_predictions
+UPDATE hourly_wind_predictions keep
+JOIN (SELECT MAX(id) AS keep_id, MAX(actual_generation) AS actual_generation
+      FROM hourly_wind_predictions GROUP BY plant_id, timestamp HAVING COUNT(*) > 1) d ON keep.id = d.keep_id
+SET keep.actual_generation = d.actual_generation
+WHERE keep.actual_generation IS NULL;
+
+DELETE p FROM hourly_wind_predictions p
+JOIN (SELECT plant_id, timestamp, MAX(id) AS keep_id
+      FROM hourly_wind_predictions GROUP BY plant_id, timestamp HAVING COUNT(*) > 1) d
+  ON p.plant_id = d.plant_id AND p.timestamp = d.timestamp AND p.id <> d.keep_id;
+
+-- The unique key also serves the plant_id foreign key, replacing the old index
+ALTER TABLE hourly_wind_predictions
+    ADD CONSTRAINT uq_hourly_wind_plant_timestamp UNIQUE (plant_id, timestamp),
+    DROP INDEX idx_hourly_wind_plant_timestamp;
+
+-- daily_solar_predictions
+UPDATE daily_solar_predictions keep
+JOIN (SELECT MAX(id) AS keep_id, MAX(total_actual_generation) AS total_actual_generation
+      FROM daily_solar_predictions GROUP BY plant_id, date HAVING COUNT(*) > 1) d ON keep.id = d.keep_id
+SET keep.total_actual_generation = d.total_actual_generation
+WHERE keep.total_actual_generation IS NULL;
+
+DELETE p FROM daily_solar_predictions p
+JOIN (SELECT plant_id, date, MAX(id) AS keep_id
+      FROM daily_solar_predictions GROUP BY plant_id, date HAVING COUNT(*) > 1) d
+  ON p.plant_id = d.plant_id AND p.date = d.date AND p.id <> d.keep_id;
+
+-- The unique key also serves the plant_id foreign key, replacing the old index
+ALTER TABLE daily_solar_predictions
+    ADD CONSTRAINT uq_daily_solar_plant_date UNIQUE (plant_id, date),
+    DROP INDEX idx_daily_solar_plant_date;
+
+-- daily_wind_predictions
+UPDATE daily_wind_predictions keep
+JOIN (SELECT MAX(id) AS keep_id, MAX(total_actual_generation) AS total_actual_generation
+      FROM daily_wind_predictions GROUP BY plant_id, date HAVING COUNT(*) > 1) d ON keep.id = d.keep_id
+SET keep.total_actual_generation = d.total_actual_generation
+WHERE keep.total_actual_generation IS NULL;
+
+DELETE p FROM daily_wind_predictions p
+JOIN (SELECT plant_id, date, MAX(id) AS keep_id
+      FROM daily_wind_predictions GROUP BY plant_id, date HAVING COUNT(*) > 1) d
+  ON p.plant_id = d.plant_id AND p.date = d.date AND p.id <> d.keep_id;
+
+-- The unique key also serves the plant_id foreign key, replacing the old index
+ALTER TABLE daily_wind_predictions
+    ADD CONSTRAINT uq_daily_wind_plant_date UNIQUE (plant_id, date),
+    DROP INDEX idx_daily_wind_plant_date;
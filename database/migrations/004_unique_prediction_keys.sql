@@ -0,0 +1,118 @@
+-- Unique (plant_id, timestamp) / (plant_id, date) keys on the prediction tables
+-- (Azure SQL / SQL Server), so the pipeline's MERGE upserts can't leave
+-- duplicate rows behind. Duplicates written before are removed first,
+-- keeping the newest row per key and any actual generation recorded on the
+-- others. Each table gets its own temp table, as SQL Server won't compile
+-- two SELECT INTO of the same #name in one batch. Run once per database,
+-- after 003_forecast_dates.sql:
+--   sqlcmd -S <server> -d <database> -U <user> -i database/migrations/004_unique_prediction_keys.sql
+
+SET XACT_ABORT ON;
+
+-- hourly_solar_predictions
+IF OBJECT_ID('uq_hourly_solar_plant_timestamp', 'UQ') IS NULL
+BEGIN
+    BEGIN TRANSACTION;
+
+    SELECT plant_id, timestamp, MAX(id) AS keep_id, MAX(actual_generation) AS actual_generation
+    INTO #duplicates_hourly_solar
+    FROM hourly_solar_predictions WITH (TABLOCKX, HOLDLOCK)
+    GROUP BY plant_id, timestamp
+    HAVING COUNT(*) > 1;
+
+    UPDATE keep SET actual_generation = d.actual_generation
+    FROM hourly_solar_predictions keep JOIN #duplicates_hourly_solar d ON keep.id = d.keep_id
+    WHERE keep.actual_generation IS NULL;
+
+    DELETE p FROM hourly_solar_predictions p
+    JOIN #duplicates_hourly_solar d ON p.plant_id = d.plant_id AND p.timestamp = d.timestamp AND p.id <> d.keep_id;
+
+    DROP TABLE #duplicates_hourly_solar;
+
+    ALTER TABLE hourly_solar_predictions ADD CONSTRAINT uq_hourly_solar_plant_timestamp UNIQUE (plant_id, timestamp);
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_hourly_solar_plant_timestamp' AND object_id = OBJECT_ID('hourly_solar_predictions'))
+        DROP INDEX idx_hourly_solar_plant_timestamp ON hourly_solar_predictions;
+
+    COMMIT;
+END;
+
+-- hourly_wind_predictions
+IF OBJECT_ID('uq_hourly_wind_plant_timestamp', 'UQ') IS NULL
+BEGIN
+    BEGIN TRANSACTION;
+
+    SELECT plant_id, timestamp, MAX(id) AS keep_id, MAX(actual_generation) AS actual_generation
+    INTO #duplicates_hourly_wind
+    FROM hourly_wind_predictions WITH (TABLOCKX, HOLDLOCK)
+    GROUP BY plant_id, timestamp
+    HAVING COUNT(*) > 1;
+
+    UPDATE keep SET actual_generation = d.actual_generation
+    FROM hourly_wind_predictions keep JOIN #duplicates_hourly_wind d ON keep.id = d.keep_id
+    WHERE keep.actual_generation IS NULL;
+
+    DELETE p FROM hourly_wind_predictions p
+    JOIN #duplicates_hourly_wind d ON p.plant_id = d.plant_id AND p.timestamp = d.timestamp AND p.id <> d.keep_id;
+
+    DROP TABLE #duplicates_hourly_wind;
+
+    ALTER TABLE hourly_wind_predictions ADD CONSTRAINT uq_hourly_wind_plant_timestamp UNIQUE (plant_id, timestamp);
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_hourly_wind_plant_timestamp' AND object_id = OBJECT_ID('hourly_wind_predictions'))
+        DROP INDEX idx_hourly_wind_plant_timestamp ON hourly_wind_predictions;
+
+    COMMIT;
+END;
+
+-- daily_solar_predictions
+IF OBJECT_ID('uq_daily_solar_plant_date', 'UQ') IS NULL
+BEGIN
+    BEGIN TRANSACTION;
+
+    SELECT plant_id, date, MAX(id) AS keep_id, MAX(total_actual_generation) AS total_actual_generation
+    INTO #duplicates_daily_solar
+    FROM daily_solar_predictions WITH (TABLOCKX, HOLDLOCK)
+    GROUP BY plant_id, date
+    HAVING COUNT(*) > 1;
+
+    UPDATE keep SET total_actual_generation = d.total_actual_generation
+    FROM daily_solar_predictions keep JOIN #duplicates_daily_solar d ON keep.id = d.keep_id
+    WHERE keep.total_actual_generation IS NULL;
+
+    DELETE p FROM daily_solar_predictions p
+    JOIN #duplicates_daily_solar d ON p.plant_id = d.plant_id AND p.date = d.date AND p.id <> d.keep_id;
+
+    DROP TABLE #duplicates_daily_solar;
+
+    ALTER TABLE daily_solar_predictions ADD CONSTRAINT uq_daily_solar_plant_date UNIQUE (plant_id, date);
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_daily_solar_plant_date' AND object_id = OBJECT_ID('daily_solar_predictions'))
+        DROP INDEX idx_daily_solar_plant_date ON daily_solar_predictions;
+
+    COMMIT;
+END;
+
+-- daily_wind_predictions
+IF OBJECT_ID('uq_daily_wind_plant_date', 'UQ') IS NULL
+BEGIN
+    BEGIN TRANSACTION;
+
+    SELECT plant_id, date, MAX(id) AS keep_id, MAX(total_actual_generation) AS total_actual_generation
+    INTO #duplicates_daily_wind
+    FROM daily_wind_predictions WITH (TABLOCKX, HOLDLOCK)
+    GROUP BY plant_id, date
+    HAVING COUNT(*) > 1;
+
+    UPDATE keep SET total_actual_generation = d.total_actual_generation
+    FROM daily_wind_predictions keep JOIN #duplicates_daily_wind d ON keep.id = d.keep_id
+    WHERE keep.total_actual_generation IS NULL;
+
+    DELETE p FROM daily_wind_predictions p
+    JOIN #duplicates_daily_wind d ON p.plant_id = d.plant_id AND p.date = d.date AND p.id <> d.keep_id;
+
+    DROP TABLE #duplicates_daily_wind;
+
+    ALTER TABLE daily_wind_predictions ADD CONSTRAINT uq_daily_wind_plant_date UNIQUE (plant_id, date);
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_daily_wind_plant_date' AND object_id = OBJECT_ID('daily_wind_predictions'))
+        DROP INDEX idx_daily_wind_plant_date ON daily_wind_predictions;
+
+    COMMIT;
+END;
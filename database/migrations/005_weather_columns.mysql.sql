@@ -0,0 +1,51 @@
+-- Typed FLOAT weather columns on the hourly prediction tables, for
+-- WEATHER_STORAGE=columns/both (MySQL), and a backfill from the weather_data
+-- JSON of existing rows. weather_data becomes nullable: under
+-- WEATHER_STORAGE=columns it is written as NULL. Run once:
+--   mysql -h <host> -u <user> -p <database> < database/migrations/005_weather_columns.mysql.sql
+
+-- hourly_solar_predictions
+ALTER TABLE hourly_solar_predictions
+    MODIFY weather_data JSON NULL,
+    ADD COLUMN weather_wind_speed FLOAT NULL,
+    ADD COLUMN weather_sunshine FLOAT NULL,
+    ADD COLUMN weather_air_pressure FLOAT NULL,
+    ADD COLUMN weather_radiation FLOAT NULL,
+    ADD COLUMN weather_air_temperature FLOAT NULL,
+    ADD COLUMN weather_relative_humidity FLOAT NULL;
+
+UPDATE hourly_solar_predictions SET
+    weather_wind_speed = JSON_EXTRACT(weather_data, '$.WindSpeed'),
+    weather_sunshine = JSON_EXTRACT(weather_data, '$.Sunshine'),
+    weather_air_pressure = JSON_EXTRACT(weather_data, '$.AirPressure'),
+    weather_radiation = JSON_EXTRACT(weather_data, '$.Radiation'),
+    weather_air_temperature = JSON_EXTRACT(weather_data, '$.AirTemperature'),
+    weather_relative_humidity = JSON_EXTRACT(weather_data, '$.RelativeAirHumidity')
+WHERE weather_data IS NOT NULL;
+
+-- hourly_wind_predictions
+ALTER TABLE hourly_wind_predictions
+    MODIFY weather_data JSON NULL,
+    ADD COLUMN weather_wind_speed FLOAT NULL,
+    ADD COLUMN weather_temperature FLOAT NULL,
+    ADD COLUMN weather_relative_humidity FLOAT NULL,
+    ADD COLUMN weather_pressure FLOAT NULL,
+    ADD COLUMN weather_gust FLOAT NULL,
+    ADD COLUMN weather_wind_dir_dev FLOAT NULL,
+    ADD COLUMN weather_precipitation FLOAT NULL;
+
+UPDATE hourly_wind_predictions SET
+    weather_wind_speed = JSON_EXTRACT(weather_data, '$.wind_speed'),
+    weather_temperature = JSON_EXTRACT(weather_data, '$.temperature'),
+    weather_relative_humidity = JSON_EXTRACT(weather_data, '$.RH'),
+    weather_pressure = JSON_EXTRACT(weather_data, '$.pressure'),
+    weather_gust = JSON_EXTRACT(weather_data, '$.gust'),
+    weather_wind_dir_dev = JSON_EXTRACT(weather_data, '$.wind_dir_dev'),
+    weather_precipitation = JSON_EXTRACT(weather_data, '$.precipitation')
+WHERE weather_data IS NOT NULL;
+
+-- Once every reader uses the typed columns and the pipeline runs with
+-- WEATHER_STORAGE=columns, the JSON of older rows can be dropped to reclaim
+-- space (then rebuild the tables or their clustered indexes):
+--   UPDATE hourly_solar_predictions SET weather_data = NULL;
+--   UPDATE hourly_wind_predictions SET weather_data = NULL;
@@ -0,0 +1,73 @@
+-- Typed REAL weather columns on the hourly prediction tables, for
+-- WEATHER_STORAGE=columns/both (Azure SQL / SQL Server), and a backfill from
+-- the weather_data JSON of existing rows, 50,000 rows per transaction.
+-- Rows whose JSON holds NaN (not valid JSON) keep NULLs. weather_data
+-- becomes nullable: under WEATHER_STORAGE=columns it is written as NULL.
+-- Run once per database:
+--   sqlcmd -S <server> -d <database> -U <user> -i database/migrations/005_weather_columns.sql
+
+-- hourly_solar_predictions
+ALTER TABLE hourly_solar_predictions ALTER COLUMN weather_data NVARCHAR(MAX) NULL;
+
+IF COL_LENGTH('hourly_solar_predictions', 'weather_wind_speed') IS NULL
+    ALTER TABLE hourly_solar_predictions ADD
+        weather_wind_speed REAL NULL,
+        weather_sunshine REAL NULL,
+        weather_air_pressure REAL NULL,
+        weather_radiation REAL NULL,
+        weather_air_temperature REAL NULL,
+        weather_relative_humidity REAL NULL;
+GO
+
+DECLARE @batch_start INT = (SELECT MIN(id) FROM hourly_solar_predictions);
+DECLARE @last_id INT = (SELECT MAX(id) FROM hourly_solar_predictions);
+WHILE @batch_start <= @last_id
+BEGIN
+    UPDATE hourly_solar_predictions
+        SET weather_wind_speed = TRY_CAST(JSON_VALUE(weather_data, '$.WindSpeed') AS REAL),
+            weather_sunshine = TRY_CAST(JSON_VALUE(weather_data, '$.Sunshine') AS REAL),
+            weather_air_pressure = TRY_CAST(JSON_VALUE(weather_data, '$.AirPressure') AS REAL),
+            weather_radiation = TRY_CAST(JSON_VALUE(weather_data, '$.Radiation') AS REAL),
+            weather_air_temperature = TRY_CAST(JSON_VALUE(weather_data, '$.AirTemperature') AS REAL),
+            weather_relative_humidity = TRY_CAST(JSON_VALUE(weather_data, '$.RelativeAirHumidity') AS REAL)
+        WHERE id >= @batch_start AND id < @batch_start + 50000 AND ISJSON(weather_data) = 1;
+    SET @batch_start = @batch_start + 50000;
+END;
+GO
+
+-- hourly_wind_predictions
+ALTER TABLE hourly_wind_predictions ALTER COLUMN weather_data NVARCHAR(MAX) NULL;
+
+IF COL_LENGTH('hourly_wind_predictions', 'weather_wind_speed') IS NULL
+    ALTER TABLE hourly_wind_predictions ADD
+        weather_wind_speed REAL NULL,
+        weather_temperature REAL NULL,
+        weather_relative_humidity REAL NULL,
+        weather_pressure REAL NULL,
+        weather_gust REAL NULL,
+        weather_wind_dir_dev REAL NULL,
+        weather_precipitation REAL NULL;
+GO
+
+DECLARE @batch_start INT = (SELECT MIN(id) FROM hourly_wind_predictions);
+DECLARE @last_id INT = (SELECT MAX(id) FROM hourly_wind_predictions);
+WHILE @batch_start <= @last_id
+BEGIN
+    UPDATE hourly_wind_predictions
+        SET weather_wind_speed = TRY_CAST(JSON_VALUE(weather_data, '$.wind_speed') AS REAL),
+            weather_temperature = TRY_CAST(JSON_VALUE(weather_data, '$.temperature') AS REAL),
+            weather_relative_humidity = TRY_CAST(JSON_VALUE(weather_data, '$.RH') AS REAL),
+            weather_pressure = TRY_CAST(JSON_VALUE(weather_data, '$.pressure') AS REAL),
+            weather_gust = TRY_CAST(JSON_VALUE(weather_data, '$.gust') AS REAL),
+            weather_wind_dir_dev = TRY_CAST(JSON_VALUE(weather_data, '$.wind_dir_dev') AS REAL),
+            weather_precipitation = TRY_CAST(JSON_VALUE(weather_data, '$.precipitation') AS REAL)
+        WHERE id >= @batch_start AND id < @batch_start + 50000 AND ISJSON(weather_data) = 1;
+    SET @batch_start = @batch_start + 50000;
+END;
+GO
+
+-- Once every reader uses the typed columns and the pipeline runs with
+-- WEATHER_STORAGE=columns, the JSON of older rows can be dropped to reclaim
+-- space (then rebuild the tables or their clustered indexes):
+--   UPDATE hourly_solar_predictions SET weather_data = NULL;
+--   UPDATE hourly_wind_predictions SET weather_data = NULL;
@@ -38,3 +38,30 @@ preload_app = True
 limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
+
+# Load the forecasting models in the master process (after the preloaded app)
+# so every forked worker shares the deserialized forests copy-on-write
+def when_ready(server):
+    from ml_pipeline.model_registry import preload_models
+    loaded = preload_models()
+    server.log.info("Preloaded forecasting models: %s", ", ".join(loaded) or "none")
+
+    # Forecast refreshes run in background job workers, not in the web workers.
+    # They are spawned, so they load the models themselves (packed artifacts are
+    # memory-mapped and shared); a supervisor thread here restarts any that die.
+    # Set JOB_WORKERS=0 when workers run separately via `flask run-job-workers`.
+    from ml_pipeline.jobs import start_workers
+    started = start_workers()
+    server.log.info("Started %d forecast job workers", len(started))
+
+# Pick up retrained model artifacts before forking replacement workers
+def pre_fork(server, worker):
+    from ml_pipeline.model_registry import reload_if_changed
+    reloaded = reload_if_changed()
+    if reloaded:
+        server.log.info("Reloaded changed forecasting models: %s", ", ".join(reloaded))
+
+# Stop the background job workers together with the master
+def on_exit(server):
+    from ml_pipeline.jobs import stop_workers
+    stop_workers()
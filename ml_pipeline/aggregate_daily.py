@@ -1,227 +1,746 @@
+import os
+import json
 from datetime import datetime, timedelta
-from collections import defaultdict
+import numpy as np
 import pandas as pd
+from ml_pipeline.db_pool import get_connection, get_dialect
+from ml_pipeline import response_cache
+from ml_pipeline.predict_hourly import QUANTILE_COLUMNS, encode_weather_values
+from ml_pipeline.prediction_batch import PredictionBatch, weather_columns_for
+
+def _prediction_columns(hourly_predictions):
+    """
+    Extract timestamps and predicted generation from hourly predictions
+
+    Args:
+        hourly_predictions (list, DataFrame or PredictionBatch): List of hourly
+            prediction dictionaries, a columnar prediction frame with a 'time'
+            (datetime64) or 'timestamp' (string) column, or a PredictionBatch
+
+    Returns:
+        tuple: (datetime64[ns] array, float64 generation array)
+    """
+    if isinstance(hourly_predictions, PredictionBatch):
+        return hourly_predictions.timestamps, hourly_predictions.predictions.astype(np.float64)
+
+    if isinstance(hourly_predictions, pd.DataFrame):
+        if 'time' in hourly_predictions:
+            times = pd.to_datetime(hourly_predictions['time']).to_numpy(dtype='datetime64[ns]')
+        else:
+            times = pd.to_datetime(hourly_predictions['timestamp'], format='%Y-%m-%d %H:%M:%S').to_numpy(dtype='datetime64[ns]')
+        generation = hourly_predictions['predicted_generation'].to_numpy(dtype=float)
+        return times, generation
+
+    times = pd.to_datetime([pred['timestamp'] for pred in hourly_predictions],
+                           format='%Y-%m-%d %H:%M:%S').to_numpy(dtype='datetime64[ns]')
+    generation = np.fromiter((pred['predicted_generation'] for pred in hourly_predictions),
+                             dtype=float, count=len(hourly_predictions))
+    return times, generation
+
+def _daily_totals(group_codes, generation, group_count):
+    # bincount accumulates in input order, so totals are bit-identical to
+    # summing the hourly values one by one
+    return np.bincount(group_codes, weights=generation, minlength=group_count)
 
 def aggregate_daily_generation(hourly_predictions, threshold_value):
     """
     Aggregate hourly predictions into daily predictions and check threshold
     
     Args:
-        hourly_predictions (list): List of hourly prediction dictionaries
+        hourly_predictions (list, DataFrame or PredictionBatch): List of hourly
+            prediction dictionaries, or columnar predictions for one plant
         threshold_value (float): Threshold value for recommendations
     
     Returns:
         list: List of daily predictions with aggregated generation values
     """
-    # Group predictions by date
-    daily_data = defaultdict(float)
-    
-    for pred in hourly_predictions:
-        timestamp = pred['timestamp']
-        dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-        date_str = dt.strftime('%Y-%m-%d')
-        
-        # Sum up hourly generation for each day
-        daily_data[date_str] += pred['predicted_generation']
-    
-    # Create list of daily predictions
-    daily_predictions = []
-    
-    for date_str, total_generation in daily_data.items():
-        # Check if prediction is below threshold
-        below_threshold = total_generation < threshold_value
-        
-        daily_predictions.append({
+    if len(hourly_predictions) == 0:
+        return []
+
+    times, generation = _prediction_columns(hourly_predictions)
+
+    # Group by calendar day; sort=True returns the days in date order
+    day_codes, days = pd.factorize(times.astype('datetime64[D]'), sort=True)
+    totals = _daily_totals(day_codes, generation, len(days))
+
+    # Check if prediction is below threshold
+    below_threshold = (totals < threshold_value).tolist()
+    date_strings = np.datetime_as_string(days, unit='D').tolist()
+
+    return [
+        {
             'date': date_str,
             'total_predicted_generation': round(total_generation, 2),
-            'below_threshold': below_threshold
-        })
+            'below_threshold': below
+        }
+        for date_str, total_generation, below in zip(date_strings, totals.tolist(), below_threshold)
+    ]
+
+def aggregate_daily_frame(frame, threshold_value):
+    """
+    Aggregate a multi-plant columnar prediction frame into daily totals per
+    plant in one pass
     
-    # Sort by date
-    daily_predictions.sort(key=lambda x: x['date'])
+    Args:
+        frame (DataFrame or PredictionBatch): Prediction frame with plant_id,
+            time and predicted_generation columns, or a PredictionBatch
+        threshold_value (float or dict): Threshold for every plant, or a
+            mapping of plant_id -> threshold
     
-    return daily_predictions
+    Returns:
+        DataFrame: plant_id, date, total_predicted_generation and
+            below_threshold, sorted by plant and date
+    """
+    columns = ['plant_id', 'date', 'total_predicted_generation', 'below_threshold']
+    if len(frame) == 0:
+        return pd.DataFrame(columns=columns)
+
+    times, generation = _prediction_columns(frame)
+    frame_plant_ids = frame.plant_ids if isinstance(frame, PredictionBatch) else frame['plant_id'].to_numpy()
+    plant_codes, plant_ids = pd.factorize(frame_plant_ids, sort=True)
+    day_codes, days = pd.factorize(times.astype('datetime64[D]'), sort=True)
+
+    # One group per (plant, day); codes are ordered by plant then day
+    group_keys, group_codes = np.unique(plant_codes.astype(np.int64) * len(days) + day_codes, return_inverse=True)
+    totals = _daily_totals(group_codes.ravel(), generation, len(group_keys))
+
+    group_plants = np.asarray(plant_ids)[group_keys // len(days)]
+    if isinstance(threshold_value, dict):
+        thresholds = pd.Series(group_plants).map(threshold_value).to_numpy(dtype=float)
+    else:
+        thresholds = threshold_value
+
+    return pd.DataFrame({
+        'plant_id': group_plants,
+        'date': np.datetime_as_string(days[group_keys % len(days)], unit='D'),
+        'total_predicted_generation': [round(total, 2) for total in totals.tolist()],
+        'below_threshold': totals < thresholds
+    })
+
+def pivot_hourly(plant_ids, timestamps, values):
+    """
+    Pivot hourly rows of many plants into dense (hours x plants) matrices
+    with one scatter per value column. The hour axis is every hour any plant
+    has a row for, so each plant's column lines up with the others; cells of
+    hours a plant has no row for are NaN and marked in the present mask.
+    
+    Args:
+        plant_ids (array-like): Plant of each row; plants keep their order of
+            first appearance
+        timestamps (array-like): Timestamp of each row
+        values (dict): Mapping of name -> per-row float values (NaN for NULL)
+    
+    Returns:
+        tuple: (hours as sorted datetime64 array, plant ids, boolean
+            present matrix, dict of name -> float64 matrix). Of several rows
+            for the same plant and hour, the last one wins.
+    """
+    # DatetimeIndex parses datetime objects far faster than np.asarray
+    hour_codes, hours = pd.factorize(pd.DatetimeIndex(timestamps), sort=True)
+    plant_codes, plants = pd.factorize(np.asarray(plant_ids), sort=False)
+    shape = (len(hours), len(plants))
+
+    # Keep only the last row of each (hour, plant) cell; a fancy-index
+    # assignment alone does not guarantee which duplicate is written
+    cells = hour_codes.astype(np.int64) * len(plants) + plant_codes
+    _, last_from_end = np.unique(cells[::-1], return_index=True)
+    rows = len(cells) - 1 - last_from_end
+    cells = cells[rows]
+
+    present = np.zeros(shape, dtype=bool)
+    present.flat[cells] = True
+
+    matrices = {}
+    for name, column in values.items():
+        matrix = np.full(shape, np.nan)
+        matrix.flat[cells] = np.asarray(column, dtype=np.float64)[rows]
+        matrices[name] = matrix
+
+    return hours.to_numpy(dtype='datetime64[ns]'), np.asarray(plants), present, matrices
+
+# Hourly and daily prediction tables for each plant type
+PREDICTION_TABLES = {
+    'solar': ('hourly_solar_predictions', 'daily_solar_predictions'),
+    'wind': ('hourly_wind_predictions', 'daily_wind_predictions'),
+}
+
+# Typed REAL columns the hourly weather values are stored in, per weather
+# column of the predictions (see weather_storage)
+WEATHER_STORAGE_COLUMNS = {
+    'solar': {'WindSpeed': 'weather_wind_speed', 'Sunshine': 'weather_sunshine',
+              'AirPressure': 'weather_air_pressure', 'Radiation': 'weather_radiation',
+              'AirTemperature': 'weather_air_temperature', 'RelativeAirHumidity': 'weather_relative_humidity'},
+    'wind': {'wind_speed': 'weather_wind_speed', 'temperature': 'weather_temperature',
+             'RH': 'weather_relative_humidity', 'pressure': 'weather_pressure', 'gust': 'weather_gust',
+             'wind_dir_dev': 'weather_wind_dir_dev', 'precipitation': 'weather_precipitation'},
+}
+
+def weather_storage():
+    """
+    How hourly weather values are written (WEATHER_STORAGE):
+      'json'    - weather_data JSON text only (default)
+      'columns' - the typed WEATHER_STORAGE_COLUMNS only, weather_data NULL
+      'both'    - both, while readers of weather_data move over
+    The typed columns need database/migrations/005_weather_columns.sql.
+    """
+    storage = os.environ.get('WEATHER_STORAGE', 'json').lower()
+    if storage not in ('json', 'columns', 'both'):
+        raise ValueError(f"Unsupported WEATHER_STORAGE: {storage}")
+    return storage
+
+def forecast_dates_index():
+    """
+    Whether the writer keeps forecast_dates and the dashboards list dates from
+    it (FORECAST_DATES_INDEX, off by default: the table needs
+    database/migrations/003_forecast_dates.sql; apply or re-run it right
+    before turning this on, its backfill picks up the dates saved until then)
+    """
+    return os.environ.get('FORECAST_DATES_INDEX', '0').lower() not in ('0', 'false', 'no')
+
+def _hourly_value_columns(hourly_predictions):
+    """
+    The optional hourly columns a plant's predictions carry: the
+    QUANTILE_COLUMNS bands and the input_hash fingerprint
+    """
+    if isinstance(hourly_predictions, PredictionBatch):
+        columns = list(QUANTILE_COLUMNS) if hourly_predictions.bands is not None else []
+        return columns + (['input_hash'] if hourly_predictions.fingerprints is not None else [])
+
+    first = hourly_predictions[0]
+    return [column for column in QUANTILE_COLUMNS + ['input_hash'] if column in first]
+
+def _hourly_rows(plant_id, hourly_predictions, value_columns=(), plant_type="solar", store_json=True):
+    """
+    Build staging rows for hourly predictions: (plant_id, timestamp,
+    weather_data, predicted_generation), followed by one value per column in
+    value_columns (see _hourly_value_columns and WEATHER_STORAGE_COLUMNS;
+    None where the predictions lack it). weather_data is None unless
+    store_json. Later rows for the same timestamp win, matching the old
+    row-by-row update behaviour.
+    """
+    value_columns = list(value_columns)
+    feature_of = {column: feature for feature, column in WEATHER_STORAGE_COLUMNS[plant_type].items()}
+
+    if isinstance(hourly_predictions, PredictionBatch):
+        # Straight from the arrays; no timestamp or JSON strings to re-parse
+        timestamps = pd.DatetimeIndex(hourly_predictions.timestamps).to_pydatetime()
+        predictions = hourly_predictions.predictions.astype(np.float64).tolist()
+        if store_json:
+            weather_json = encode_weather_values(hourly_predictions.features, hourly_predictions.feature_names)
+        else:
+            weather_json = [None] * len(predictions)
+
+        values = []
+        for column in value_columns:
+            if column in QUANTILE_COLUMNS and hourly_predictions.bands is not None:
+                # NaN bands (backends without quantiles) are stored as NULL
+                band = hourly_predictions.bands[:, QUANTILE_COLUMNS.index(column)].astype(np.float64).tolist()
+                values.append([None if value != value else value for value in band])
+            elif column == 'input_hash' and hourly_predictions.fingerprints is not None:
+                values.append(hourly_predictions.fingerprints.tolist())
+            elif feature_of.get(column) in hourly_predictions.feature_names:
+                weather = hourly_predictions.features[:, hourly_predictions.feature_names.index(feature_of[column])]
+                values.append([None if value != value else value for value in weather.tolist()])
+            else:
+                values.append([None] * len(predictions))
+
+        rows = {}
+        for timestamp, weather_data, predicted, *extra in zip(timestamps, weather_json, predictions, *values):
+            rows[timestamp] = (plant_id, timestamp, weather_data, predicted, *extra)
+        return list(rows.values())
+
+    timestamps = pd.to_datetime([pred['timestamp'] for pred in hourly_predictions],
+                                format='%Y-%m-%d %H:%M:%S').to_pydatetime()
+    rows = {}
+    typed_weather = any(column in feature_of for column in value_columns)
+
+    for timestamp, pred in zip(timestamps, hourly_predictions):
+        weather = json.loads(pred['weather_data']) if typed_weather else {}
+        extra = tuple(None if value != value else value
+                      for value in (weather.get(feature_of[column]) if column in feature_of else pred.get(column)
+                                    for column in value_columns))
+        weather_data = pred['weather_data'] if store_json else None
+        rows[timestamp] = (plant_id, timestamp, weather_data, pred['predicted_generation']) + extra
+
+    return list(rows.values())
+
+def _daily_rows(plant_id, daily_predictions):
+    """
+    Build staging rows for daily predictions (one per date)
+    """
+    rows = {}
+
+    for pred in daily_predictions:
+        date_obj = datetime.strptime(pred['date'], '%Y-%m-%d').date()
+        is_below = 1 if pred['below_threshold'] else 0
+        recommendation = "Energy generation below threshold" if pred['below_threshold'] else None
+        rows[date_obj] = (plant_id, date_obj, pred['total_predicted_generation'], is_below, recommendation)
+
+    return list(rows.values())
+
+def _count_merge_actions(cursor):
+    """
+    Count the INSERT/UPDATE actions returned by a MERGE ... OUTPUT $action
+    """
+    created = updated = 0
+
+    for (action,) in cursor.fetchall():
+        if action == 'INSERT':
+            created += 1
+        elif action == 'UPDATE':
+            updated += 1
+
+    return created, updated
+
+# SQL types of the optional hourly columns in the staging table
+HOURLY_VALUE_TYPES = {'predicted_p10': 'FLOAT', 'predicted_p50': 'FLOAT', 'predicted_p90': 'FLOAT',
+                      'input_hash': 'BIGINT'}
+HOURLY_VALUE_TYPES.update({column: 'REAL' for columns in WEATHER_STORAGE_COLUMNS.values()
+                           for column in columns.values()})
+
+def _merge_hourly(cursor, hourly_table, rows, extra_columns=()):
+    """
+    Upsert hourly rows: bulk-load a temp staging table, then one MERGE. The
+    optional columns (quantile bands, input fingerprint, typed weather) are
+    only written when listed in extra_columns, matching the rows from
+    _hourly_rows.
+    """
+    import pyodbc
+
+    value_columns = ['predicted_generation'] + list(extra_columns)
+
+    stage_columns = ',\n        '.join(f"{column} {HOURLY_VALUE_TYPES.get(column, 'FLOAT')} NULL"
+                                       for column in value_columns)
+    cursor.execute(f"""
+    IF OBJECT_ID('tempdb..#hourly_stage') IS NOT NULL DROP TABLE #hourly_stage;
+    CREATE TABLE #hourly_stage (
+        plant_id INT NOT NULL,
+        timestamp DATETIME NOT NULL,
+        weather_data NVARCHAR(MAX) NULL,
+        {stage_columns}
+    )
+    """)
+
+    columns = ['plant_id', 'timestamp', 'weather_data'] + value_columns
+    cursor.fast_executemany = True
+    # Bind the JSON column as NVARCHAR(MAX) so fast_executemany doesn't size it per row
+    cursor.setinputsizes([None, None, (pyodbc.SQL_WVARCHAR, 0, 0)] + [None] * len(value_columns))
+    cursor.executemany(
+        f"INSERT INTO #hourly_stage ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        rows
+    )
+    cursor.setinputsizes(None)
+
+    updates = ',\n                   '.join(f"{column} = source.{column}" for column in ['weather_data'] + value_columns)
+    cursor.execute(f"""
+    MERGE {hourly_table} WITH (HOLDLOCK) AS target
+    USING #hourly_stage AS source
+    ON target.plant_id = source.plant_id AND target.timestamp = source.timestamp
+    WHEN MATCHED THEN
+        UPDATE SET {updates},
+                   created_at = GETDATE()
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT ({', '.join(columns)}, created_at)
+        VALUES ({', '.join(f'source.{column}' for column in columns)}, GETDATE())
+    OUTPUT $action;
+    """)
+    counts = _count_merge_actions(cursor)
+
+    cursor.execute("DROP TABLE #hourly_stage")
+    return counts
+
+def _merge_daily(cursor, daily_table, rows):
+    """
+    Upsert daily rows: bulk-load a temp staging table, then one MERGE
+    """
+    cursor.execute("""
+    IF OBJECT_ID('tempdb..#daily_stage') IS NOT NULL DROP TABLE #daily_stage;
+    CREATE TABLE #daily_stage (
+        plant_id INT NOT NULL,
+        date DATE NOT NULL,
+        total_predicted_generation FLOAT NULL,
+        recommendation_status BIT NOT NULL,
+        recommendation_message NVARCHAR(255) NULL
+    )
+    """)
+
+    cursor.fast_executemany = True
+    cursor.executemany(
+        "INSERT INTO #daily_stage (plant_id, date, total_predicted_generation, recommendation_status, recommendation_message) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+
+    cursor.execute(f"""
+    MERGE {daily_table} WITH (HOLDLOCK) AS target
+    USING #daily_stage AS source
+    ON target.plant_id = source.plant_id AND target.date = source.date
+    WHEN MATCHED THEN
+        UPDATE SET total_predicted_generation = source.total_predicted_generation,
+                   recommendation_status = source.recommendation_status,
+                   recommendation_message = source.recommendation_message,
+                   created_at = GETDATE()
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (plant_id, date, total_predicted_generation, recommendation_status, recommendation_message, created_at)
+        VALUES (source.plant_id, source.date, source.total_predicted_generation,
+                source.recommendation_status, source.recommendation_message, GETDATE())
+    OUTPUT $action;
+    """)
+    counts = _count_merge_actions(cursor)
+
+    cursor.execute("DROP TABLE #daily_stage")
+    return counts
+
+def _merge_forecast_dates(cursor, plant_type, hourly_rows):
+    """
+    Record the dates of saved hourly rows in forecast_dates, the small
+    index the dashboards list available dates from instead of a DISTINCT
+    over every hourly timestamp
+    """
+    dates = sorted({row[1].date() for row in hourly_rows})
+    cursor.fast_executemany = False
+    cursor.executemany(
+        "MERGE forecast_dates WITH (HOLDLOCK) AS target "
+        "USING (VALUES (?, ?)) AS source (plant_type, date) "
+        "ON target.plant_type = source.plant_type AND target.date = source.date "
+        "WHEN NOT MATCHED THEN INSERT (plant_type, date) VALUES (source.plant_type, source.date);",
+        [(plant_type, day) for day in dates]
+    )
+    return len(dates)
+
+def _upsert_columns(columns, keys):
+    """
+    ON DUPLICATE KEY UPDATE assignments for every non-key column
+    """
+    return ', '.join(f"{column} = VALUES({column})" for column in columns if column not in keys)
+
+def _upsert_counts(cursor, row_count):
+    """
+    Approximate created/updated counts of an INSERT ... ON DUPLICATE KEY
+    UPDATE, from the affected rows MySQL reports: 1 per insert, 2 per
+    changed row, but 0 for a matched row left as is (e.g. rewritten within
+    the same second as created_at), and 1 per match when the connection sets
+    CLIENT.FOUND_ROWS. Unchanged rows therefore count as created, and under
+    FOUND_ROWS every row does; the total is exact.
+    """
+    updated = min(max(cursor.rowcount - row_count, 0), row_count)
+    return row_count - updated, updated
+
+def _upsert_hourly_mysql(cursor, hourly_table, rows, extra_columns=()):
+    """
+    MySQL counterpart of _merge_hourly: one INSERT ... ON DUPLICATE KEY
+    UPDATE on the (plant_id, timestamp) unique key, which pymysql's
+    executemany sends as multi-row statements (only while VALUES holds
+    nothing but placeholders; new rows get created_at from its default)
+    """
+    columns = ['plant_id', 'timestamp', 'weather_data', 'predicted_generation'] + list(extra_columns)
+    cursor.executemany(
+        f"INSERT INTO {hourly_table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON DUPLICATE KEY UPDATE {_upsert_columns(columns, ('plant_id', 'timestamp'))}, created_at = NOW()",
+        rows
+    )
+    return _upsert_counts(cursor, len(rows))
+
+def _upsert_daily_mysql(cursor, daily_table, rows):
+    """
+    MySQL counterpart of _merge_daily, on the (plant_id, date) unique key
+    """
+    columns = ['plant_id', 'date', 'total_predicted_generation', 'recommendation_status', 'recommendation_message']
+    cursor.executemany(
+        f"INSERT INTO {daily_table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON DUPLICATE KEY UPDATE {_upsert_columns(columns, ('plant_id', 'date'))}, created_at = NOW()",
+        rows
+    )
+    return _upsert_counts(cursor, len(rows))
+
+def _upsert_forecast_dates_mysql(cursor, plant_type, hourly_rows):
+    """
+    MySQL counterpart of _merge_forecast_dates
+    """
+    dates = sorted({row[1].date() for row in hourly_rows})
+    cursor.executemany("INSERT IGNORE INTO forecast_dates (plant_type, date) VALUES (%s, %s)",
+                       [(plant_type, day) for day in dates])
+    return len(dates)
+
+# Upsert statements per SQL dialect: (hourly, daily, forecast dates). Each
+# writes a whole batch in one statement against the unique
+# (plant_id, timestamp) / (plant_id, date) keys, without reading first.
+UPSERTS = {
+    'mssql': (_merge_hourly, _merge_daily, _merge_forecast_dates),
+    'mysql': (_upsert_hourly_mysql, _upsert_daily_mysql, _upsert_forecast_dates_mysql),
+}
+
+def save_predictions_bulk(plant_predictions, plant_type="solar"):
+    """
+    Save hourly and daily predictions for one or many plants in a single
+    batch: all rows are applied with one upsert per table (a staged MERGE on
+    SQL Server, INSERT ... ON DUPLICATE KEY UPDATE on MySQL), instead of a
+    SELECT + UPDATE/INSERT per row.
+    
+    Args:
+        plant_predictions (dict): Mapping of plant_id -> (hourly_predictions, daily_predictions),
+            hourly predictions as a list of dicts or a PredictionBatch
+        plant_type (str): 'solar' or 'wind'
+    
+    Returns:
+        dict: Counts of created/updated hourly and daily records. On MySQL
+            the created/updated split is approximate (see _upsert_counts)
+            and 'approximate_counts' is set.
+    """
+    counts = {'created_hourly': 0, 'updated_hourly': 0, 'created_daily': 0, 'updated_daily': 0}
+
+    # Optional hourly columns carried by any plant; the others get NULLs
+    extra_columns = []
+    for hourly_predictions, _ in plant_predictions.values():
+        if len(hourly_predictions):
+            extra_columns += [column for column in _hourly_value_columns(hourly_predictions)
+                              if column not in extra_columns]
+    storage = weather_storage()
+    if storage != 'json':
+        extra_columns += list(WEATHER_STORAGE_COLUMNS[plant_type].values())
+
+    hourly_rows = []
+    daily_rows = []
+    for plant_id, (hourly_predictions, daily_predictions) in plant_predictions.items():
+        if len(hourly_predictions):
+            hourly_rows.extend(_hourly_rows(plant_id, hourly_predictions, extra_columns, plant_type,
+                                            store_json=storage != 'columns'))
+        if daily_predictions:
+            daily_rows.extend(_daily_rows(plant_id, daily_predictions))
+
+    if not hourly_rows and not daily_rows:
+        return counts
+
+    # Choose the appropriate tables based on plant type
+    hourly_table, daily_table = PREDICTION_TABLES[plant_type]
+    dialect = get_dialect()
+    upsert_hourly, upsert_daily, upsert_dates = UPSERTS[dialect]
+    if dialect == 'mysql':
+        counts['approximate_counts'] = 1
+
+    # Draw a connection from the shared pool; close() returns it
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        if hourly_rows:
+            counts['created_hourly'], counts['updated_hourly'] = upsert_hourly(cursor, hourly_table, hourly_rows, extra_columns)
+            if forecast_dates_index():
+                upsert_dates(cursor, plant_type, hourly_rows)
+        if daily_rows:
+            counts['created_daily'], counts['updated_daily'] = upsert_daily(cursor, daily_table, daily_rows)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    # Cached chart responses of this plant type are now out of date
+    response_cache.invalidate(plant_type)
+
+    print(f"Saved {plant_type} predictions for {len(plant_predictions)} plants: "
+          f"{len(hourly_rows)} hourly rows, {len(daily_rows)} daily rows")
+    return counts
 
 def save_predictions_to_db(hourly_predictions, daily_predictions, plant_id, db, plant_type="solar"):
     """
     Save hourly and daily predictions to the database
     
     Args:
-        hourly_predictions (list): List of hourly prediction dictionaries
+        hourly_predictions (list or PredictionBatch): Hourly predictions
         daily_predictions (list): List of daily prediction dictionaries
         plant_id (int): ID of the plant
-        db: SQLAlchemy database connection
+        db: SQLAlchemy database connection (unused, kept for compatibility)
         plant_type (str): 'solar' or 'wind'
+    
+    Returns:
+        dict: Counts of created/updated hourly and daily records (None on error)
     """
     print(f"==== Starting save_predictions_to_db - Plant ID: {plant_id}, Type: {plant_type} ====")
     print(f"Hourly predictions: {len(hourly_predictions)}, Daily predictions: {len(daily_predictions)}")
     
-    # Import necessary modules without importing models directly
-    import pyodbc
-    import json
-    from datetime import datetime
-    import os
-    
+    counts = None
     try:
-        # Connect directly to Azure SQL Server
-        server = os.environ.get('AZURE_SQL_SERVER', 'localhost')
-        database = os.environ.get('AZURE_SQL_DATABASE', 'renewable_energy')
-        username = os.environ.get('AZURE_SQL_USERNAME', 'root')
-        password = os.environ.get('AZURE_SQL_PASSWORD', '')
-        
-        conn_str = (
-            f"DRIVER={{ODBC Driver 18 for SQL Server}};"
-            f"SERVER={server};"
-            f"DATABASE={database};"
-            f"UID={username};"
-            f"PWD={password};"
-            f"Encrypt=yes;"
-            f"TrustServerCertificate=no;"
-        )
-        
-        conn = pyodbc.connect(conn_str)
-        
-        if not conn:
-            print("Error: Could not connect to the database")
-            return
-            
-        cursor = conn.cursor()
-        
-        # Choose the appropriate table based on plant type
-        if plant_type == "solar":
-            hourly_table = "hourly_solar_predictions"
-            daily_table = "daily_solar_predictions"
-        else:  # wind
-            hourly_table = "hourly_wind_predictions"
-            daily_table = "daily_wind_predictions"
-        
-        updated_hourly = 0
-        created_hourly = 0
-        
-        # Process hourly predictions
-        for pred in hourly_predictions:
-            timestamp = datetime.strptime(pred['timestamp'], '%Y-%m-%d %H:%M:%S')
-            timestamp_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-            print(f"Processing hourly prediction for: {timestamp_str}")
-            
-            # Check if record exists
-            check_query = f"""
-            SELECT id FROM {hourly_table} 
-            WHERE plant_id = ? AND timestamp = ?
-            """
-            cursor.execute(check_query, (plant_id, timestamp_str))
-            existing_record = cursor.fetchone()
-            
-            weather_data_json = pred['weather_data']
-            predicted_gen = pred['predicted_generation']
-            
-            if existing_record:
-                # Update existing record
-                update_query = f"""
-                UPDATE {hourly_table}
-                SET weather_data = ?, predicted_generation = ?, created_at = GETDATE()
-                WHERE plant_id = ? AND timestamp = ?
-                """
-                cursor.execute(update_query, (weather_data_json, predicted_gen, plant_id, timestamp_str))
-                updated_hourly += 1
-                print(f"Updated hourly prediction for timestamp: {timestamp_str}")
-            else:
-                # Insert new record
-                insert_query = f"""
-                INSERT INTO {hourly_table} (plant_id, timestamp, weather_data, predicted_generation, created_at)
-                VALUES (?, ?, ?, ?, GETDATE())
-                """
-                cursor.execute(insert_query, (plant_id, timestamp_str, weather_data_json, predicted_gen))
-                created_hourly += 1
-                print(f"Created new hourly prediction for timestamp: {timestamp_str}")
-        
-        updated_daily = 0
-        created_daily = 0
-        
-        # Process daily predictions
-        for pred in daily_predictions:
-            date_obj = datetime.strptime(pred['date'], '%Y-%m-%d').date()
-            date_str = date_obj.strftime('%Y-%m-%d')
-            print(f"Processing daily prediction for: {date_str}")
-            
-            # Check if record exists
-            check_query = f"""
-            SELECT id FROM {daily_table} 
-            WHERE plant_id = ? AND date = ?
-            """
-            cursor.execute(check_query, (plant_id, date_str))
-            existing_record = cursor.fetchone()
-            
-            pred_gen = pred['total_predicted_generation']
-            is_below = 1 if pred['below_threshold'] else 0
-            recommendation = "Energy generation below threshold" if pred['below_threshold'] else None
-            
-            if existing_record:
-                # Update existing record
-                update_query = f"""
-                UPDATE {daily_table}
-                SET total_predicted_generation = ?, recommendation_status = ?, recommendation_message = ?, created_at = GETDATE()
-                WHERE plant_id = ? AND date = ?
-                """
-                cursor.execute(update_query, (pred_gen, is_below, recommendation, plant_id, date_str))
-                updated_daily += 1
-                print(f"Updated daily prediction for date: {date_str}")
-            else:
-                # Insert new record
-                insert_query = f"""
-                INSERT INTO {daily_table} (plant_id, date, total_predicted_generation, recommendation_status, recommendation_message, created_at)
-                VALUES (?, ?, ?, ?, ?, GETDATE())
-                """
-                cursor.execute(insert_query, (plant_id, date_str, pred_gen, is_below, recommendation))
-                created_daily += 1
-                print(f"Created new daily prediction for date: {date_str}")
-        
-        # Commit changes and close connection
-        conn.commit()
+        counts = save_predictions_bulk({plant_id: (hourly_predictions, daily_predictions)}, plant_type)
         print(f"Database updated successfully!")
-        print(f"Hourly records: {updated_hourly} updated, {created_hourly} created")
-        print(f"Daily records: {updated_daily} updated, {created_daily} created")
-        
+        print(f"Hourly records: {counts['updated_hourly']} updated, {counts['created_hourly']} created")
+        print(f"Daily records: {counts['updated_daily']} updated, {counts['created_daily']} created")
     except Exception as e:
-        if 'conn' in locals():
-            conn.rollback()
         print(f"ERROR updating database: {str(e)}")
         import traceback
         print(traceback.format_exc())
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
     
     print(f"==== Completed save_predictions_to_db ====")
+    return counts
 
-def filter_daylight_hours(hourly_predictions):
+def _fetch_plant_rows(select, plant_ids, start=None, end=None, chunk_size=500, where=None):
     """
-    Filter predictions to only include daylight hours (7:00 to 20:00)
+    Run a SELECT over hourly rows for plants in chunks of chunk_size ids,
+    with plant_id IN (...) and the optional timestamp range as its WHERE
+
+    Args:
+        select (str): SELECT ... FROM <table>
+        plant_ids (iterable): Plants to read
+        start, end (datetime, optional): Timestamp range, end exclusive
+        chunk_size (int): Plants per query, within SQL Server's parameter limit
+        where (str, optional): Further condition on the rows
+
+    Returns:
+        list: Row tuples
+    """
+    plant_ids = [int(plant_id) for plant_id in plant_ids]
+    placeholder = '%s' if get_dialect() == 'mysql' else '?'
+
+    rows = []
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for offset in range(0, len(plant_ids), chunk_size):
+            chunk = plant_ids[offset:offset + chunk_size]
+            query = f"{select} WHERE plant_id IN ({', '.join([placeholder] * len(chunk))})"
+            if where:
+                query += f" AND {where}"
+            params = list(chunk)
+            if start is not None:
+                query += f" AND timestamp >= {placeholder}"
+                params.append(start)
+            if end is not None:
+                query += f" AND timestamp < {placeholder}"
+                params.append(end)
+            cursor.execute(query, params)
+            rows.extend(tuple(row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+        conn.close()
+
+    return rows
+
+def load_input_fingerprints(plant_ids, plant_type="solar", start=None, chunk_size=500):
+    """
+    Read the stored input fingerprints and predictions of plants' hourly
+    rows, for predict_hourly_generation_batch(known=...) to skip rows whose
+    inputs have not changed. Rows written before fingerprinting (NULL
+    input_hash) are left out, so they are always recomputed.
+
+    Args:
+        plant_ids (iterable): Plants to read
+        plant_type (str): 'solar' or 'wind'
+        start (datetime, optional): Earliest timestamp to read
+        chunk_size (int): Plants per query, within SQL Server's parameter limit
+
+    Returns:
+        DataFrame: plant_id, time, input_hash (int64), predicted_generation
+            and the QUANTILE_COLUMNS (NaN where NULL)
+    """
+    hourly_table, _ = PREDICTION_TABLES[plant_type]
+    columns = ['plant_id', 'time', 'input_hash', 'predicted_generation'] + QUANTILE_COLUMNS
+
+    rows = _fetch_plant_rows(f"SELECT plant_id, timestamp, input_hash, predicted_generation, "
+                             f"{', '.join(QUANTILE_COLUMNS)} FROM {hourly_table}",
+                             plant_ids, start, chunk_size=chunk_size, where="input_hash IS NOT NULL")
+
+    known = pd.DataFrame.from_records(rows, columns=columns)
+    known['plant_id'] = known['plant_id'].astype(np.int64)
+    known['time'] = pd.to_datetime(known['time']).astype('datetime64[ns]')
+    known['input_hash'] = known['input_hash'].astype(np.int64)
+    value_columns = ['predicted_generation'] + QUANTILE_COLUMNS
+    known[value_columns] = known[value_columns].astype(np.float64)
+    return known
+
+def _hourly_weather_frame(rows, plant_type, typed):
+    """
+    Frame of hourly weather rows read by load_hourly_weather: rows are
+    (plant_id, timestamp, predicted_generation, actual_generation) followed
+    by the typed weather columns, or by weather_data JSON when not typed
+    """
+    weather_columns = weather_columns_for(plant_type)
+    head = ['plant_id', 'time', 'predicted_generation', 'actual_generation']
+
+    if typed:
+        frame = pd.DataFrame.from_records(rows, columns=head + weather_columns)
+    else:
+        frame = pd.DataFrame.from_records([row[:4] for row in rows], columns=head)
+        weather = [json.loads(row[4]) if row[4] else {} for row in rows]
+        values = [[values.get(column) for column in weather_columns] for values in weather]
+        frame[weather_columns] = pd.DataFrame.from_records(values, columns=weather_columns)
+
+    frame['plant_id'] = frame['plant_id'].astype(np.int64)
+    frame['time'] = pd.to_datetime(frame['time']).astype('datetime64[ns]')
+    value_columns = ['predicted_generation', 'actual_generation'] + weather_columns
+    frame[value_columns] = frame[value_columns].astype(np.float64)
+    return frame
+
+def load_hourly_weather(plant_ids, plant_type="solar", start=None, end=None, chunk_size=500):
+    """
+    Read the stored weather values of plants' hourly predictions with the
+    predicted and actual generation, e.g. to backtest against actuals.
+    Outside WEATHER_STORAGE=json they come from the typed columns, without
+    parsing a JSON string per row.
+
+    Args:
+        plant_ids (iterable): Plants to read
+        plant_type (str): 'solar' or 'wind'
+        start, end (datetime, optional): Timestamp range, end exclusive
+        chunk_size (int): Plants per query
+
+    Returns:
+        DataFrame: plant_id, time, predicted_generation, actual_generation
+            and the plant type's weather columns (NaN where NULL)
+    """
+    hourly_table, _ = PREDICTION_TABLES[plant_type]
+    typed = weather_storage() != 'json'
+    weather_select = (', '.join(WEATHER_STORAGE_COLUMNS[plant_type][column]
+                                for column in weather_columns_for(plant_type)) if typed else 'weather_data')
+
+    rows = _fetch_plant_rows(f"SELECT plant_id, timestamp, predicted_generation, actual_generation, "
+                             f"{weather_select} FROM {hourly_table}",
+                             plant_ids, start, end, chunk_size)
+    return _hourly_weather_frame(rows, plant_type, typed)
+
+def daylight_mask(times):
+    """
+    Boolean mask of timestamps within daylight hours (7:00 to 20:00)
     
     Args:
-        hourly_predictions (list): List of hourly prediction dictionaries
+        times (array-like): datetime64 values
     
     Returns:
-        list: Filtered list of hourly predictions
+        ndarray: True where the hour is between 7 and 20 inclusive
+    """
+    hours = pd.DatetimeIndex(times).hour.to_numpy()
+    return (hours >= 7) & (hours <= 20)
+
+def filter_daylight_hours(hourly_predictions):
     """
-    filtered_predictions = []
+    Filter predictions to only include daylight hours (7:00 to 20:00)
     
-    for pred in hourly_predictions:
-        timestamp = pred['timestamp']
-        dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-        
-        # Keep only hours between 7:00 and 20:00
-        if 7 <= dt.hour <= 20:
-            filtered_predictions.append(pred)
+    Args:
+        hourly_predictions (list, DataFrame or PredictionBatch): List of hourly
+            prediction dictionaries, or columnar predictions
     
-    return filtered_predictions
+    Returns:
+        list, DataFrame or PredictionBatch: Filtered predictions, same type as the input
+    """
+    if len(hourly_predictions) == 0:
+        return [] if isinstance(hourly_predictions, list) else hourly_predictions
+
+    times, _ = _prediction_columns(hourly_predictions)
+    mask = daylight_mask(times)
+
+    if isinstance(hourly_predictions, PredictionBatch):
+        return hourly_predictions.select(mask)
+    if isinstance(hourly_predictions, pd.DataFrame):
+        return hourly_predictions[mask]
+
+    return [pred for pred, keep in zip(hourly_predictions, mask.tolist()) if keep]
 
 if __name__ == "__main__":
     # Test with sample hourly predictions
-    from fetch_weather import fetch_weather_data
-    from predict_hourly import predict_hourly_generation
+    from ml_pipeline.fetch_weather import fetch_weather_data
+    from ml_pipeline.predict_hourly import predict_hourly_generation
     
     weather_data = fetch_weather_data()
     hourly_predictions = predict_hourly_generation(weather_data, "solar", 1)
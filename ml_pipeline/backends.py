@@ -0,0 +1,264 @@
+"""
+Model backends: what turns a plant type's feature columns into predicted
+output. predict_hourly prepares the features and applies the domain rules
+around whichever backend is configured for the plant type:
+
+    'rf'          - the deployed random forest (MODEL_FILES), evaluated by
+                    the FOREST_ENGINE; the default
+    'hgb'         - a HistGradientBoostingRegressor on the raw features
+    'power_curve' - wind only: a piecewise-linear power curve over wind speed,
+                    fitted to the theoretical_output_kW column of the wind
+                    training data and scaled to the measured output
+
+Alternative backends are trained and deployed with
+    python -m ml_pipeline.train_models --type wind --backend power_curve --deploy
+and selected per plant type with SOLAR_MODEL_BACKEND / WIND_MODEL_BACKEND.
+"""
+import os
+import weakref
+
+import numpy as np
+
+from ml_pipeline.model_registry import BACKEND_FILES, get_model, get_backend_model, get_estimator
+from ml_pipeline.flat_forest import flat_forest_for
+
+# How the forests are evaluated:
+#   'sklearn' - the fitted estimator's own predict()
+#   'flat'    - ml_pipeline.flat_forest: all trees flattened into NumPy node
+#               arrays and walked together, avoiding sklearn's per-tree
+#               dispatch on small batches; matches sklearn to within 1e-9
+#   'auto'    - 'flat' for batches up to FLAT_FOREST_MAX_ROWS rows, sklearn
+#               above that, where its compiled per-tree loop is faster
+# Unset, it is 'sklearn' for pickled models and 'auto' for packed ones (see
+# ml_pipeline.package_models), which load the sklearn estimator only once a
+# batch larger than FLAT_FOREST_MAX_ROWS comes along, e.g. a fleet refresh.
+FOREST_ENGINES = ('sklearn', 'flat', 'auto')
+
+# Crossover measured by benchmarks/bench_flat_forest.py (single core)
+FLAT_FOREST_MAX_ROWS = 5000
+
+DEFAULT_BACKEND = 'rf'
+
+# Wind speed bins the power curve is fitted over (m/s)
+POWER_CURVE_BIN_WIDTH = 0.25
+
+def _forest_engine(entry):
+    default = 'auto' if entry.get('format') == 'packed' else 'sklearn'
+    engine = os.environ.get('FOREST_ENGINE', default).lower()
+    if engine not in FOREST_ENGINES:
+        raise ValueError(f"FOREST_ENGINE must be one of {FOREST_ENGINES}, got '{engine}'")
+    return engine
+
+def _forest_predict(entry, X):
+    """
+    Predict with a registry entry's forest through the configured FOREST_ENGINE
+    """
+    engine = _forest_engine(entry)
+    if engine == 'flat' or (engine == 'auto' and len(X) <= FLAT_FOREST_MAX_ROWS):
+        return flat_forest_for(entry['model']).predict(X)
+    return get_estimator(entry).predict(X)
+
+class PowerCurve:
+    """
+    Piecewise-linear power curve: output at each knot wind speed, linearly
+    interpolated in between and held flat beyond the outermost knots
+    """
+
+    def __init__(self, wind_speed, output_kw, loss_factor=1.0):
+        self.wind_speed = np.asarray(wind_speed, dtype=np.float64)
+        self.output_kw = np.asarray(output_kw, dtype=np.float64)
+        self.loss_factor = float(loss_factor)
+
+    @classmethod
+    def fit(cls, wind_speed, theoretical_kw, actual_kw, bin_width=POWER_CURVE_BIN_WIDTH):
+        """
+        Fit the curve to the theoretical output, one knot per wind speed bin
+        (the bin's median speed and median theoretical output), then scale it
+        by the least-squares factor between the curve and the measured output
+
+        Args:
+            wind_speed, theoretical_kw, actual_kw (array-like): Training rows
+            bin_width (float): Knot spacing in m/s
+
+        Returns:
+            PowerCurve: The fitted curve
+        """
+        wind_speed = np.asarray(wind_speed, dtype=np.float64)
+        theoretical_kw = np.asarray(theoretical_kw, dtype=np.float64)
+        actual_kw = np.asarray(actual_kw, dtype=np.float64)
+
+        bins = np.floor(wind_speed / bin_width).astype(np.int64)
+        order = np.argsort(bins, kind='stable')
+        edges = np.flatnonzero(np.diff(bins[order])) + 1
+        speed = np.array([np.median(group) for group in np.split(wind_speed[order], edges)])
+        output = np.array([np.median(group) for group in np.split(theoretical_kw[order], edges)])
+
+        curve = np.interp(wind_speed, speed, output)
+        loss_factor = float(curve @ actual_kw / (curve @ curve)) if curve.any() else 1.0
+        return cls(speed, output * loss_factor, loss_factor)
+
+    def predict(self, X):
+        """
+        Args:
+            X (DataFrame): Feature rows with a 'wind_speed' column
+
+        Returns:
+            ndarray: Predicted output in kW
+        """
+        return np.interp(np.asarray(X['wind_speed'], dtype=np.float64), self.wind_speed, self.output_kw)
+
+    @property
+    def nbytes(self):
+        return self.wind_speed.nbytes + self.output_kw.nbytes
+
+    def __len__(self):
+        return len(self.wind_speed)
+
+    def __repr__(self):
+        return (f"PowerCurve({len(self)} knots, {self.wind_speed[0]:.2f}-{self.wind_speed[-1]:.2f} m/s, "
+                f"loss factor {self.loss_factor:.3f})")
+
+def _predict_rf(entry, X):
+    # Solar bundles carry their scaler; the wind pipeline scales internally
+    if entry['scaler'] is not None:
+        X = entry['scaler'].transform(X)
+    return _forest_predict(entry, X)
+
+def _predict_estimator(entry, X):
+    return entry['model'].predict(X)
+
+# Per fitted forest: every tree's node values concatenated, and each tree's
+# offset into them; entries go away with the forest
+_leaf_values = weakref.WeakKeyDictionary()
+
+def _forest_leaf_values(forest):
+    cached = _leaf_values.get(forest)
+    if cached is None:
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        values = np.concatenate([tree.value[:, 0, 0] for tree in trees])
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        cached = _leaf_values[forest] = (values, offsets)
+    return cached
+
+def _forest_quantiles(estimator, X, quantiles):
+    """
+    Mean and quantiles over a fitted forest's per-tree predictions: the
+    leaves of every row in every tree come from one compiled apply() over
+    the whole forest, and one gather from the concatenated node values
+    turns them into the (trees x rows) predictions
+    """
+    if hasattr(estimator, 'steps'):
+        X = estimator[:-1].transform(X) if len(estimator.steps) > 1 else X
+        estimator = estimator.steps[-1][1]
+
+    # The estimators validate their input to float32 the same way
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    values, offsets = _forest_leaf_values(estimator)
+    nodes = np.ascontiguousarray((estimator.apply(X) + offsets).T)
+    tree_values = values[nodes]
+
+    # Summing a C-ordered (trees x rows) array over axis 0 adds whole tree
+    # rows one after another, in tree order like RandomForestRegressor.predict,
+    # so the mean is bit-identical to the point forecast (a pairwise sum
+    # along contiguous trees would not be)
+    predictions = tree_values.sum(axis=0) / len(tree_values)
+
+    return predictions, np.percentile(tree_values, np.asarray(quantiles, dtype=np.float64) * 100, axis=0).T
+
+def _quantiles_rf(entry, X, quantiles):
+    # Per-tree predictions from the same engine as the point forecast
+    if entry['scaler'] is not None:
+        X = entry['scaler'].transform(X)
+    engine = _forest_engine(entry)
+    if engine == 'flat' or (engine == 'auto' and len(X) <= FLAT_FOREST_MAX_ROWS):
+        return flat_forest_for(entry['model']).predict_quantiles(X, quantiles)
+    return _forest_quantiles(get_estimator(entry), X, quantiles)
+
+# Backends per plant type: name -> predict(entry, X), where entry is the
+# registry entry of the backend's artifact and X the ordered feature columns.
+# Every backend but 'rf' reads its artifact from BACKEND_FILES.
+BACKENDS = {
+    'solar': {'rf': _predict_rf, 'hgb': _predict_estimator},
+    'wind': {'rf': _predict_rf, 'hgb': _predict_estimator, 'power_curve': _predict_estimator},
+}
+
+# Backends that can also predict quantile bands: name -> quantiles(entry, X,
+# quantiles) returning (predictions, rows x quantiles bands)
+QUANTILE_BACKENDS = {'rf': _quantiles_rf}
+
+def register_backend(plant_type, name, predict, artifact_file):
+    """
+    Register another backend for a plant type
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        name (str): Backend name, as used in <PLANT_TYPE>_MODEL_BACKEND
+        predict (callable): predict(entry, X) -> ndarray, see BACKENDS
+        artifact_file (str): Its artifact, relative to MODELS_DIR
+    """
+    BACKENDS[plant_type][name] = predict
+    BACKEND_FILES[f"{plant_type}/{name}"] = artifact_file
+
+def model_backend(plant_type):
+    """
+    The backend configured for a plant type (SOLAR_MODEL_BACKEND / WIND_MODEL_BACKEND)
+    """
+    if plant_type not in BACKENDS:
+        raise ValueError(f"Unknown plant type: {plant_type}")
+
+    variable = f"{plant_type.upper()}_MODEL_BACKEND"
+    backend = os.environ.get(variable, DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS[plant_type]:
+        raise ValueError(f"{variable} must be one of {tuple(BACKENDS[plant_type])}, got '{backend}'")
+    return backend
+
+def backend_entry(plant_type, backend=None):
+    """
+    Registry entry of a backend's artifact, loading it on first use
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        backend (str, optional): Backend name, defaults to the configured one
+
+    Returns:
+        dict: Registry entry with the backend's model
+    """
+    backend = backend or model_backend(plant_type)
+    if backend == DEFAULT_BACKEND:
+        return get_model(plant_type)
+    return get_backend_model(plant_type, backend)
+
+def backend_predict(plant_type, X, backend=None):
+    """
+    Predict raw output for feature rows with a plant type's backend
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        X (DataFrame): Feature columns in training order (SOLAR_FEATURES / WIND_FEATURES)
+        backend (str, optional): Backend name, defaults to the configured one
+
+    Returns:
+        ndarray: Predicted output per row, before the domain rules
+    """
+    backend = backend or model_backend(plant_type)
+    return BACKENDS[plant_type][backend](backend_entry(plant_type, backend), X)
+
+def backend_predict_quantiles(plant_type, X, quantiles, backend=None):
+    """
+    Predict raw output and quantile bands for feature rows with a plant
+    type's backend
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        X (DataFrame): Feature columns in training order
+        quantiles (sequence): Quantiles in [0, 1]
+        backend (str, optional): Backend name, defaults to the configured one
+
+    Returns:
+        tuple: (predictions, rows x quantiles bands), bands None for
+            backends without quantile support
+    """
+    backend = backend or model_backend(plant_type)
+    if backend not in QUANTILE_BACKENDS:
+        return backend_predict(plant_type, X, backend), None
+    return QUANTILE_BACKENDS[backend](backend_entry(plant_type, backend), X, quantiles)
@@ -0,0 +1,277 @@
+"""
+Backtest the deployed models against historical weather + production CSVs.
+
+Files are streamed in chunks and every chunk goes through the production
+prediction path (predict_hourly_generation_batch: the per-forecast feature
+adjustments, the model and the domain rules), with chunks spread over a
+process pool. Each chunk returns error sums per plant, month and hour, which
+are reduced into MAE / RMSE / bias tables.
+
+Production predicts 5-day forecasts and solar Radiation is adjusted by the
+median of each forecast, so history is cut into forecast windows of
+--window-hours (aligned to the epoch, per plant) before prediction. Rows must
+be grouped by plant and sorted by time within each plant.
+
+    python -m ml_pipeline.backtest --type wind
+    python -m ml_pipeline.backtest --type solar --csv history.csv --plant-column plant_id --workers 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from ml_pipeline.backends import backend_entry
+from ml_pipeline.model_registry import MODELS_DIR
+from ml_pipeline.predict_hourly import predict_hourly_generation_batch
+
+# Bundled training data, and the timestamp / measured output columns of each
+BACKTEST_FILES = {
+    'solar': os.path.join(MODELS_DIR, 'Solar Model', 'Solar_final_data_trainig.csv'),
+    'wind': os.path.join(MODELS_DIR, 'Wind Model', 'cleaned_wind_data.csv'),
+}
+TIME_COLUMNS = {'solar': 'Date-Hour(NMT)', 'wind': 'timestamp'}
+ACTUAL_COLUMNS = {'solar': 'SystemProduction', 'wind': 'actual_output_kW'}
+
+# Hours per forecast window (fetch_weather_data defaults to forecast_days=5)
+FORECAST_WINDOW_HOURS = 120
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Error sums kept per (plant_id, month, hour) and reduced into the reports
+ERROR_SUMS = ['rows', 'error', 'abs_error', 'squared_error', 'actual']
+
+def _normalize_chunk(chunk, plant_type, time_column, actual_column, plant_column, window_hours):
+    """
+    Rename a raw CSV chunk to the prediction input layout: 'time', 'actual',
+    'plant_id', the feature columns, and a forecast 'window' number
+    """
+    chunk = chunk.rename(columns={time_column: 'time', actual_column: 'actual'})
+    chunk['time'] = pd.to_datetime(chunk['time'])
+    chunk['plant_id'] = chunk[plant_column].astype(np.int64) if plant_column else 1
+
+    if plant_type == 'solar':
+        # The training CSV carries these; derive them for other histories
+        if 'Month' not in chunk:
+            chunk['Month'] = chunk['time'].dt.month
+        if 'Hour' not in chunk:
+            chunk['Hour'] = chunk['time'].dt.hour
+
+    hours = chunk['time'].to_numpy(dtype='datetime64[h]').astype(np.int64)
+    chunk['window'] = hours // window_hours
+    return chunk
+
+def read_chunks(path, plant_type, chunk_rows=DEFAULT_CHUNK_ROWS, time_column=None, actual_column=None,
+                plant_column=None, window_hours=FORECAST_WINDOW_HOURS):
+    """
+    Stream a history CSV as normalized chunks that never split a forecast
+    window: the trailing (plant, window) of each chunk is carried into the next
+
+    Yields:
+        DataFrame: Normalized rows, whole forecast windows only
+    """
+    time_column = time_column or TIME_COLUMNS[plant_type]
+    actual_column = actual_column or ACTUAL_COLUMNS[plant_type]
+
+    carry = None
+    for raw in pd.read_csv(path, chunksize=chunk_rows):
+        chunk = _normalize_chunk(raw, plant_type, time_column, actual_column, plant_column, window_hours)
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        last = (chunk['plant_id'].to_numpy() == chunk['plant_id'].iat[-1]) & \
+               (chunk['window'].to_numpy() == chunk['window'].iat[-1])
+        carry = chunk[last]
+        if not last.all():
+            yield chunk[~last]
+
+    if carry is not None and len(carry):
+        yield carry
+
+def backtest_chunk(chunk, plant_type):
+    """
+    Predict one normalized chunk through the production path and sum its errors
+
+    Args:
+        chunk (DataFrame): Rows from read_chunks
+        plant_type (str): 'solar' or 'wind'
+
+    Returns:
+        DataFrame: ERROR_SUMS per (plant_id, month, hour)
+    """
+    # read_chunks keeps each (plant, window) contiguous, so windows are slices
+    plant_ids = chunk['plant_id'].to_numpy()
+    windows = chunk['window'].to_numpy()
+    starts = np.concatenate([[0], np.flatnonzero((plant_ids[1:] != plant_ids[:-1]) |
+                                                 (windows[1:] != windows[:-1])) + 1, [len(chunk)]])
+    features = chunk.drop(columns=['actual', 'plant_id', 'window'])
+    has_coordinates = 'latitude' in chunk and 'longitude' in chunk
+
+    frames = {}
+    for key in range(len(starts) - 1):
+        frame = features.iloc[starts[key]:starts[key + 1]]
+        # Optional coordinates enable SOLAR_INFERENCE_MASK=elevation
+        if has_coordinates:
+            frame.attrs.update(latitude=float(frame['latitude'].iat[0]), longitude=float(frame['longitude'].iat[0]),
+                               utc_offset_seconds=int(frame['utc_offset_seconds'].iat[0])
+                               if 'utc_offset_seconds' in frame else 0)
+        frames[key] = frame
+
+    # The 'batch' output holds predictions as float32, as they are persisted
+    predictions = predict_hourly_generation_batch(frames, plant_type, output="batch", quantiles=False)
+    if any(len(predictions[key]) != len(frames[key]) for key in frames):
+        raise RuntimeError(f"Prediction failed for {len(chunk)} {plant_type} rows starting {chunk['time'].iat[0]}")
+
+    predicted = np.concatenate([predictions[key].predictions for key in frames]).astype(np.float64)
+    actual = chunk['actual'].to_numpy(dtype=np.float64)
+    error = predicted - actual
+
+    sums = pd.DataFrame({
+        'plant_id': plant_ids,
+        'month': chunk['time'].dt.month.to_numpy(),
+        'hour': chunk['time'].dt.hour.to_numpy(),
+        'rows': 1,
+        'error': error,
+        'abs_error': np.abs(error),
+        'squared_error': error * error,
+        'actual': actual
+    })
+    return sums.groupby(['plant_id', 'month', 'hour'], as_index=False)[ERROR_SUMS].sum()
+
+def _init_worker(plant_type):
+    # Load the model once per worker process rather than on its first chunk
+    backend_entry(plant_type)
+
+def error_metrics(sums, by=None):
+    """
+    Reduce error sums to metrics
+
+    Args:
+        sums (DataFrame): ERROR_SUMS per (plant_id, month, hour)
+        by (list, optional): Columns to group by; None for one overall row
+
+    Returns:
+        DataFrame: rows, mae, rmse, bias and mean_actual per group
+    """
+    totals = sums.groupby(by, as_index=False)[ERROR_SUMS].sum() if by else sums[ERROR_SUMS].sum().to_frame().T
+
+    rows = totals['rows'].to_numpy(dtype=np.float64)
+    metrics = totals[by].copy() if by else pd.DataFrame(index=totals.index)
+    metrics['rows'] = totals['rows'].astype(np.int64)
+    metrics['mae'] = totals['abs_error'] / rows
+    metrics['rmse'] = np.sqrt(totals['squared_error'].to_numpy(dtype=np.float64) / rows)
+    metrics['bias'] = totals['error'] / rows
+    metrics['mean_actual'] = totals['actual'] / rows
+    return metrics.reset_index(drop=True)
+
+def run_backtest(plant_type, path=None, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, time_column=None,
+                 actual_column=None, plant_column=None, window_hours=FORECAST_WINDOW_HOURS):
+    """
+    Backtest one plant type over a history CSV
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        path (str, optional): History CSV, defaults to the bundled training data
+        workers (int, optional): Worker processes, defaults to the CPU count;
+            1 runs in this process
+        chunk_rows (int): Rows read per chunk
+        time_column, actual_column (str, optional): Column names, defaulting
+            to those of the bundled CSVs
+        plant_column (str, optional): Plant id column for multi-plant histories
+        window_hours (int): Forecast window length in hours
+
+    Returns:
+        dict: 'overall', 'by_hour', 'by_month' and 'by_plant' metric frames,
+            plus 'rows', 'chunks', 'failed_chunks' and 'seconds'
+    """
+    if plant_type not in BACKTEST_FILES:
+        raise ValueError(f"Unknown plant type: {plant_type}")
+
+    path = path or BACKTEST_FILES[plant_type]
+    workers = workers or os.cpu_count() or 1
+    chunks = read_chunks(path, plant_type, chunk_rows, time_column, actual_column, plant_column, window_hours)
+
+    start = time.perf_counter()
+    partials, failed, submitted = [], [], 0
+
+    if workers == 1:
+        for chunk in chunks:
+            submitted += 1
+            try:
+                partials.append(backtest_chunk(chunk, plant_type))
+            except Exception as e:
+                failed.append(str(e))
+    else:
+        # Keep a bounded number of chunks in flight so the file is streamed,
+        # not read whole into memory ahead of the workers
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(plant_type,)) as pool:
+            pending = set()
+            for chunk in chunks:
+                submitted += 1
+                pending.add(pool.submit(backtest_chunk, chunk, plant_type))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            partials.append(future.result())
+                        except Exception as e:
+                            failed.append(str(e))
+            for future in pending:
+                try:
+                    partials.append(future.result())
+                except Exception as e:
+                    failed.append(str(e))
+
+    if not partials:
+        raise RuntimeError(f"Backtest of {path} produced no predictions ({len(failed)} chunks failed)")
+
+    sums = pd.concat(partials, ignore_index=True)
+    seconds = time.perf_counter() - start
+
+    return {
+        'overall': error_metrics(sums),
+        'by_hour': error_metrics(sums, ['hour']),
+        'by_month': error_metrics(sums, ['month']),
+        'by_plant': error_metrics(sums, ['plant_id']),
+        'rows': int(sums['rows'].sum()),
+        'chunks': submitted,
+        'failed_chunks': failed,
+        'seconds': seconds
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--type', dest='plant_type', choices=sorted(BACKTEST_FILES), required=True)
+    parser.add_argument('--csv', default=None, help="History CSV (default: the bundled training data)")
+    parser.add_argument('--time-column', default=None)
+    parser.add_argument('--actual-column', default=None)
+    parser.add_argument('--plant-column', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--window-hours', type=int, default=FORECAST_WINDOW_HOURS)
+    parser.add_argument('--output-dir', default=None, help="Also write the metric tables as CSV files here")
+    args = parser.parse_args()
+
+    report = run_backtest(args.plant_type, args.csv, args.workers, args.chunk_rows, args.time_column,
+                          args.actual_column, args.plant_column, args.window_hours)
+
+    pd.set_option('display.width', 120)
+    print(f"\nBacktested {report['rows']} {args.plant_type} rows in {report['chunks']} chunks "
+          f"in {report['seconds']:.2f}s ({report['rows'] / report['seconds']:,.0f} rows/s)")
+    for reason in report['failed_chunks']:
+        print(f"  failed chunk - {reason}")
+
+    for name in ('overall', 'by_month', 'by_hour', 'by_plant'):
+        table = report[name]
+        if name == 'by_plant' and len(table) > 20:
+            table = table.sort_values('mae', ascending=False).head(20)
+        print(f"\n{name}:\n{table.round(3).to_string(index=False)}")
+
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            report[name].to_csv(os.path.join(args.output_dir, f"{args.plant_type}_{name}.csv"), index=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Search smaller variants of a fitted forest and keep the smallest one whose
+held-out error stays within a budget.
+
+Variants are cut from the fitted model itself, no retraining:
+    - tree count: the first k trees of the forest
+    - depth cap:  every node at depth d becomes a leaf (its value is already
+                  the mean of the training samples that reached it)
+    - leaf pruning: every node that saw fewer than m training samples
+                  becomes a leaf
+Each (depth, m) pruning is applied once and the predictions of all tree
+counts come from cumulative per-tree sums, so the whole grid is scored in a
+few passes. Error is the production MAE (zero rules applied) on the held-out
+split train_models uses, or on --data. The deployed models may have been
+fitted on some of those rows, so compare errors relative to the baseline.
+
+The chosen model is written to models/versions/<type>/<version>/ (the layout
+train_models uses, so --list and --deploy work on it) with a manifest and
+the full candidate report.
+
+    python -m ml_pipeline.compress_model --type wind --max-error-increase 0.02
+    python -m ml_pipeline.compress_model --type solar --deploy
+"""
+import argparse
+import copy
+import gzip
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.tree._tree import Tree
+
+from ml_pipeline.model_registry import MODELS_DIR, MODEL_FILES, _read_artifact, _write_artifact, _estimate_model_bytes
+from ml_pipeline.predict_hourly import zero_generation_mask
+from ml_pipeline.train_models import TRAINING_DATA, VERSIONS_DIR, deploy_version, _latency
+
+# Default search grid; tree counts are fractions of the fitted forest
+TREE_FRACTIONS = (1.0, 0.75, 0.5, 0.35, 0.25, 0.15, 0.1)
+DEPTH_CAPS = (None, 24, 18, 14, 12, 10, 8)
+MIN_NODE_SAMPLES = (1, 3, 8, 20)
+
+# Values sklearn uses for leaves in the node array
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+def _node_depths(left, right):
+    """
+    Depth of every node, one vectorized step per tree level
+    """
+    depth = np.zeros(len(left), dtype=np.int64)
+    frontier, level = np.array([0]), 0
+    while frontier.size:
+        depth[frontier] = level
+        split = frontier[left[frontier] != TREE_LEAF]
+        frontier = np.concatenate([left[split], right[split]])
+        level += 1
+    return depth
+
+def prune_tree(tree, max_depth=None, min_node_samples=1):
+    """
+    Copy of a fitted sklearn Tree with nodes at max_depth, or with fewer than
+    min_node_samples training samples, turned into leaves and the subtrees
+    below them dropped
+
+    Returns:
+        sklearn.tree._tree.Tree: The pruned tree (the input if nothing changes)
+    """
+    state = tree.__getstate__()
+    nodes, values = state['nodes'], state['values']
+    left, right = nodes['left_child'], nodes['right_child']
+
+    depth = _node_depths(left, right)
+    internal = left != TREE_LEAF
+    make_leaf = np.zeros(len(nodes), dtype=bool)
+    if max_depth is not None:
+        make_leaf |= depth >= max_depth
+    if min_node_samples > 1:
+        make_leaf |= nodes['n_node_samples'] < min_node_samples
+    make_leaf &= internal
+    if not make_leaf.any():
+        return tree
+
+    # Nodes still reachable once the new leaves stop the descent
+    keep = np.zeros(len(nodes), dtype=bool)
+    frontier = np.array([0])
+    while frontier.size:
+        keep[frontier] = True
+        split = frontier[internal[frontier] & ~make_leaf[frontier]]
+        frontier = np.concatenate([left[split], right[split]])
+
+    # Children always follow their parent, so order is preserved by masking
+    new_index = np.cumsum(keep) - 1
+    pruned = nodes[keep].copy()
+    leaf = (pruned['left_child'] == TREE_LEAF) | make_leaf[keep]
+    pruned['left_child'] = np.where(leaf, TREE_LEAF, new_index[np.maximum(pruned['left_child'], 0)])
+    pruned['right_child'] = np.where(leaf, TREE_LEAF, new_index[np.maximum(pruned['right_child'], 0)])
+    pruned['feature'] = np.where(leaf, TREE_UNDEFINED, pruned['feature'])
+    pruned['threshold'] = np.where(leaf, float(TREE_UNDEFINED), pruned['threshold'])
+    pruned['missing_go_to_left'] = np.where(leaf, 0, pruned['missing_go_to_left'])
+
+    new_tree = Tree(tree.n_features, np.asarray(tree.n_classes, dtype=np.intp), tree.n_outputs)
+    new_tree.__setstate__({
+        'max_depth': int(depth[keep].max()),
+        'node_count': int(keep.sum()),
+        'nodes': pruned,
+        'values': np.ascontiguousarray(values[keep])
+    })
+    return new_tree
+
+def _forest_of(estimator):
+    return estimator.steps[-1][1] if hasattr(estimator, 'steps') else estimator
+
+def build_variant(artifact, trees, max_depth=None, min_node_samples=1):
+    """
+    A new artifact in the same layout whose forest keeps the first `trees`
+    trees, pruned by max_depth / min_node_samples. The input is not modified.
+    """
+    estimator = artifact['model'] if isinstance(artifact, dict) else artifact
+    forest = _forest_of(estimator)
+
+    estimators = []
+    for tree_estimator in forest.estimators_[:trees]:
+        pruned = copy.copy(tree_estimator)
+        pruned.tree_ = prune_tree(tree_estimator.tree_, max_depth, min_node_samples)
+        estimators.append(pruned)
+
+    new_forest = copy.copy(forest)
+    new_forest.estimators_ = estimators
+    new_forest.n_estimators = len(estimators)
+
+    if hasattr(estimator, 'steps'):
+        new_estimator = Pipeline(estimator.steps[:-1] + [(estimator.steps[-1][0], new_forest)])
+    else:
+        new_estimator = new_forest
+
+    if isinstance(artifact, dict):
+        return {**artifact, 'model': new_estimator}
+    return new_estimator
+
+def _held_out(plant_type, data_path=None, random_state=42):
+    """
+    Held-out rows: the whole of data_path, or train_models' test split of the
+    bundled CSV
+    """
+    spec = TRAINING_DATA[plant_type]
+    df = pd.read_csv(data_path or spec['path'])
+    X, y = df[spec['features']], df[spec['target']].to_numpy(dtype=np.float64)
+    if data_path:
+        return X, y
+    _, X_test, _, y_test = train_test_split(X, y, test_size=spec['test_size'], random_state=random_state)
+    return X_test, y_test
+
+def _forest_inputs(artifact, X):
+    """
+    What the forest itself sees for raw features X (the scaled matrix)
+    """
+    if isinstance(artifact, dict):
+        return artifact['scaler'].transform(X)
+    return artifact[:-1].transform(X)
+
+def _serialized_bytes(artifact, plant_type):
+    # Size of the artifact file in the deployed format
+    data = pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL)
+    return len(gzip.compress(data)) if MODEL_FILES[plant_type].endswith('.gz') else len(data)
+
+def _pareto(report):
+    """
+    Candidates no other candidate beats on both node count and MAE
+    """
+    ordered = report.sort_values(['nodes', 'mae'])
+    best_mae, frontier = np.inf, []
+    for index, mae in zip(ordered.index, ordered['mae']):
+        if mae < best_mae:
+            frontier.append(index)
+            best_mae = mae
+    return report.index.isin(frontier)
+
+def search(plant_type, artifact, X, y, tree_fractions=TREE_FRACTIONS, depth_caps=DEPTH_CAPS,
+           min_node_samples=MIN_NODE_SAMPLES):
+    """
+    Score every (trees, depth cap, min node samples) variant on held-out data
+
+    Returns:
+        DataFrame: One row per candidate with trees, max_depth,
+            min_node_samples, nodes, memory_bytes, mae, rmse, r2 and bias
+    """
+    forest = _forest_of(artifact['model'] if isinstance(artifact, dict) else artifact)
+    total = len(forest.estimators_)
+    tree_counts = sorted({max(1, int(round(total * fraction))) for fraction in tree_fractions}, reverse=True)
+
+    inputs = np.ascontiguousarray(_forest_inputs(artifact, X), dtype=np.float32)
+    zero = zero_generation_mask(X, plant_type)
+    total_squares = float(np.sum((y - y.mean()) ** 2))
+    node_bytes = Tree(1, np.ones(1, dtype=np.intp), 1).__getstate__()['nodes'].dtype.itemsize + 8
+
+    rows = []
+    for depth_cap in depth_caps:
+        for min_samples in min_node_samples:
+            trees = [prune_tree(e.tree_, depth_cap, min_samples) for e in forest.estimators_[:tree_counts[0]]]
+
+            # Prefix sums over trees in forest order give every tree count's
+            # prediction exactly as RandomForestRegressor.predict computes it
+            running = np.zeros(len(inputs))
+            sums = {}
+            for index, tree in enumerate(trees, start=1):
+                running += tree.predict(inputs)[:, 0]
+                if index in tree_counts:
+                    sums[index] = running.copy()
+
+            node_counts = np.cumsum([tree.node_count for tree in trees])
+            for count in tree_counts:
+                predicted = np.where(zero, 0.0, sums[count] / count)
+                error = predicted - y
+                rows.append({
+                    'trees': count,
+                    'max_depth': depth_cap,
+                    'min_node_samples': min_samples,
+                    'nodes': int(node_counts[count - 1]),
+                    'memory_bytes': int(node_counts[count - 1]) * node_bytes,
+                    'mae': float(np.mean(np.abs(error))),
+                    'rmse': float(np.sqrt(np.mean(error * error))),
+                    'r2': 1 - float(np.sum(error * error)) / total_squares,
+                    'bias': float(np.mean(error))
+                })
+
+    return pd.DataFrame(rows)
+
+def compress_model(plant_type, max_error_increase=0.02, model_path=None, data_path=None, version=None,
+                   measure_all=False):
+    """
+    Search variants of a fitted model and save the smallest one within budget
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        max_error_increase (float): Allowed relative MAE increase over the
+            uncompressed model (0.02 = 2%)
+        model_path (str, optional): Artifact to compress, defaults to the deployed one
+        data_path (str, optional): Held-out CSV, defaults to train_models' test split
+        version (str, optional): Version id of the output
+        measure_all (bool): Time and serialize every candidate, not just the
+            Pareto-optimal ones (slow for large forests)
+
+    Returns:
+        dict: Manifest of the compressed version (with the report path)
+    """
+    if plant_type not in TRAINING_DATA:
+        raise ValueError(f"Unknown plant type: {plant_type}")
+
+    model_path = model_path or os.path.join(MODELS_DIR, MODEL_FILES[plant_type])
+    artifact = _read_artifact(model_path)
+    X, y = _held_out(plant_type, data_path)
+
+    start = time.perf_counter()
+    report = search(plant_type, artifact, X, y)
+    total_trees = int(report['trees'].max())
+    baseline = report[(report['trees'] == total_trees) & report['max_depth'].isna() & (report['min_node_samples'] == 1)]
+    baseline_mae = float(baseline['mae'].iat[0])
+    budget = baseline_mae * (1 + max_error_increase)
+
+    report['mae_increase'] = report['mae'] / baseline_mae - 1
+    report['within_budget'] = report['mae'] <= budget
+    report['pareto'] = _pareto(report)
+    report['baseline'] = report.index == baseline.index[0]
+
+    eligible = report[report['within_budget']].sort_values(['nodes', 'mae'])
+    chosen_index = eligible.index[0]
+    report['chosen'] = report.index == chosen_index
+
+    # Latency and file size need a built model; measure the interesting rows
+    measured = report.index if measure_all else report.index[report['pareto'] | report['baseline'] | report['chosen']]
+    for index in measured:
+        row = report.loc[index]
+        variant = build_variant(artifact, int(row['trees']),
+                                None if pd.isna(row['max_depth']) else int(row['max_depth']),
+                                int(row['min_node_samples']))
+        report.loc[index, 'file_bytes'] = _serialized_bytes(variant, plant_type)
+        for rows, timings in _latency(variant, X).items():
+            for engine, value in timings.items():
+                report.loc[index, f"{engine.replace('_ms', '')}_{rows}_ms"] = value
+    search_seconds = time.perf_counter() - start
+
+    chosen = report.loc[chosen_index]
+    chosen_depth = None if pd.isna(chosen['max_depth']) else int(chosen['max_depth'])
+    compressed = build_variant(artifact, int(chosen['trees']), chosen_depth, int(chosen['min_node_samples']))
+
+    version = version or 'compressed-' + datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    version_dir = os.path.join(VERSIONS_DIR, plant_type, version)
+    os.makedirs(version_dir, exist_ok=True)
+    artifact_path = os.path.join(version_dir, MODEL_FILES[plant_type])
+    _write_artifact(compressed, artifact_path)
+    report_path = os.path.join(version_dir, 'compression_report.csv')
+    report.to_csv(report_path, index=False)
+
+    def summary(row):
+        return {key: (None if pd.isna(row[key]) else row[key].item() if hasattr(row[key], 'item') else row[key])
+                for key in report.columns if key in row}
+
+    forest = _forest_of(compressed['model'] if isinstance(compressed, dict) else compressed)
+    manifest = {
+        'plant_type': plant_type,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'artifact': MODEL_FILES[plant_type],
+        'compressed_from': os.path.relpath(model_path, MODELS_DIR),
+        'max_error_increase': max_error_increase,
+        'held_out_rows': len(X),
+        'baseline': summary(report.loc[baseline.index[0]]),
+        'chosen': summary(chosen),
+        'search_seconds': round(search_seconds, 2),
+        'candidates': len(report),
+        'report': os.path.basename(report_path),
+        # Same keys as train_models manifests so --list shows compressed versions
+        'accuracy': {'with_zero_rule': {key: float(chosen[key]) for key in ('mae', 'rmse', 'r2', 'bias')}},
+        'training_seconds': 0.0,
+        'predict_latency': _latency(compressed, X),
+        'size': {
+            'artifact_bytes': os.path.getsize(artifact_path),
+            'trees': len(forest.estimators_),
+            'nodes': int(sum(e.tree_.node_count for e in forest.estimators_)),
+            'max_depth': int(max(e.tree_.max_depth for e in forest.estimators_)),
+            'tree_bytes': _estimate_model_bytes(compressed['model'] if isinstance(compressed, dict) else compressed)
+        }
+    }
+    with open(os.path.join(version_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    _print_report(report, plant_type, baseline_mae, budget)
+    print(f"\nChose {int(chosen['trees'])} trees, max_depth={chosen_depth}, "
+          f"min_node_samples={int(chosen['min_node_samples'])}: {chosen['nodes'] / baseline['nodes'].iat[0]:.0%} of the "
+          f"nodes, MAE {chosen['mae']:.3f} ({chosen['mae_increase']:+.2%}), "
+          f"{manifest['size']['artifact_bytes'] / 1e6:.1f} MB -> {version_dir} ({search_seconds:.1f}s search)")
+
+    return manifest
+
+def _print_report(report, plant_type, baseline_mae, budget, beyond_budget=5):
+    # The Pareto front within budget, plus where it goes past the budget
+    frontier = report[report['pareto'] | report['baseline']].sort_values('nodes', ascending=False)
+    shown = pd.concat([frontier[frontier['within_budget']], frontier[~frontier['within_budget']].head(beyond_budget)])
+    print(f"\n{plant_type}: {len(report)} candidates, baseline MAE {baseline_mae:.3f}, budget {budget:.3f}; "
+          f"Pareto-optimal candidates (full table in compression_report.csv):")
+    print(f"{'trees':>6}{'depth':>6}{'min n':>6}{'nodes':>10}{'mem MB':>8}{'file MB':>9}{'MAE':>10}{'ΔMAE':>8}"
+          f"{'1 row ms':>9}{'120 ms':>8}{'10k ms':>8}{'flat 120':>9}  ")
+    for _, row in shown.iterrows():
+        flags = ('baseline ' if row['baseline'] else '') + ('chosen' if row['chosen'] else '')
+        depth = '-' if pd.isna(row['max_depth']) else int(row['max_depth'])
+        print(f"{int(row['trees']):>6}{depth:>6}{int(row['min_node_samples']):>6}{int(row['nodes']):>10}"
+              f"{row['memory_bytes'] / 1e6:>8.1f}{row['file_bytes'] / 1e6:>9.1f}{row['mae']:>10.3f}"
+              f"{row['mae_increase']:>+8.2%}{row['sklearn_1_ms']:>9.2f}{row['sklearn_120_ms']:>8.2f}{row['sklearn_10000_ms']:>8.2f}"
+              f"{row['flat_120_ms']:>9.2f}  {flags}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--type', dest='plant_type', choices=sorted(TRAINING_DATA), required=True)
+    parser.add_argument('--max-error-increase', type=float, default=0.02,
+                        help="Allowed relative MAE increase over the uncompressed model")
+    parser.add_argument('--model', default=None, help="Artifact to compress (default: the deployed model)")
+    parser.add_argument('--data', default=None, help="Held-out CSV (default: train_models' test split)")
+    parser.add_argument('--version', default=None)
+    parser.add_argument('--measure-all', action='store_true', help="Time and serialize every candidate")
+    parser.add_argument('--deploy', action='store_true', help="Deploy the compressed model")
+    args = parser.parse_args()
+
+    manifest = compress_model(args.plant_type, args.max_error_increase, args.model, args.data, args.version,
+                              args.measure_all)
+    if args.deploy:
+        deploy_version(args.plant_type, manifest['version'])
+
+if __name__ == "__main__":
+    main()
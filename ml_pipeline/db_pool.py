@@ -0,0 +1,207 @@
+import os
+import time
+import threading
+import weakref
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+
+# Shared engine used by the pipeline writer. Either a dedicated engine built
+# from the environment or the Flask app's engine passed to configure_pool().
+_engine = None
+_lock = threading.Lock()
+_instrumented = weakref.WeakSet()
+
+# checkouts/checkins/checkout_seconds cover every user of the engine (web
+# requests included, when it is the app's); pipeline_checkouts and
+# wait_seconds only the pipeline's get_connection() calls
+_stats = {
+    'connects': 0,
+    'checkouts': 0,
+    'checkins': 0,
+    'pipeline_checkouts': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0,
+    'checkout_seconds_total': 0.0,
+    'checkout_seconds_max': 0.0
+}
+_stats_lock = threading.Lock()
+
+def pool_settings():
+    """
+    Read the connection pool settings from the environment
+
+    Returns:
+        dict: Keyword arguments for sqlalchemy.create_engine
+    """
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 5)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # Azure SQL drops idle connections after ~30 minutes
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no')
+    }
+
+def database_dialect():
+    """
+    SQL dialect configured in the environment: 'mssql' (default) or 'mysql'
+    """
+    dialect = os.environ.get('DB_DIALECT', 'mssql').lower()
+    if dialect not in ('mssql', 'mysql'):
+        raise ValueError(f"Unsupported DB_DIALECT: {dialect}")
+    return dialect
+
+def _database_url():
+    """
+    Build the database URL from the environment: Azure SQL Server, or MySQL
+    from the DB_* variables when DB_DIALECT=mysql
+    """
+    if database_dialect() == 'mysql':
+        return URL.create(
+            "mysql+pymysql",
+            username=os.environ.get('DB_USER', 'root'),
+            password=os.environ.get('DB_PASSWORD', ''),
+            host=os.environ.get('DB_HOST', 'localhost'),
+            database=os.environ.get('DB_NAME', 'renewable_energy')
+        )
+
+    return URL.create(
+        "mssql+pyodbc",
+        username=os.environ.get('AZURE_SQL_USERNAME', 'root'),
+        password=os.environ.get('AZURE_SQL_PASSWORD', ''),
+        host=os.environ.get('AZURE_SQL_SERVER', 'localhost'),
+        database=os.environ.get('AZURE_SQL_DATABASE', 'renewable_energy'),
+        query={
+            'driver': 'ODBC Driver 18 for SQL Server',
+            'Encrypt': 'yes',
+            'TrustServerCertificate': 'no'
+        }
+    )
+
+def _record_stat(key, seconds):
+    with _stats_lock:
+        _stats[f'{key}_seconds_total'] += seconds
+        _stats[f'{key}_seconds_max'] = max(_stats[f'{key}_seconds_max'], seconds)
+
+def _attach_listeners(engine):
+    """
+    Track physical connects and how long connections stay checked out
+    """
+    if engine in _instrumented:
+        return
+    _instrumented.add(engine)
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        with _stats_lock:
+            _stats['connects'] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        with _stats_lock:
+            _stats['checkouts'] += 1
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        # Only checkins matching a checkout seen above, so the counts and the
+        # checkout time average describe the same connections
+        checked_out_at = connection_record.info.pop('checked_out_at', None)
+        if checked_out_at is None:
+            return
+        _record_stat('checkout', time.perf_counter() - checked_out_at)
+        with _stats_lock:
+            _stats['checkins'] += 1
+
+def configure_pool(engine=None):
+    """
+    Set the engine the pipeline writer draws connections from
+
+    Args:
+        engine (Engine, optional): Existing engine to share (e.g. the Flask
+            app's db.engine). A dedicated pooled engine is created from the
+            environment when omitted.
+
+    Returns:
+        Engine: The configured engine
+    """
+    global _engine
+
+    with _lock:
+        if engine is None:
+            engine = create_engine(_database_url(), **pool_settings())
+        _attach_listeners(engine)
+        _engine = engine
+
+    return engine
+
+def get_engine():
+    """
+    Return the shared engine, creating a dedicated one on first use
+    """
+    if _engine is None:
+        configure_pool()
+    return _engine
+
+def get_dialect():
+    """
+    SQL dialect name of the shared engine ('mssql' or 'mysql')
+    """
+    return get_engine().dialect.name
+
+def get_connection():
+    """
+    Check out a raw DBAPI (pyodbc, or pymysql on MySQL) connection from the
+    shared pool. Calling close() on it returns it to the pool.
+
+    Returns:
+        Connection: Pooled DBAPI connection proxy
+    """
+    engine = get_engine()
+
+    # Time spent waiting for a free slot (or opening a new connection)
+    start = time.perf_counter()
+    conn = engine.raw_connection()
+    _record_stat('wait', time.perf_counter() - start)
+
+    with _stats_lock:
+        _stats['pipeline_checkouts'] += 1
+
+    return conn
+
+def pool_stats():
+    """
+    Return pool configuration, current usage and checkout/wait timings:
+    checkout counts and times of every connection drawn from the engine,
+    wait times of the pipeline's get_connection() calls
+
+    Returns:
+        dict: Pool statistics
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    pipeline_checkouts = stats['pipeline_checkouts']
+    stats['wait_seconds_avg'] = stats['wait_seconds_total'] / pipeline_checkouts if pipeline_checkouts else 0.0
+    checkins = stats['checkins']
+    stats['checkout_seconds_avg'] = stats['checkout_seconds_total'] / checkins if checkins else 0.0
+
+    if _engine is not None:
+        pool = _engine.pool
+        stats['pool'] = {
+            'class': type(pool).__name__,
+            'status': pool.status(),
+            'size': pool.size() if hasattr(pool, 'size') else None,
+            'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+            'overflow': pool.overflow() if hasattr(pool, 'overflow') else None
+        }
+
+    return stats
+
+def _reset_after_fork():
+    # Connections must not be shared with the parent; start with an empty pool
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,8 +1,10 @@
+import os
 import requests
 import pandas as pd
 from datetime import datetime
 import re
 import math
+from ml_pipeline import weather_cache
 
 def parse_coordinates(location_string):
     """
@@ -44,38 +46,55 @@ def parse_coordinates(location_string):
         print(f"Error parsing coordinates: {e}")
         return default_lat, default_lng
 
-def fetch_weather_data(location=None, latitude=23.276474, longitude=77.460590, forecast_days=5):
+# Hourly variables requested from Open-Meteo
+HOURLY_VARIABLES = [
+    'temperature_2m', 'relative_humidity_2m', 'pressure_msl',
+    'direct_radiation', 'windspeed_10m', 'sunshine_duration', 'winddirection_10m',
+    'windgusts_10m', 'precipitation'
+]
+
+# Maximum number of locations sent in one multi-location request
+BATCH_CHUNK_SIZE = 50
+
+def _forecast_url():
+    # Overridable so tests and benchmarks can point at a local stand-in server
+    return os.environ.get('OPEN_METEO_URL', 'https://api.open-meteo.com/v1/forecast')
+
+def _request_timeout():
+    # Seconds to wait for the forecast API to connect / send data
+    return float(os.environ.get('WEATHER_REQUEST_TIMEOUT', '30'))
+
+def _request_forecast(latitudes, longitudes, forecast_days):
     """
-    Fetch hourly weather forecast for a given location using Open-Meteo API.
-    
-    Args:
-        location (str, optional): Location string in format like "28.579202°N 77.631433°E"
-        latitude (float, optional): Latitude coordinate
-        longitude (float, optional): Longitude coordinate
-        forecast_days (int, optional): Number of days to forecast
-        
+    Request hourly forecasts for one or more locations in a single call
+
     Returns:
-        DataFrame: Cleaned and structured hourly weather data
+        list: One API response dict per location, in request order
     """
-    # If location is provided, extract coordinates
-    if location:
-        latitude, longitude = parse_coordinates(location)
-        
     url = (
-        f"https://api.open-meteo.com/v1/forecast?"
-        f"latitude={latitude}&longitude={longitude}"
-        "&hourly=temperature_2m,relative_humidity_2m,pressure_msl,"
-        "direct_radiation,windspeed_10m,sunshine_duration,winddirection_10m,"
-        "windgusts_10m,precipitation"
+        f"{_forecast_url()}?"
+        f"latitude={','.join(str(lat) for lat in latitudes)}"
+        f"&longitude={','.join(str(lng) for lng in longitudes)}"
+        f"&hourly={','.join(HOURLY_VARIABLES)}"
         f"&forecast_days={forecast_days}&timezone=auto"
     )
 
-    response = requests.get(url)
+    try:
+        response = requests.get(url, timeout=_request_timeout())
+    except requests.Timeout:
+        raise Exception("Timed out fetching weather data")
 
     if response.status_code != 200:
         raise Exception("Failed to fetch weather data")
 
     data = response.json()
+    # A single location comes back as an object, several as a list
+    return data if isinstance(data, list) else [data]
+
+def _weather_frame(data):
+    """
+    Build the cleaned hourly weather frame from an API response for one location
+    """
     hourly = data['hourly']
 
     # Create DataFrame
@@ -97,24 +116,17 @@ def fetch_weather_data(location=None, latitude=23.276474, longitude=77.460590, f
     df['Hour'] = df['time'].dt.hour
     df['Date'] = df['time'].dt.date  # for daily aggregation
 
+    # Times are local (timezone=auto); keep what is needed to place them in UTC
+    df.attrs['latitude'] = data.get('latitude')
+    df.attrs['longitude'] = data.get('longitude')
+    df.attrs['utc_offset_seconds'] = data.get('utc_offset_seconds', 0)
+
     return df
 
-def fetch_wind_weather_data(location=None, latitude=23.276474, longitude=77.460590, forecast_days=5):
+def _wind_frame(df):
     """
-    Fetch hourly weather forecast for wind power prediction.
-    
-    Args:
-        location (str, optional): Location string in format like "28.579202°N 77.631433°E"
-        latitude (float, optional): Latitude coordinate
-        longitude (float, optional): Longitude coordinate
-        forecast_days (int, optional): Number of days to forecast
-        
-    Returns:
-        DataFrame: Weather data formatted for wind power prediction
+    Map a general weather frame to the features expected by the wind model
     """
-    # Get general weather data
-    df = fetch_weather_data(location, latitude, longitude, forecast_days)
-    
     # Calculate wind direction deviation (simplified approach)
     # Calculating the difference between direction and 180 degrees (optimal wind direction)
     # This is a simplified approach and can be adjusted based on actual wind turbine specifications
@@ -139,6 +151,131 @@ def fetch_wind_weather_data(location=None, latitude=23.276474, longitude=77.4605
     
     return wind_df
 
+def fetch_weather_data(location=None, latitude=23.276474, longitude=77.460590, forecast_days=5, use_cache=True):
+    """
+    Fetch hourly weather forecast for a given location using Open-Meteo API.
+    
+    Args:
+        location (str, optional): Location string in format like "28.579202°N 77.631433°E"
+        latitude (float, optional): Latitude coordinate
+        longitude (float, optional): Longitude coordinate
+        forecast_days (int, optional): Number of days to forecast
+        use_cache (bool, optional): Serve from / store in the weather cache
+        
+    Returns:
+        DataFrame: Cleaned and structured hourly weather data
+    """
+    # If location is provided, extract coordinates
+    if location:
+        latitude, longitude = parse_coordinates(location)
+
+    # Snap to the cache grid so nearby requests share one forecast
+    latitude, longitude = weather_cache.round_coordinates(latitude, longitude)
+    key = weather_cache.cache_key(latitude, longitude, forecast_days, HOURLY_VARIABLES)
+
+    if use_cache:
+        cached = weather_cache.get(key)
+        if cached is not None:
+            return cached.copy()
+
+    data = _request_forecast([latitude], [longitude], forecast_days)[0]
+    df = _weather_frame(data)
+
+    if use_cache:
+        weather_cache.put(key, df.copy())
+
+    return df
+
+def fetch_wind_weather_data(location=None, latitude=23.276474, longitude=77.460590, forecast_days=5, use_cache=True):
+    """
+    Fetch hourly weather forecast for wind power prediction.
+    
+    Args:
+        location (str, optional): Location string in format like "28.579202°N 77.631433°E"
+        latitude (float, optional): Latitude coordinate
+        longitude (float, optional): Longitude coordinate
+        forecast_days (int, optional): Number of days to forecast
+        use_cache (bool, optional): Serve from / store in the weather cache
+        
+    Returns:
+        DataFrame: Weather data formatted for wind power prediction
+    """
+    # Get general weather data
+    df = fetch_weather_data(location, latitude, longitude, forecast_days, use_cache)
+    
+    return _wind_frame(df)
+
+def fetch_weather_batch(locations, forecast_days=5, plant_type="solar", use_cache=True, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Fetch hourly weather forecasts for many plants with as few API calls as
+    possible. Identical (grid-rounded) coordinates are fetched once, cached
+    locations are skipped, and the rest are sent as comma-separated
+    latitude/longitude lists in chunks of up to chunk_size locations.
+    
+    Args:
+        locations (dict): Mapping of plant_id -> location string (as accepted by
+            parse_coordinates) or (latitude, longitude) tuple
+        forecast_days (int, optional): Number of days to forecast
+        plant_type (str, optional): 'solar' for fetch_weather_data columns,
+            'wind' for fetch_wind_weather_data columns
+        use_cache (bool, optional): Serve from / store in the weather cache
+        chunk_size (int, optional): Maximum locations per API request
+        
+    Returns:
+        dict: Mapping of plant_id -> DataFrame. Plants whose chunk failed to
+            fetch are left out.
+    """
+    # Resolve and deduplicate coordinates
+    plant_keys = {}
+    coordinates = {}
+    for plant_id, location in locations.items():
+        if isinstance(location, (tuple, list)):
+            latitude, longitude = location
+        else:
+            latitude, longitude = parse_coordinates(location)
+        latitude, longitude = weather_cache.round_coordinates(latitude, longitude)
+        key = weather_cache.cache_key(latitude, longitude, forecast_days, HOURLY_VARIABLES)
+        plant_keys[plant_id] = key
+        coordinates[key] = (latitude, longitude)
+
+    frames = {}
+    missing = []
+    for key in coordinates:
+        cached = weather_cache.get(key) if use_cache else None
+        if cached is not None:
+            frames[key] = cached
+        else:
+            missing.append(key)
+
+    print(f"Weather batch: {len(locations)} plants, {len(coordinates)} unique locations, "
+          f"{len(missing)} to fetch in {-(-len(missing) // chunk_size)} requests")
+
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        try:
+            results = _request_forecast([coordinates[key][0] for key in chunk],
+                                        [coordinates[key][1] for key in chunk],
+                                        forecast_days)
+        except Exception as e:
+            print(f"Error fetching weather for {len(chunk)} locations: {str(e)}")
+            continue
+
+        for key, data in zip(chunk, results):
+            df = _weather_frame(data)
+            frames[key] = df
+            if use_cache:
+                weather_cache.put(key, df.copy())
+
+    # Hand every plant its own copy of the (possibly shared) frame
+    weather_frames = {}
+    for plant_id, key in plant_keys.items():
+        if key not in frames:
+            continue
+        df = frames[key].copy()
+        weather_frames[plant_id] = _wind_frame(df) if plant_type == "wind" else df
+
+    return weather_frames
+
 if __name__ == "__main__":
     # Test the function
     data = fetch_weather_data()
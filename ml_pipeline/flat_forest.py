@@ -0,0 +1,270 @@
+import threading
+import weakref
+
+import numpy as np
+
+# Node arrays of a FlatForest, as written by ml_pipeline.package_models
+FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'children', 'value', 'roots')
+
+# sklearn evaluates trees on float32 inputs against float64 thresholds
+INPUT_DTYPE = np.float32
+
+# Upper bound on (row, tree) traversal states held at once; a batch of n
+# rows through T trees is walked in chunks of MAX_STATES // T rows
+MAX_STATES = 1 << 16
+
+# Traversal steps all states together while at most this share have reached
+# a leaf (checked every COMPACT_EVERY levels), then only the unfinished ones
+COMPACT_FRACTION = 0.5
+COMPACT_EVERY = 4
+
+class FlatForest:
+    """
+    A fitted random forest regressor flattened into parallel NumPy node
+    arrays, evaluated for a whole batch with vectorized traversal.
+
+    Every tree's nodes are concatenated into one set of arrays: feature
+    index, threshold, left and right child (as global node indexes) and leaf
+    value, with roots holding each tree's first node. A batch of n rows
+    starts n x T traversal states at the roots and advances them one level
+    per step, so a call costs a few NumPy operations per tree level instead
+    of a Python dispatch per estimator. Missing values are not supported.
+
+    Predictions match sklearn's: inputs are cast to float32 as sklearn does,
+    and leaf values are summed in tree order before dividing by the number of
+    trees, like RandomForestRegressor.predict.
+    """
+    __slots__ = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'n_features', 'preprocess',
+                 'children', 'max_depth')
+
+    def __init__(self, feature, threshold, left, right, value, roots, n_features, preprocess=None,
+                 children=None, max_depth=None):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.n_features = int(n_features)
+        self.preprocess = preprocess
+
+        if not (len(self.feature) == len(self.threshold) == len(self.left) == len(self.right) == len(self.value)):
+            raise ValueError("FlatForest node arrays must all have the same length")
+
+        # children[2 * node + (x <= threshold)] is the next node, in one gather.
+        # Packed artifacts pass it (and max_depth) in, so memory-mapped
+        # arrays are used as they are rather than copied.
+        if children is None:
+            children = np.stack([self.right, self.left], axis=1).ravel()
+        self.children = np.asarray(children, dtype=np.intp)
+        self.max_depth = self._depth() if max_depth is None else int(max_depth)
+
+    def _depth(self):
+        """Longest root-to-leaf path over all trees"""
+        depth, node = 0, self.roots
+        while node.size:
+            split = node[self.left[node] != node]
+            node = np.concatenate([self.left[split], self.right[split]])
+            depth += 1 if node.size else 0
+        return depth
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Flatten a fitted RandomForestRegressor, or a Pipeline ending in one
+        (the earlier steps are kept and applied before the forest)
+
+        Args:
+            model: Fitted RandomForestRegressor or sklearn Pipeline
+
+        Returns:
+            FlatForest: The flattened forest
+        """
+        preprocess = None
+        if hasattr(model, 'steps'):
+            preprocess = model[:-1] if len(model.steps) > 1 else None
+            model = model.steps[-1][1]
+
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators or not hasattr(estimators[0], 'tree_'):
+            raise ValueError(f"Cannot flatten {type(model).__name__}: expected a fitted tree ensemble")
+        if getattr(model, 'n_outputs_', 1) != 1 or hasattr(model, 'classes_'):
+            raise ValueError("Only single-output regression forests can be flattened")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+
+            # Leaves point back to themselves, so a finished state never moves
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, 0.0, tree.threshold))
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.concatenate(values),
+            roots,
+            model.n_features_in_,
+            preprocess
+        )
+
+    def __len__(self):
+        return len(self.roots)
+
+    def __repr__(self):
+        return f"FlatForest(trees={len(self)}, nodes={len(self.value)}, features={self.n_features})"
+
+    @property
+    def nbytes(self):
+        """Bytes held by the node arrays"""
+        return sum(getattr(self, name).nbytes for name in FOREST_ARRAYS)
+
+    def apply(self, X):
+        """
+        Leaf node reached by every row in every tree
+
+        Args:
+            X: 2-D array of (already preprocessed) features
+
+        Returns:
+            numpy.ndarray: (rows x trees) global node indexes
+        """
+        X = np.ascontiguousarray(X, dtype=INPUT_DTYPE)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected a 2-D input with {self.n_features} features, got shape {X.shape}")
+
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+
+        rows, trees = len(X), len(self.roots)
+        leaves = np.empty((rows, trees), dtype=np.intp)
+        chunk = max(1, MAX_STATES // trees)
+
+        for start in range(0, rows, chunk):
+            block = X[start:start + chunk]
+            leaves[start:start + len(block)] = self._walk(block.ravel(), len(block)).reshape(len(block), trees)
+
+        return leaves
+
+    def _walk(self, flat_x, rows):
+        """
+        Walk rows x trees states from the roots to their leaves. State i is
+        row i // trees in tree i % trees.
+        """
+        trees = len(self.roots)
+        node = np.tile(self.roots, rows)
+        row_offset = np.repeat(np.arange(rows) * self.n_features, trees)
+
+        # Step every state while most are still on split nodes (leaves loop
+        # back to themselves), checking every few levels...
+        level, finished = 0, self.left[node] == node
+        while level < self.max_depth and finished.mean() <= COMPACT_FRACTION:
+            for _ in range(min(COMPACT_EVERY, self.max_depth - level)):
+                go_left = flat_x[row_offset + self.feature[node]] <= self.threshold[node]
+                node = self.children[2 * node + go_left]
+            level += COMPACT_EVERY
+            finished = self.left[node] == node
+
+        # ...then only the states that have not reached a leaf
+        active = np.flatnonzero(~finished)
+        while active.size:
+            current = node[active]
+            go_left = flat_x[row_offset[active] + self.feature[current]] <= self.threshold[current]
+            following = self.children[2 * current + go_left]
+            node[active] = following
+            active = active[self.left[following] != following]
+
+        return node
+
+    def tree_predictions(self, X):
+        """
+        Every tree's prediction for every row, from one traversal of the
+        whole forest (after the pipeline's preprocessing steps)
+
+        Args:
+            X: Features as a DataFrame or 2-D array
+
+        Returns:
+            numpy.ndarray: (rows x trees) float64 leaf values
+        """
+        if self.preprocess is not None:
+            X = self.preprocess.transform(X)
+        return self.value[self.apply(X)]
+
+    @staticmethod
+    def _average(leaf_values):
+        # Accumulate tree by tree as sklearn does, so the sum is bit-identical
+        predictions = np.zeros(len(leaf_values))
+        for tree in range(leaf_values.shape[1]):
+            predictions += leaf_values[:, tree]
+        predictions /= leaf_values.shape[1]
+        return predictions
+
+    def predict(self, X):
+        """
+        Predict like the flattened model's predict(): run the pipeline's
+        preprocessing steps, then average the leaf values over all trees
+
+        Args:
+            X: Features as a DataFrame or 2-D array
+
+        Returns:
+            numpy.ndarray: float64 predictions, one per row
+        """
+        return self._average(self.tree_predictions(X))
+
+    def predict_quantiles(self, X, quantiles):
+        """
+        The mean prediction plus quantiles of the trees' predictions for each
+        row, all from the same (rows x trees) leaf values. The quantiles
+        describe the spread of the ensemble, not a calibrated interval.
+
+        Args:
+            X: Features as a DataFrame or 2-D array
+            quantiles (sequence): Quantiles in [0, 1], e.g. (0.1, 0.5, 0.9)
+
+        Returns:
+            tuple: (float64 predictions as predict() returns them,
+                (rows x quantiles) float64 array)
+        """
+        leaf_values = self.tree_predictions(X)
+        bands = np.percentile(leaf_values, np.asarray(quantiles, dtype=np.float64) * 100, axis=1).T
+        return self._average(leaf_values), bands
+
+# Flattened forests, keyed by the fitted model they were built from; entries
+# go away with the model when the registry replaces it
+_compiled = weakref.WeakKeyDictionary()
+_compiled_lock = threading.Lock()
+
+def flat_forest_for(model):
+    """
+    The FlatForest for a fitted model, flattened on first use
+
+    Args:
+        model: Fitted RandomForestRegressor or Pipeline ending in one (a
+            FlatForest, as loaded from a packed artifact, is returned as is)
+
+    Returns:
+        FlatForest: Cached flattened forest
+    """
+    if isinstance(model, FlatForest):
+        return model
+
+    forest = _compiled.get(model)
+    if forest is None:
+        with _compiled_lock:
+            forest = _compiled.get(model)
+            if forest is None:
+                forest = FlatForest.from_model(model)
+                _compiled[model] = forest
+    return forest
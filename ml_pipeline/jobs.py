@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import uuid
+import signal
+import sqlite3
+import threading
+import traceback
+import multiprocessing
+
+# Local queue shared by the web workers (producers) and the job worker
+# processes (consumers) on the same host
+DEFAULT_QUEUE_PATH = '/tmp/forecast_jobs.sqlite3'
+
+# Finished jobs are kept this long so their status can still be polled
+DEFAULT_RETENTION_SECONDS = 24 * 3600
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+# How often the supervisor checks for (and replaces) dead worker processes
+DEFAULT_SUPERVISE_SECONDS = 5.0
+
+_handlers = {}
+_processes = []
+_processes_lock = threading.Lock()
+_stopping = threading.Event()
+_supervisor = None
+
+def _queue_path():
+    return os.environ.get('JOB_QUEUE_PATH', DEFAULT_QUEUE_PATH)
+
+def _connect():
+    """
+    Open the queue database, creating the jobs table on first use
+    """
+    conn = sqlite3.connect(_queue_path(), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL lets status polls read while a worker is writing progress
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            dedupe_key TEXT,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            worker_pid INTEGER,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)")
+    # Worker processes on the host, so any process can report their health
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS workers (
+            pid INTEGER PRIMARY KEY,
+            started_at REAL NOT NULL,
+            stopped_at REAL,
+            exit_code INTEGER
+        )
+    """)
+    return conn
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except (OSError, TypeError):
+        return False
+
+def _row_to_job(row):
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    end = job['finished_at'] or time.time()
+    job['elapsed_seconds'] = round(end - job['started_at'], 3) if job['started_at'] else None
+    return job
+
+def register_handler(kind):
+    """
+    Decorator registering the function that runs jobs of the given kind.
+    Handlers are called as handler(payload, progress) where
+    progress(fraction, message) reports progress back to the queue.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+def enqueue(kind, payload, dedupe_key=None):
+    """
+    Add a job to the queue
+
+    Args:
+        kind (str): Registered handler name
+        payload (dict): JSON-serializable job arguments
+        dedupe_key (str, optional): If a queued or running job has the same
+            key, its id is returned instead of queueing a duplicate
+
+    Returns:
+        str: Job id
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if dedupe_key:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                (dedupe_key,)
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return row['id']
+
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO jobs (id, kind, dedupe_key, payload, status, message, created_at) "
+            "VALUES (?, ?, ?, ?, 'queued', 'Waiting for a worker', ?)",
+            (job_id, kind, dedupe_key, json.dumps(payload), time.time())
+        )
+        conn.execute("COMMIT")
+        return job_id
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def get_job(job_id):
+    """
+    Return a job's status, progress and result
+
+    Returns:
+        dict: Job record, or None if the id is unknown
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+def _claim_next(conn):
+    """
+    Atomically move the oldest queued job to 'running'
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    row = conn.execute(
+        "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+    ).fetchone()
+    if row is None:
+        conn.execute("COMMIT")
+        return None
+
+    conn.execute(
+        "UPDATE jobs SET status = 'running', started_at = ?, worker_pid = ?, message = 'Started' WHERE id = ?",
+        (time.time(), os.getpid(), row['id'])
+    )
+    conn.execute("COMMIT")
+    return row
+
+def _finish(conn, job_id, status, result=None, error=None):
+    # Succeeded jobs keep the handler's last progress message as a summary;
+    # failed jobs keep the progress they reached
+    if status == 'succeeded':
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = 1.0, message = COALESCE(message, 'Completed'), "
+            "result = ?, finished_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, time.time(), job_id)
+        )
+    else:
+        conn.execute(
+            "UPDATE jobs SET status = ?, message = 'Failed', error = ?, finished_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id)
+        )
+
+def _run_job(conn, row):
+    job_id = row['id']
+
+    def progress(fraction, message=None):
+        conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?",
+                     (round(float(fraction), 4), message, job_id))
+
+    handler = _handlers.get(row['kind'])
+    if handler is None:
+        _finish(conn, job_id, 'failed', error=f"No handler registered for job kind '{row['kind']}'")
+        return
+
+    print(f"Job {job_id} ({row['kind']}) started in worker {os.getpid()}")
+    try:
+        result = handler(json.loads(row['payload']), progress)
+        _finish(conn, job_id, 'succeeded', result=result)
+        print(f"Job {job_id} ({row['kind']}) succeeded")
+    except Exception as e:
+        print(f"Job {job_id} ({row['kind']}) failed: {str(e)}")
+        print(traceback.format_exc())
+        _finish(conn, job_id, 'failed', error=str(e))
+
+def recover_stale_jobs():
+    """
+    Fail 'running' jobs whose worker process no longer exists, e.g. after a
+    crash or redeploy, so pollers do not wait on them forever, and record
+    such workers as stopped
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    conn = _connect()
+    recovered = 0
+    try:
+        for row in conn.execute("SELECT pid FROM workers WHERE stopped_at IS NULL").fetchall():
+            if not _pid_alive(row['pid']):
+                conn.execute("UPDATE workers SET stopped_at = ? WHERE pid = ?", (time.time(), row['pid']))
+        for row in conn.execute("SELECT id, worker_pid FROM jobs WHERE status = 'running'").fetchall():
+            if _pid_alive(row['worker_pid']):
+                continue
+            _finish(conn, row['id'], 'failed', error='Worker process exited before the job finished')
+            recovered += 1
+    finally:
+        conn.close()
+    return recovered
+
+def purge_finished(retention_seconds=DEFAULT_RETENTION_SECONDS):
+    """
+    Delete finished jobs, and stopped workers, older than the retention window
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    conn = _connect()
+    try:
+        cutoff = time.time() - retention_seconds
+        conn.execute("DELETE FROM workers WHERE stopped_at < ?", (cutoff,))
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?", (cutoff,)
+        )
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def run_worker(poll_interval=1.0, max_jobs=None, preload=True):
+    """
+    Process queued jobs until stopped (SIGTERM/SIGINT) or max_jobs is reached
+
+    Args:
+        poll_interval (float, optional): Seconds to sleep when the queue is empty
+        max_jobs (int, optional): Exit after this many jobs
+        preload (bool, optional): Load the forecasting models before the
+            first job. Workers are spawned, so they do not share the models
+            the gunicorn master preloaded; packed artifacts are memory-mapped,
+            so their pages are still shared between the workers.
+    """
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    if preload:
+        from ml_pipeline.model_registry import preload_models
+        loaded = preload_models()
+        print(f"Job worker {os.getpid()} loaded models: {', '.join(loaded) or 'none'}")
+
+    conn = _connect()
+    conn.execute("INSERT OR REPLACE INTO workers (pid, started_at) VALUES (?, ?)", (os.getpid(), time.time()))
+    processed = 0
+    print(f"Job worker {os.getpid()} polling {_queue_path()}")
+    try:
+        while not stopping and (max_jobs is None or processed < max_jobs):
+            row = _claim_next(conn)
+            if row is None:
+                time.sleep(poll_interval)
+                continue
+            _run_job(conn, row)
+            processed += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.execute("UPDATE workers SET stopped_at = ?, exit_code = 0 WHERE pid = ?", (time.time(), os.getpid()))
+        conn.close()
+        print(f"Job worker {os.getpid()} stopped after {processed} jobs")
+
+def _supervise_seconds():
+    return float(os.environ.get('JOB_WORKER_SUPERVISE_SECONDS', DEFAULT_SUPERVISE_SECONDS))
+
+def _start_worker(context, index):
+    process = context.Process(target=run_worker, name=f'forecast-job-worker-{index}', daemon=True)
+    process.start()
+    return process
+
+def _supervise(context):
+    """
+    Replace worker processes that died (crash, OOM kill) until stop_workers
+    is called, failing the job a dead worker was running
+    """
+    while not _stopping.wait(_supervise_seconds()):
+        with _processes_lock:
+            for index, process in enumerate(_processes):
+                if process.is_alive() or _stopping.is_set():
+                    continue
+                print(f"Job worker {process.pid} exited with code {process.exitcode}, restarting it")
+                conn = _connect()
+                try:
+                    conn.execute("UPDATE workers SET stopped_at = ?, exit_code = ? WHERE pid = ? AND stopped_at IS NULL",
+                                 (time.time(), process.exitcode, process.pid))
+                finally:
+                    conn.close()
+                recover_stale_jobs()
+                _processes[index] = _start_worker(context, index)
+
+def start_workers(count=None):
+    """
+    Start job worker processes, and a supervisor thread restarting any that
+    die. Uses the 'spawn' start method so workers do not inherit the
+    caller's sockets, DB connections or gunicorn state.
+
+    Args:
+        count (int, optional): Number of workers (default JOB_WORKERS or 1)
+
+    Returns:
+        list: Started multiprocessing.Process objects
+    """
+    if count is None:
+        count = int(os.environ.get('JOB_WORKERS', 1))
+
+    recover_stale_jobs()
+    purge_finished()
+
+    global _supervisor
+    context = multiprocessing.get_context('spawn')
+    with _processes_lock:
+        started = [_start_worker(context, len(_processes) + index) for index in range(count)]
+        _processes.extend(started)
+
+    if started and (_supervisor is None or not _supervisor.is_alive()):
+        _stopping.clear()
+        _supervisor = threading.Thread(target=_supervise, args=(context,), name='forecast-job-supervisor',
+                                       daemon=True)
+        _supervisor.start()
+    return started
+
+def stop_workers(timeout=10):
+    """
+    Stop the supervisor, ask started worker processes to exit and wait for them
+    """
+    _stopping.set()
+    with _processes_lock:
+        for process in _processes:
+            if process.is_alive():
+                process.terminate()
+        for process in _processes:
+            process.join(timeout)
+        _processes.clear()
+
+def queue_stats():
+    """
+    Return job counts by status, the age of the oldest queued job and the
+    health of the worker processes: 'alive', 'dead' (exited without
+    stopping and not replaced yet) and 'crashed' (exited abnormally, within
+    the retention window)
+
+    Returns:
+        dict: Queue statistics
+    """
+    conn = _connect()
+    try:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        oldest = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        running = [row['pid'] for row in conn.execute("SELECT pid FROM workers WHERE stopped_at IS NULL")]
+        crashed = conn.execute("SELECT COUNT(*) FROM workers WHERE stopped_at IS NOT NULL "
+                               "AND (exit_code IS NULL OR exit_code != 0)").fetchone()[0]
+    finally:
+        conn.close()
+
+    alive = sum(_pid_alive(pid) for pid in running)
+    return {
+        'counts': {status: counts.get(status, 0) for status in JOB_STATUSES},
+        'oldest_queued_seconds': round(time.time() - oldest, 3) if oldest else None,
+        'workers': {'alive': alive, 'dead': len(running) - alive, 'crashed': crashed},
+        'path': _queue_path()
+    }
+
+@register_handler('refresh_forecasts')
+def _refresh_forecasts_job(payload, progress):
+    """
+    Run the forecast refresh orchestrator for the plants in the payload
+    """
+    from ml_pipeline.orchestrator import refresh_forecasts, summarize
+
+    reports = refresh_forecasts(payload['plants'], tuple(payload['plant_types']), progress=progress)
+    progress(1.0, summarize(reports))
+    return reports
@@ -0,0 +1,461 @@
+import os
+import json
+import time
+import gzip
+import pickle
+import threading
+import joblib
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+# Deployed artifact for each plant type, relative to MODELS_DIR
+MODEL_FILES = {
+    'solar': 'solar_power_rf_model.pkl',
+    'wind': 'wind_power_rf_model.pkl.gz',
+}
+
+# Artifacts of the alternative model backends (see ml_pipeline.backends),
+# relative to MODELS_DIR and keyed '<plant_type>/<backend>'. Their registry
+# entries use the same keys; the 'rf' backend is the artifact in MODEL_FILES.
+BACKEND_FILES = {
+    'solar/hgb': 'solar_power_hgb_model.joblib',
+    'wind/hgb': 'wind_power_hgb_model.joblib',
+    'wind/power_curve': 'wind_power_curve.joblib',
+}
+
+# Packed artifacts written by ml_pipeline.package_models: one directory per
+# plant type holding the flattened forest as .npy files, memory-mapped
+# read-only on load so every process shares the same page-cache copy
+PACKED_DIR = os.path.join(MODELS_DIR, 'packed')
+PACKED_MANIFEST = 'manifest.json'
+PACKED_PREPROCESS = 'preprocess.joblib'
+PACKED_ESTIMATOR = 'estimator.joblib'
+
+# Which artifact load_model reads (MODEL_ARTIFACTS):
+#   'auto'   - the packed artifact if it is up to date with the source
+#              artifact, otherwise the source artifact
+#   'packed' - the packed artifact, failing if it is missing or stale
+#   'pickle' - always the source artifact in MODEL_FILES
+MODEL_ARTIFACT_MODES = ('auto', 'packed', 'pickle')
+
+# Loaded models, keyed by plant type. Entries are only ever replaced whole,
+# so readers can look them up without taking the lock.
+_registry = {}
+_lock = threading.Lock()
+
+def _current_rss_bytes():
+    """
+    Return the resident set size of this process in bytes (0 if unknown)
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+        # ru_maxrss is the peak RSS in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+def _estimate_model_bytes(model):
+    """
+    Estimate the in-memory size of the tree arrays held by a fitted model
+    """
+    # Flattened forests from packed artifacts (and power curves) report their arrays
+    if hasattr(model, 'nbytes') and not hasattr(model, 'estimators_'):
+        return model.nbytes
+
+    # Histogram gradient boosting keeps one node array per boosting iteration
+    if hasattr(model, '_predictors'):
+        return sum(predictor.nodes.nbytes for predictors in model._predictors for predictor in predictors)
+
+    # Unwrap sklearn pipelines down to the final estimator
+    if hasattr(model, 'steps'):
+        model = model.steps[-1][1]
+
+    estimators = getattr(model, 'estimators_', [model])
+    total = 0
+
+    for estimator in estimators:
+        tree = getattr(estimator, 'tree_', None)
+        if tree is None:
+            continue
+        state = tree.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+
+    return total
+
+def _read_artifact(path):
+    """
+    Deserialize a model artifact (joblib bundle or gzipped pickle)
+    """
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return pickle.load(f)
+    return joblib.load(path)
+
+def _write_artifact(artifact, path):
+    """
+    Serialize a model artifact in the format _read_artifact expects (gzipped
+    pickle for .gz paths, joblib otherwise). Written to a temporary file and
+    renamed into place, so readers never see a partial artifact.
+    """
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        if path.endswith('.gz'):
+            with gzip.open(temp_path, 'wb') as f:
+                pickle.dump(artifact, f)
+        else:
+            joblib.dump(artifact, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _artifact_mode():
+    mode = os.environ.get('MODEL_ARTIFACTS', 'auto').lower()
+    if mode not in MODEL_ARTIFACT_MODES:
+        raise ValueError(f"MODEL_ARTIFACTS must be one of {MODEL_ARTIFACT_MODES}, got '{mode}'")
+    return mode
+
+def packed_manifest(plant_type, packed_dir=None):
+    """
+    Read the manifest of a plant type's packed artifact
+
+    Returns:
+        dict: The manifest, or None if the artifact has not been packaged
+    """
+    path = os.path.join(packed_dir or PACKED_DIR, plant_type, PACKED_MANIFEST)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _packed_is_current(plant_type, manifest):
+    """
+    True if the packed artifact was built from the source artifact now on disk
+    """
+    source_path = os.path.join(MODELS_DIR, MODEL_FILES[plant_type])
+    try:
+        return (manifest['source_size'] == os.path.getsize(source_path)
+                and manifest['source_mtime'] == os.path.getmtime(source_path))
+    except OSError:
+        # Source artifact not shipped alongside the packed one
+        return True
+
+def _read_packed(plant_type):
+    """
+    Load a packed artifact: the flattened forest memory-mapped read-only,
+    plus the small scaler / preprocessing objects
+
+    Returns:
+        tuple: (FlatForest, scaler or None, manifest)
+    """
+    import numpy as np
+    from ml_pipeline.flat_forest import FlatForest, FOREST_ARRAYS
+
+    directory = os.path.join(PACKED_DIR, plant_type)
+    manifest = packed_manifest(plant_type)
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+        for name in FOREST_ARRAYS
+    }
+    extras = joblib.load(os.path.join(directory, PACKED_PREPROCESS))
+
+    forest = FlatForest(
+        arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'], arrays['value'],
+        arrays['roots'], manifest['n_features'], extras.get('preprocess'),
+        children=arrays['children'], max_depth=manifest['max_depth']
+    )
+    return forest, extras.get('scaler'), manifest
+
+def _use_packed(plant_type):
+    """
+    Decide whether load_model reads the packed artifact for a plant type
+    """
+    mode = _artifact_mode()
+    if mode == 'pickle':
+        return False
+
+    manifest = packed_manifest(plant_type)
+    current = manifest is not None and _packed_is_current(plant_type, manifest)
+    if mode == 'packed' and not current:
+        raise FileNotFoundError(f"No up-to-date packed {plant_type} model in {PACKED_DIR} "
+                                f"(run python -m ml_pipeline.package_models)")
+    if manifest is not None and not current:
+        print(f"Packed {plant_type} model is older than {MODEL_FILES[plant_type]}, loading the source artifact "
+              f"(run python -m ml_pipeline.package_models to repackage)")
+    return current
+
+def load_model(plant_type):
+    """
+    Load the model for a plant type from disk and store it in the registry.
+    Packed artifacts load the flattened forest as 'model' (memory-mapped);
+    the sklearn estimator is then only read by get_estimator when needed.
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+
+    Returns:
+        dict: Registry entry with the model, its scaler and load statistics
+    """
+    if plant_type not in MODEL_FILES:
+        raise ValueError(f"Unknown plant type: {plant_type}")
+
+    packed = _use_packed(plant_type)
+    source_path = os.path.join(MODELS_DIR, MODEL_FILES[plant_type])
+    if packed:
+        model_path = os.path.join(PACKED_DIR, plant_type, PACKED_MANIFEST)
+    else:
+        model_path = source_path
+    print(f"Loading {plant_type} model from: {model_path}")
+
+    rss_before = _current_rss_bytes()
+    start = time.perf_counter()
+    if packed:
+        model, scaler, manifest = _read_packed(plant_type)
+    else:
+        artifact = _read_artifact(model_path)
+    load_seconds = time.perf_counter() - start
+    rss_after = _current_rss_bytes()
+
+    if not packed:
+        # Solar artifacts are {'scaler', 'model'} bundles; wind is a single pipeline
+        if isinstance(artifact, dict):
+            model = artifact['model']
+            scaler = artifact.get('scaler')
+        else:
+            model = artifact
+            scaler = None
+
+    entry = {
+        'plant_type': plant_type,
+        'model': model,
+        'scaler': scaler,
+        'format': 'packed' if packed else 'pickle',
+        'path': model_path,
+        'mtime': os.path.getmtime(model_path),
+        'file_size_bytes': os.path.getsize(model_path),
+        'load_seconds': load_seconds,
+        'rss_delta_bytes': max(0, rss_after - rss_before),
+        'model_bytes': _estimate_model_bytes(model),
+        'loaded_at': time.time(),
+        'pid': os.getpid()
+    }
+    if packed:
+        # Watch the source artifact too, so a retrain is noticed before repackaging
+        entry['file_size_bytes'] = manifest['packed_bytes']
+        entry['source_path'] = source_path
+        entry['source_mtime'] = manifest['source_mtime']
+        entry['estimator_path'] = os.path.join(PACKED_DIR, plant_type, PACKED_ESTIMATOR)
+
+    _registry[plant_type] = entry
+    print(f"Loaded {entry['format']} {plant_type} model in {load_seconds:.3f}s "
+          f"(~{entry['model_bytes'] / 1e6:.1f} MB of tree arrays, "
+          f"RSS +{entry['rss_delta_bytes'] / 1e6:.1f} MB)")
+
+    return entry
+
+def get_model(plant_type):
+    """
+    Return the registry entry for a plant type, loading it on first use
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+
+    Returns:
+        dict: Registry entry with 'model' and 'scaler' keys
+    """
+    entry = _registry.get(plant_type)
+    if entry is not None:
+        return entry
+
+    with _lock:
+        # Another thread may have loaded it while we waited
+        entry = _registry.get(plant_type)
+        if entry is None:
+            entry = load_model(plant_type)
+        return entry
+
+def _load_backend_model(key):
+    """
+    Load an alternative backend's artifact (BACKEND_FILES) into the registry
+
+    Args:
+        key (str): '<plant_type>/<backend>'
+
+    Returns:
+        dict: Registry entry with the backend's model
+    """
+    model_path = os.path.join(MODELS_DIR, BACKEND_FILES[key])
+    if not os.path.exists(model_path):
+        plant_type, backend = key.split('/')
+        raise FileNotFoundError(f"No {backend} model for {plant_type} at {model_path} (run python -m "
+                                f"ml_pipeline.train_models --type {plant_type} --backend {backend} --deploy)")
+    print(f"Loading {key} model from: {model_path}")
+
+    rss_before = _current_rss_bytes()
+    start = time.perf_counter()
+    model = _read_artifact(model_path)
+    load_seconds = time.perf_counter() - start
+    rss_after = _current_rss_bytes()
+
+    entry = {
+        'plant_type': key.split('/')[0],
+        'backend': key.split('/')[1],
+        'model': model,
+        'scaler': None,
+        'format': 'pickle',
+        'path': model_path,
+        'mtime': os.path.getmtime(model_path),
+        'file_size_bytes': os.path.getsize(model_path),
+        'load_seconds': load_seconds,
+        'rss_delta_bytes': max(0, rss_after - rss_before),
+        'model_bytes': _estimate_model_bytes(model),
+        'loaded_at': time.time(),
+        'pid': os.getpid()
+    }
+
+    _registry[key] = entry
+    print(f"Loaded {key} model in {load_seconds:.3f}s (~{entry['model_bytes'] / 1e6:.2f} MB)")
+
+    return entry
+
+def get_backend_model(plant_type, backend):
+    """
+    Return the registry entry of an alternative backend's model, loading it on first use
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        backend (str): Backend name with an artifact in BACKEND_FILES
+
+    Returns:
+        dict: Registry entry with the backend's model
+    """
+    key = f"{plant_type}/{backend}"
+    if key not in BACKEND_FILES:
+        raise ValueError(f"No {backend} model artifact for {plant_type}")
+
+    entry = _registry.get(key)
+    if entry is not None:
+        return entry
+
+    with _lock:
+        entry = _registry.get(key)
+        if entry is None:
+            entry = _load_backend_model(key)
+        return entry
+
+def get_estimator(entry):
+    """
+    The fitted sklearn estimator for a registry entry. Packed entries hold a
+    flattened forest as 'model'; their estimator is read on first use.
+
+    Args:
+        entry (dict): Registry entry from get_model
+
+    Returns:
+        The fitted RandomForestRegressor (solar) or Pipeline (wind)
+    """
+    if entry['format'] != 'packed':
+        return entry['model']
+
+    estimator = entry.get('estimator')
+    if estimator is None:
+        with _lock:
+            estimator = entry.get('estimator')
+            if estimator is None:
+                print(f"Loading sklearn estimator for packed {entry['plant_type']} model")
+                estimator = joblib.load(entry['estimator_path'])
+                entry['estimator'] = estimator
+    return estimator
+
+def reload_model(plant_type):
+    """
+    Force a reload of the model for a plant type (or a '<plant_type>/<backend>'
+    registry key) from disk
+    """
+    with _lock:
+        if plant_type in BACKEND_FILES:
+            return _load_backend_model(plant_type)
+        return load_model(plant_type)
+
+def reload_if_changed(plant_types=None):
+    """
+    Reload any loaded model whose artifact on disk has changed since it was loaded
+
+    Args:
+        plant_types (list, optional): Plant types to check, defaults to all loaded models
+
+    Returns:
+        list: Plant types that were reloaded
+    """
+    reloaded = []
+
+    for plant_type in plant_types or list(_registry.keys()):
+        entry = _registry.get(plant_type)
+        if entry is None:
+            continue
+
+        try:
+            changed = os.path.getmtime(entry['path']) != entry['mtime']
+            if 'source_path' in entry and os.path.exists(entry['source_path']):
+                changed = changed or os.path.getmtime(entry['source_path']) != entry['source_mtime']
+        except OSError:
+            # Artifact removed or being replaced - keep serving the loaded model
+            continue
+
+        if changed:
+            print(f"Model artifact for {plant_type} changed on disk, reloading")
+            reload_model(plant_type)
+            reloaded.append(plant_type)
+
+    return reloaded
+
+def preload_models(plant_types=None):
+    """
+    Load all models up front, e.g. in the gunicorn master before workers fork
+    so the deserialized forests are shared copy-on-write between workers.
+    Each plant type loads the model of its configured backend.
+
+    Args:
+        plant_types (list, optional): Plant types to load, defaults to all
+
+    Returns:
+        list: Plant types that were loaded successfully
+    """
+    from ml_pipeline.backends import backend_entry
+
+    loaded = []
+
+    for plant_type in plant_types or list(MODEL_FILES.keys()):
+        try:
+            backend_entry(plant_type)
+            loaded.append(plant_type)
+        except Exception as e:
+            print(f"Could not preload {plant_type} model: {str(e)}")
+
+    return loaded
+
+def model_stats():
+    """
+    Return load statistics for every model currently in the registry
+
+    Returns:
+        dict: Plant type -> statistics (without the model objects themselves)
+    """
+    stats = {}
+
+    for plant_type, entry in _registry.items():
+        stats[plant_type] = {
+            key: value for key, value in entry.items()
+            if key not in ('model', 'scaler', 'estimator')
+        }
+
+    return stats
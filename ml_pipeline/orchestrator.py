@@ -0,0 +1,336 @@
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from ml_pipeline.fetch_weather import fetch_weather_batch, BATCH_CHUNK_SIZE
+from ml_pipeline.predict_hourly import predict_hourly_generation_batch
+from ml_pipeline.prediction_batch import PredictionBatch
+from ml_pipeline.aggregate_daily import (aggregate_daily_generation, aggregate_daily_frame,
+                                         filter_daylight_hours, load_input_fingerprints, save_predictions_bulk)
+from ml_pipeline.db_pool import pool_settings
+
+PLANT_TYPES = ('solar', 'wind')
+
+# Plants written per staging-table MERGE
+DEFAULT_SAVE_CHUNK = 25
+
+# Share of a plant type's run completed after each stage, for progress reporting
+STAGE_PROGRESS = {'fetch': 0.35, 'predict': 0.65, 'aggregate': 0.75, 'save': 1.0}
+
+def _io_workers():
+    return int(os.environ.get('REFRESH_IO_WORKERS', 4))
+
+def _save_workers():
+    # More writers than pool slots would only queue up waiting for a connection
+    settings = pool_settings()
+    return max(1, min(_io_workers(), settings['pool_size'] + settings['max_overflow']))
+
+def _save_chunk():
+    return int(os.environ.get('REFRESH_SAVE_CHUNK', DEFAULT_SAVE_CHUNK))
+
+def _skip_unchanged():
+    # Reuse stored predictions for hours whose forecast inputs have not
+    # changed; off by default, as it needs the input_hash column (migration 002)
+    return os.environ.get('REFRESH_SKIP_UNCHANGED', '0').lower() not in ('0', 'false', 'no')
+
+def _chunks(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def _fetch_stage(pool, plants, plant_type, report):
+    """
+    Fetch weather for all plants, one multi-location request per chunk of
+    plants, with chunks running concurrently
+    """
+    frames = {}
+    futures = {
+        pool.submit(fetch_weather_batch, {p['id']: p['location'] for p in chunk}, plant_type=plant_type): chunk
+        for chunk in _chunks(plants, BATCH_CHUNK_SIZE)
+    }
+    for future in as_completed(futures):
+        try:
+            frames.update(future.result())
+        except Exception as e:
+            for plant in futures[future]:
+                report['failures'][plant['id']] = f"fetch: {str(e)}"
+
+    for plant in plants:
+        if plant['id'] not in frames and plant['id'] not in report['failures']:
+            report['failures'][plant['id']] = "fetch: no weather data returned"
+
+    return frames
+
+def _fingerprint_stage(frames, plant_type):
+    """
+    Load the stored input fingerprints of the fetched plants' forecast hours.
+    Returns None (recompute everything) when skipping is off or the read fails.
+    """
+    if not frames or not _skip_unchanged():
+        return None
+
+    try:
+        start = min(frame['time'].min() for frame in frames.values() if len(frame))
+        return load_input_fingerprints(frames.keys(), plant_type, start.to_pydatetime())
+    except Exception as e:
+        print(f"Could not load {plant_type} input fingerprints ({str(e)}), recomputing every row")
+        return None
+
+def _predict_stage(frames, plant_type, report, known=None):
+    """
+    Predict hourly generation for every fetched plant in one model call,
+    skipping rows whose input fingerprint matches the stored one in known
+    """
+    predictions = predict_hourly_generation_batch(frames, plant_type, output="batch", known=known)
+
+    for plant_id in frames:
+        if len(predictions.get(plant_id, [])) == 0:
+            report['failures'][plant_id] = "predict: no predictions generated"
+
+    predictions = {plant_id: batch for plant_id, batch in predictions.items() if len(batch)}
+    rows = sum(len(batch) for batch in predictions.values())
+    skipped = sum(int(batch.reused.sum()) for batch in predictions.values() if batch.reused is not None)
+    report['counts']['recomputed_hourly'] = rows - skipped
+    report['counts']['skipped_hourly'] = skipped
+
+    return predictions
+
+def _daily_records_by_plant(daily):
+    """
+    Split aggregate_daily_frame output (sorted by plant) into per-plant lists
+    of daily prediction dicts
+    """
+    records = [
+        {'date': date_str, 'total_predicted_generation': total, 'below_threshold': below}
+        for date_str, total, below in zip(daily['date'].tolist(),
+                                          daily['total_predicted_generation'].tolist(),
+                                          daily['below_threshold'].tolist())
+    ]
+    plant_ids = daily['plant_id'].to_numpy()
+    starts = np.concatenate([[0], np.flatnonzero(plant_ids[1:] != plant_ids[:-1]) + 1, [len(plant_ids)]])
+
+    return {
+        plant_ids[starts[i]].item(): records[starts[i]:starts[i + 1]]
+        for i in range(len(starts) - 1)
+    }
+
+def _aggregate_per_plant(plants, predictions, plant_type, report):
+    """
+    Aggregate plant by plant, so a bad plant only fails itself
+    """
+    daily_by_plant = {}
+    for plant in plants:
+        batch = predictions.get(plant['id'])
+        if batch is None:
+            continue
+        try:
+            # Solar daily totals only count daylight hours
+            daylight = filter_daylight_hours(batch) if plant_type == 'solar' else batch
+            daily_by_plant[plant['id']] = aggregate_daily_generation(daylight, plant['threshold_value'])
+        except Exception as e:
+            report['failures'][plant['id']] = f"aggregate: {str(e)}"
+    return daily_by_plant
+
+def _changed_only(batch):
+    """
+    Reduce a plant's hourly predictions to the rows recomputed this run
+    """
+    if batch.reused is None:
+        return batch
+    if batch.reused.all():
+        return batch[:0]
+    return batch.select(~batch.reused)
+
+def _aggregate_stage(plants, predictions, plant_type, report):
+    """
+    Aggregate all plants' hourly predictions to daily totals in one vectorized
+    pass. Hourly predictions are handed to the writer as PredictionBatch
+    views, with no per-row dicts or strings. Only recomputed hours are
+    passed on to be written. Daily totals (a handful per plant) are always
+    rewritten, as their recommendation also depends on the plant's threshold,
+    which the input fingerprints do not cover.
+    """
+    if not predictions:
+        return {}
+
+    try:
+        stacked = PredictionBatch.concat(predictions.values(), plant_type)
+        # Solar daily totals only count daylight hours
+        if plant_type == 'solar':
+            stacked = filter_daylight_hours(stacked)
+        thresholds = {plant['id']: plant['threshold_value'] for plant in plants}
+        daily_by_plant = _daily_records_by_plant(aggregate_daily_frame(stacked, thresholds))
+    except Exception as e:
+        print(f"Fleet aggregation of {plant_type} plants failed ({str(e)}), aggregating individually")
+        daily_by_plant = _aggregate_per_plant(plants, predictions, plant_type, report)
+
+    plant_predictions = {}
+    for plant in plants:
+        if plant['id'] not in predictions or plant['id'] in report['failures']:
+            continue
+        daily = daily_by_plant.get(plant['id'], [])
+        hourly = _changed_only(predictions[plant['id']])
+        if len(hourly) or daily:
+            plant_predictions[plant['id']] = (hourly, daily)
+
+    return plant_predictions
+
+def _save_chunk_isolated(chunk, plant_type, report):
+    """
+    Save one chunk of plants; if the batch fails, retry plant by plant so a
+    single bad plant does not lose the others' predictions
+    """
+    try:
+        return save_predictions_bulk(chunk, plant_type)
+    except Exception as e:
+        if len(chunk) == 1:
+            report['failures'][next(iter(chunk))] = f"save: {str(e)}"
+            return None
+        print(f"Batch save of {len(chunk)} {plant_type} plants failed ({str(e)}), retrying individually")
+
+    totals = {}
+    for plant_id, pair in chunk.items():
+        try:
+            counts = save_predictions_bulk({plant_id: pair}, plant_type)
+        except Exception as e:
+            report['failures'][plant_id] = f"save: {str(e)}"
+            continue
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+def _save_stage(pool, plant_predictions, plant_type, report):
+    """
+    Write predictions in chunks of plants, chunks running concurrently on
+    their own pooled connections
+    """
+    items = list(plant_predictions.items())
+    futures = [
+        pool.submit(_save_chunk_isolated, dict(chunk), plant_type, report)
+        for chunk in _chunks(items, _save_chunk())
+    ]
+    for future in as_completed(futures):
+        counts = future.result()
+        if counts:
+            for key, value in counts.items():
+                report['counts'][key] = report['counts'].get(key, 0) + value
+
+def _timed(report, stage, func, *args):
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        report['timings'][stage] = round(time.perf_counter() - start, 4)
+
+def refresh_plant_type(plants, plant_type, progress=None):
+    """
+    Run fetch -> predict -> aggregate -> save for all plants of one type
+
+    Args:
+        plants (list): Plant dicts with 'id', 'location' and 'threshold_value'
+        plant_type (str): 'solar' or 'wind'
+        progress (callable, optional): Called as progress(fraction, message)
+            after each stage
+
+    Returns:
+        dict: Report with per-stage timings, write counts, recomputed vs
+            skipped (unchanged input) hourly rows, and failures
+            keyed by plant_id
+    """
+    report = {
+        'plant_type': plant_type,
+        'plants': len(plants),
+        'succeeded': 0,
+        'failures': {},
+        'timings': {},
+        'counts': {}
+    }
+    if not plants:
+        return report
+
+    if progress is None:
+        progress = lambda fraction, message: None
+
+    start = time.perf_counter()
+
+    progress(0.0, f"Fetching weather for {len(plants)} {plant_type} plants")
+    with ThreadPoolExecutor(max_workers=_io_workers(), thread_name_prefix=f'fetch-{plant_type}') as pool:
+        frames = _timed(report, 'fetch', _fetch_stage, pool, plants, plant_type, report)
+
+    progress(STAGE_PROGRESS['fetch'], f"Predicting {plant_type} generation")
+    known = _timed(report, 'fingerprint', _fingerprint_stage, frames, plant_type)
+    predictions = _timed(report, 'predict', _predict_stage, frames, plant_type, report, known)
+
+    progress(STAGE_PROGRESS['predict'], f"Aggregating {plant_type} daily totals")
+    plant_predictions = _timed(report, 'aggregate', _aggregate_stage, plants, predictions, plant_type, report)
+
+    progress(STAGE_PROGRESS['aggregate'], f"Saving {plant_type} predictions")
+    with ThreadPoolExecutor(max_workers=_save_workers(), thread_name_prefix=f'save-{plant_type}') as pool:
+        _timed(report, 'save', _save_stage, pool, plant_predictions, plant_type, report)
+
+    report['timings']['total'] = round(time.perf_counter() - start, 4)
+    report['succeeded'] = len(plants) - len(report['failures'])
+    progress(STAGE_PROGRESS['save'], f"Refreshed {report['succeeded']} of {len(plants)} {plant_type} plants")
+
+    print(f"Refreshed {report['succeeded']} of {len(plants)} {plant_type} plants in "
+          f"{report['timings']['total']:.2f}s ({report['timings']}), "
+          f"{report['counts'].get('recomputed_hourly', 0)} hourly rows recomputed, "
+          f"{report['counts'].get('skipped_hourly', 0)} unchanged")
+    for plant_id, reason in report['failures'].items():
+        print(f"  {plant_type} plant {plant_id} failed - {reason}")
+
+    return report
+
+def refresh_forecasts(plants, plant_types=PLANT_TYPES, progress=None):
+    """
+    Refresh forecasts for a fleet of plants. A failure for one plant (or one
+    plant type) is recorded in the report and never aborts the rest.
+
+    Args:
+        plants (list): Plant dicts with 'id', 'type', 'location' and 'threshold_value'
+        plant_types (tuple, optional): Plant types to refresh
+        progress (callable, optional): Called as progress(fraction, message)
+            with the fraction of the whole run completed
+
+    Returns:
+        dict: Mapping of plant_type -> report from refresh_plant_type
+    """
+    reports = {}
+    for index, plant_type in enumerate(plant_types):
+        typed_plants = [plant for plant in plants if plant['type'] == plant_type]
+
+        # Each plant type gets an equal share of the overall progress
+        type_progress = None if progress is None else (
+            lambda fraction, message, index=index: progress((index + fraction) / len(plant_types), message))
+
+        try:
+            reports[plant_type] = refresh_plant_type(typed_plants, plant_type, type_progress)
+        except Exception as e:
+            print(f"Error refreshing {plant_type} forecasts: {str(e)}")
+            print(traceback.format_exc())
+            reports[plant_type] = {
+                'plant_type': plant_type,
+                'plants': len(typed_plants),
+                'succeeded': 0,
+                'failures': {plant['id']: str(e) for plant in typed_plants},
+                'timings': {},
+                'counts': {},
+                'error': str(e)
+            }
+
+    return reports
+
+def summarize(reports):
+    """
+    One-line summary of refresh_forecasts reports for flash messages and logs
+    """
+    parts = []
+    for plant_type, report in reports.items():
+        part = (f"{plant_type}: {report['succeeded']}/{report['plants']} plants "
+                f"in {report['timings'].get('total', 0):.1f}s")
+        if report['counts'].get('skipped_hourly'):
+            part += (f" ({report['counts']['recomputed_hourly']} hours recomputed, "
+                     f"{report['counts']['skipped_hourly']} unchanged)")
+        parts.append(part)
+    return ", ".join(parts)
@@ -0,0 +1,121 @@
+"""
+Convert the deployed model artifacts into packed, memory-mappable artifacts.
+
+For each plant type this writes models/packed/<plant_type>/ with:
+    <array>.npy        the flattened forest node arrays (ml_pipeline.flat_forest),
+                       uncompressed so np.load(mmap_mode='r') maps them directly
+    preprocess.joblib  the solar scaler / the wind pipeline's scaling steps
+    estimator.joblib   the sklearn estimator, uncompressed, for FOREST_ENGINE=sklearn
+    manifest.json      shapes, sizes and the source artifact it was built from
+
+The registry (MODEL_ARTIFACTS=auto) loads a packed artifact when it is up to
+date, so every gunicorn worker and job worker maps the same page-cache copy of
+the forest instead of decompressing and unpickling a private one.
+
+    python -m ml_pipeline.package_models [--types solar,wind]
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+
+from ml_pipeline.model_registry import (MODELS_DIR, MODEL_FILES, PACKED_DIR, PACKED_MANIFEST,
+                                        PACKED_PREPROCESS, PACKED_ESTIMATOR, _read_artifact)
+from ml_pipeline.flat_forest import FlatForest, FOREST_ARRAYS
+
+def _directory_bytes(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+def package_model(plant_type, packed_dir=None):
+    """
+    Package one plant type's source artifact
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        packed_dir (str, optional): Output root, defaults to models/packed
+
+    Returns:
+        dict: The manifest written
+    """
+    if plant_type not in MODEL_FILES:
+        raise ValueError(f"Unknown plant type: {plant_type}")
+
+    packed_dir = packed_dir or PACKED_DIR
+    source_path = os.path.join(MODELS_DIR, MODEL_FILES[plant_type])
+
+    start = time.perf_counter()
+    artifact = _read_artifact(source_path)
+    if isinstance(artifact, dict):
+        estimator, extras = artifact['model'], {'scaler': artifact.get('scaler')}
+    else:
+        estimator, extras = artifact, {'scaler': None}
+
+    forest = FlatForest.from_model(estimator)
+    extras['preprocess'] = forest.preprocess
+
+    # Build next to the final directory and swap it in, so a running
+    # registry never sees a half-written artifact
+    target = os.path.join(packed_dir, plant_type)
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    for name in FOREST_ARRAYS:
+        np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(getattr(forest, name)))
+    joblib.dump(extras, os.path.join(staging, PACKED_PREPROCESS))
+    joblib.dump(estimator, os.path.join(staging, PACKED_ESTIMATOR), compress=0)
+
+    manifest = {
+        'plant_type': plant_type,
+        'source_file': MODEL_FILES[plant_type],
+        'source_size': os.path.getsize(source_path),
+        'source_mtime': os.path.getmtime(source_path),
+        'n_features': forest.n_features,
+        'max_depth': forest.max_depth,
+        'trees': len(forest),
+        'nodes': int(len(forest.value)),
+        'forest_bytes': forest.nbytes,
+        'packed_at': time.time()
+    }
+    manifest['packed_bytes'] = _directory_bytes(staging)
+    with open(os.path.join(staging, PACKED_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    previous = f"{target}.old-{os.getpid()}"
+    if os.path.exists(target):
+        os.rename(target, previous)
+    os.rename(staging, target)
+    shutil.rmtree(previous, ignore_errors=True)
+
+    print(f"Packed {plant_type} model ({len(forest)} trees, {manifest['nodes']} nodes) into {target} "
+          f"in {time.perf_counter() - start:.2f}s: {manifest['forest_bytes'] / 1e6:.1f} MB of forest arrays, "
+          f"{manifest['packed_bytes'] / 1e6:.1f} MB on disk (source {manifest['source_size'] / 1e6:.1f} MB)")
+
+    return manifest
+
+def package_models(plant_types=None, packed_dir=None):
+    """
+    Package every plant type's model
+
+    Returns:
+        dict: Plant type -> manifest
+    """
+    return {
+        plant_type: package_model(plant_type, packed_dir)
+        for plant_type in plant_types or list(MODEL_FILES.keys())
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--types', default=','.join(MODEL_FILES))
+    parser.add_argument('--output', default=PACKED_DIR)
+    args = parser.parse_args()
+
+    package_models(args.types.split(','), args.output)
+
+if __name__ == "__main__":
+    main()
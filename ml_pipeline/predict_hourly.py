@@ -1,13 +1,389 @@
 import os
 import json
-import joblib
+import hashlib
 import numpy as np
 import pandas as pd
 from datetime import datetime
-import pickle
-import gzip
+from ml_pipeline.backends import backend_entry, backend_predict, backend_predict_quantiles, model_backend
 
-def predict_hourly_generation(weather_data, plant_type="solar", plant_id=1):
+# Feature columns in the same order used during training
+SOLAR_FEATURES = ['WindSpeed', 'Sunshine', 'AirPressure', 'Radiation',
+                  'AirTemperature', 'RelativeAirHumidity', 'Month', 'Hour']
+WIND_FEATURES = ['wind_speed', 'temperature', 'RH', 'pressure', 'gust', 'wind_dir_dev', 'precipitation']
+
+# Weather values stored alongside each hourly prediction
+SOLAR_WEATHER_COLUMNS = ['WindSpeed', 'Sunshine', 'AirPressure', 'Radiation',
+                         'AirTemperature', 'RelativeAirHumidity']
+WIND_WEATHER_COLUMNS = WIND_FEATURES
+
+# Generation bands of the quantile output mode, stored next to
+# predicted_generation: quantiles of the forest's per-tree predictions
+PREDICTION_QUANTILES = (0.1, 0.5, 0.9)
+QUANTILE_COLUMNS = ['predicted_p10', 'predicted_p50', 'predicted_p90']
+
+# Bump when the feature preparation changes in a way the input fingerprints
+# cannot see, so every stored fingerprint stops matching
+FINGERPRINT_VERSION = 1
+
+# Which solar rows skip the model and are predicted as 0.0:
+#   'rules'     - rows the zero rule (Sunshine == 0 and Radiation < 0) would
+#                 zero anyway; output is identical to predicting every row
+#   'elevation' - additionally rows where the sun is below the horizon at
+#                 both ends of the forecast hour (needs plant coordinates)
+#   'none'      - predict every row, then apply the zero rule
+SOLAR_INFERENCE_MASKS = ('rules', 'elevation', 'none')
+
+# Sun centre below this elevation counts as night (refraction lifts the
+# apparent sun by about 0.83 degrees at the horizon)
+NIGHT_ELEVATION_DEGREES = -0.833
+
+def forecast_quantiles():
+    """
+    Whether predictions include the quantile bands unless the caller says
+    (FORECAST_QUANTILES, off by default: the band columns need
+    database/migrations/001_prediction_quantiles.sql)
+    """
+    return os.environ.get('FORECAST_QUANTILES', '0').lower() not in ('0', 'false', 'no')
+
+def _solar_inference_mask():
+    mask = os.environ.get('SOLAR_INFERENCE_MASK', 'rules').lower()
+    if mask not in SOLAR_INFERENCE_MASKS:
+        raise ValueError(f"SOLAR_INFERENCE_MASK must be one of {SOLAR_INFERENCE_MASKS}, got '{mask}'")
+    return mask
+
+def solar_elevation_degrees(times_utc, latitude, longitude):
+    """
+    Approximate solar elevation angle (NOAA low-precision formulas, accurate
+    to a fraction of a degree), vectorized over timestamps
+    
+    Args:
+        times_utc (array-like): datetime64 timestamps in UTC
+        latitude (float or ndarray): Latitude in degrees, scalar or per timestamp
+        longitude (float or ndarray): Longitude in degrees (east positive),
+            scalar or per timestamp
+    
+    Returns:
+        ndarray: Solar elevation in degrees for each timestamp
+    """
+    times = np.asarray(times_utc, dtype='datetime64[ns]')
+
+    # Declination and equation of time depend only on the timestamp; a fleet
+    # shares a few hundred distinct hours, so compute them once per hour
+    unique_times, inverse = np.unique(times, return_inverse=True)
+    days = unique_times.astype('datetime64[D]')
+    day_of_year = (days - unique_times.astype('datetime64[Y]').astype('datetime64[D]')).astype(np.int64) + 1
+    hour = (unique_times - days) / np.timedelta64(1, 'h')
+
+    # Fractional year in radians
+    gamma = 2 * np.pi / 365 * (day_of_year - 1 + (hour - 12) / 24)
+
+    declination = (0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+                   - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+                   - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+                                 - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+
+    # True solar time in minutes, then the hour angle
+    solar_time = (hour * 60 + equation_of_time)[inverse.ravel()] + 4 * np.asarray(longitude)
+    hour_angle = np.radians(solar_time / 4 - 180)
+
+    lat = np.radians(latitude)
+    sin_elevation = (np.sin(lat) * np.sin(declination)[inverse.ravel()] +
+                     np.cos(lat) * np.cos(declination)[inverse.ravel()] * np.cos(hour_angle))
+
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1.0, 1.0)))
+
+def sun_down_mask(weather_frames, stacked_times):
+    """
+    Rows whose whole forecast hour (hourly values cover the preceding hour)
+    has the sun below the horizon, computed in one pass for stacked frames
+    
+    Args:
+        weather_frames (list): Per-plant weather frames, in stacking order, with
+            the latitude/longitude/utc_offset_seconds attrs set by fetch_weather_data
+        stacked_times (ndarray): Their local 'time' values stacked together
+    
+    Returns:
+        ndarray: Boolean mask; always False for frames without coordinates
+    """
+    lengths = [len(df) for df in weather_frames]
+    has_coordinates = np.repeat([df.attrs.get('latitude') is not None and df.attrs.get('longitude') is not None
+                                 for df in weather_frames], lengths)
+    latitude = np.repeat([df.attrs.get('latitude') or 0.0 for df in weather_frames], lengths)
+    longitude = np.repeat([df.attrs.get('longitude') or 0.0 for df in weather_frames], lengths)
+    offset = np.repeat([int(df.attrs.get('utc_offset_seconds') or 0) for df in weather_frames], lengths)
+
+    end_utc = np.asarray(stacked_times, dtype='datetime64[ns]') - offset.astype('timedelta64[s]')
+    start_utc = end_utc - np.timedelta64(1, 'h')
+
+    return (has_coordinates &
+            (solar_elevation_degrees(start_utc, latitude, longitude) < NIGHT_ELEVATION_DEGREES) &
+            (solar_elevation_degrees(end_utc, latitude, longitude) < NIGHT_ELEVATION_DEGREES))
+
+def zero_generation_mask(df_weather, plant_type):
+    """
+    Rows the domain rules predict as 0.0 whatever the model says
+
+    Returns:
+        ndarray: Boolean mask over the rows of df_weather
+    """
+    if plant_type == "solar":
+        # No sunshine and negative (median-adjusted) radiation
+        return ((df_weather['Sunshine'] == 0.0) & (df_weather['Radiation'] < 0.0)).to_numpy()
+    # Wind speed below cut-in (3 m/s) or above cut-out (25 m/s)
+    return ((df_weather['wind_speed'] < 3.0) | (df_weather['wind_speed'] > 25.0)).to_numpy()
+
+def _prepare_weather_frame(weather_data, plant_type):
+    """
+    Copy a plant's weather frame and apply the per-plant feature adjustments
+    """
+    df_weather = weather_data.copy()
+
+    if plant_type == "solar":
+        # Adjust radiation values as per the provided example. The median is
+        # taken over this plant's own forecast, so it must happen before stacking.
+        df_weather['Radiation'] = df_weather['Radiation'] - np.median(df_weather['Radiation'])
+
+    return df_weather
+
+def _sun_down_for(weather_frames, df_weather, plant_type):
+    # Only needed (and only computed) for the 'elevation' solar mask
+    if plant_type != "solar" or _solar_inference_mask() != 'elevation':
+        return None
+    return sun_down_mask(weather_frames, df_weather['time'].to_numpy())
+
+def _predict_frame(df_weather, plant_type, sun_down=None, quantiles=False):
+    """
+    Run the plant type's model backend for a (possibly multi-plant) weather
+    frame and apply the domain rules. Adds a 'predicted_generation' column in
+    place, plus the QUANTILE_COLUMNS with quantiles=True (NaN for backends
+    without quantile support). sun_down is the sun_down_mask for the
+    'elevation' solar inference mask.
+    """
+    if plant_type == "solar":
+        features = SOLAR_FEATURES
+
+        # Condition: if Sunshine is 0.0 and Radiation is negative, production is 0.0
+        zero = zero_generation_mask(df_weather, "solar")
+
+        inference_mask = _solar_inference_mask()
+        if inference_mask == 'none':
+            skip = np.zeros(len(df_weather), dtype=bool)
+        else:
+            # Rows that will be zeroed never need the model
+            skip = zero.copy()
+            if inference_mask == 'elevation' and sun_down is not None:
+                skip |= sun_down
+
+    elif plant_type == "wind":
+        features = WIND_FEATURES
+
+        # Safety condition - no generation if wind speed is below 3 m/s or above 25 m/s (cut-in and cut-out speeds)
+        zero = zero_generation_mask(df_weather, "wind")
+        skip = np.zeros(len(df_weather), dtype=bool)
+
+    else:
+        raise ValueError(f"Unknown plant type: {plant_type}")
+
+    # Only the remaining rows go through the model
+    predictions = np.zeros(len(df_weather))
+    bands = np.zeros((len(df_weather), len(PREDICTION_QUANTILES)))
+    if not skip.all():
+        rows = ~skip
+        X = df_weather.loc[rows, features] if skip.any() else df_weather[features]
+        if quantiles:
+            predictions[rows], predicted_bands = backend_predict_quantiles(plant_type, X, PREDICTION_QUANTILES)
+            bands[rows] = np.nan if predicted_bands is None else predicted_bands
+        else:
+            predictions[rows] = backend_predict(plant_type, X)
+    df_weather['predicted_generation'] = predictions
+    if quantiles:
+        df_weather[QUANTILE_COLUMNS] = bands
+
+    # Apply the zero rules
+    output_columns = ['predicted_generation'] + (QUANTILE_COLUMNS if quantiles else [])
+    df_weather.loc[zero, output_columns] = 0.0
+
+    return df_weather
+
+def _model_identity(plant_type, quantiles):
+    """
+    Everything besides the inputs that decides a row's stored prediction:
+    the backend and its artifact, the output mode and the solar inference mask
+    """
+    backend = model_backend(plant_type)
+    entry = backend_entry(plant_type, backend)
+    return (f"v{FINGERPRINT_VERSION}:{plant_type}:{backend}:{entry['path']}:{entry['mtime']}:"
+            f"quantiles={bool(quantiles)}:mask={_solar_inference_mask() if plant_type == 'solar' else ''}")
+
+def input_fingerprints(df_weather, plant_type, quantiles=False):
+    """
+    64-bit fingerprint of each row's model inputs: the prepared feature and
+    stored weather columns, hashed row by row with hash_pandas_object and
+    salted with the model identity, so a new model or output mode changes
+    every fingerprint
+    
+    Args:
+        df_weather (DataFrame): Prepared weather frame (_prepare_weather_frame)
+        plant_type (str): 'solar' or 'wind'
+        quantiles (bool): Whether the predictions include the quantile bands
+    
+    Returns:
+        ndarray: int64 fingerprint per row (BIGINT in the hourly tables)
+    """
+    if plant_type == "solar":
+        columns = list(dict.fromkeys(SOLAR_FEATURES + SOLAR_WEATHER_COLUMNS))
+    else:
+        columns = WIND_FEATURES
+    hashes = pd.util.hash_pandas_object(df_weather[columns], index=False).to_numpy()
+
+    salt = hashlib.sha1(_model_identity(plant_type, quantiles).encode()).digest()[:8]
+    return (hashes ^ np.frombuffer(salt, dtype=np.uint64)[0]).view(np.int64)
+
+def _predict_changed_frame(df_weather, plant_type, sun_down, quantiles, plant_ids, known):
+    """
+    _predict_frame for only the rows whose input fingerprint differs from the
+    stored one in known; the other rows take their stored prediction. Adds
+    'input_hash' and 'reused' columns.
+    """
+    fingerprints = input_fingerprints(df_weather, plant_type, quantiles)
+
+    # Stored row for each (plant, hour), keeping the newest of any duplicates
+    known = known.drop_duplicates(['plant_id', 'time'], keep='last')
+    positions = pd.MultiIndex.from_arrays([known['plant_id'].to_numpy(), known['time'].to_numpy()]).get_indexer(
+        pd.MultiIndex.from_arrays([np.asarray(plant_ids), df_weather['time'].to_numpy()]))
+    found = positions >= 0
+    reused = np.zeros(len(df_weather), dtype=bool)
+    reused[found] = known['input_hash'].to_numpy(dtype=np.int64)[positions[found]] == fingerprints[found]
+
+    output_columns = ['predicted_generation'] + (QUANTILE_COLUMNS if quantiles else [])
+    if not reused.any():
+        df_weather = _predict_frame(df_weather, plant_type, sun_down, quantiles)
+    else:
+        stored = known[output_columns].to_numpy(dtype=np.float64)[positions[reused]]
+        values = np.zeros((len(df_weather), len(output_columns)))
+        values[reused] = stored
+        if not reused.all():
+            changed = ~reused
+            part = _predict_frame(df_weather.loc[changed].copy(), plant_type,
+                                  sun_down[changed] if sun_down is not None else None, quantiles)
+            values[changed] = part[output_columns].to_numpy(dtype=np.float64)
+        df_weather[output_columns] = values
+
+    df_weather['input_hash'] = fingerprints
+    df_weather['reused'] = reused
+    return df_weather
+
+def _to_prediction_frame(df_weather, plant_type, plant_id):
+    """
+    Reduce a predicted weather frame to the columnar prediction output:
+    plant_id, time, predicted_generation and the stored weather columns
+    """
+    weather_columns = SOLAR_WEATHER_COLUMNS if plant_type == "solar" else WIND_WEATHER_COLUMNS
+    band_columns = QUANTILE_COLUMNS if QUANTILE_COLUMNS[0] in df_weather else []
+    fingerprint_columns = ['input_hash', 'reused'] if 'input_hash' in df_weather else []
+
+    frame = df_weather[['time', 'predicted_generation'] + band_columns + weather_columns +
+                       fingerprint_columns].reset_index(drop=True)
+    frame.insert(0, 'plant_id', plant_id)
+
+    return frame
+
+def encode_weather_json(frame, weather_columns):
+    """
+    JSON-encode the weather columns of a prediction frame, one string per row.
+    Finite values are formatted in a single pass with a fixed template, which
+    produces the same text as json.dumps on the equivalent dict.
+    
+    Args:
+        frame (DataFrame): Prediction frame containing the weather columns
+        weather_columns (list): Column names to encode, in output order
+    
+    Returns:
+        list: JSON strings, one per row
+    """
+    return encode_weather_values(frame[weather_columns].to_numpy(dtype=float), weather_columns)
+
+def encode_weather_values(values, weather_columns):
+    """
+    JSON-encode each row of a (rows x columns) float matrix, see encode_weather_json
+    
+    Args:
+        values (ndarray): Weather values, one row per prediction
+        weather_columns (list): Column names, in the matrix's column order
+    
+    Returns:
+        list: JSON strings, one per row
+    """
+    values = np.asarray(values, dtype=float)
+
+    if not np.isfinite(values).all():
+        # NaN/inf need json.dumps' spelling ("NaN", "Infinity")
+        return [json.dumps(dict(zip(weather_columns, row))) for row in values.tolist()]
+
+    template = '{' + ', '.join(f'"{column}": %r' for column in weather_columns) + '}'
+    return [template % tuple(row) for row in values.tolist()]
+
+def prediction_frame_to_records(frame, plant_type):
+    """
+    Convert a columnar prediction frame into the list of hourly prediction
+    dicts used by the rest of the pipeline
+    
+    Args:
+        frame (DataFrame): Output of predict_hourly_generation(..., output="frame")
+        plant_type (str): 'solar' or 'wind'
+    
+    Returns:
+        list: List of hourly predictions with timestamps and generation values
+    """
+    weather_columns = SOLAR_WEATHER_COLUMNS if plant_type == "solar" else WIND_WEATHER_COLUMNS
+
+    # Vectorized string conversion for the whole frame at once
+    plant_ids = frame['plant_id'].tolist()
+    timestamps = frame['time'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    weather_json = encode_weather_json(frame, weather_columns)
+    predictions = frame['predicted_generation'].astype(float).tolist()
+
+    records = [
+        {
+            'plant_id': plant_id,
+            'timestamp': timestamp,
+            'weather_data': weather_data,
+            'predicted_generation': predicted
+        }
+        for plant_id, timestamp, weather_data, predicted in zip(plant_ids, timestamps, weather_json, predictions)
+    ]
+
+    # Quantile bands, when predicted, go next to predicted_generation
+    if QUANTILE_COLUMNS[0] in frame:
+        for column in QUANTILE_COLUMNS:
+            for record, value in zip(records, frame[column].astype(float).tolist()):
+                record[column] = value
+    if 'input_hash' in frame:
+        for record, fingerprint in zip(records, frame['input_hash'].tolist()):
+            record['input_hash'] = fingerprint
+
+    return records
+
+def _empty_output(plant_type, output):
+    if output == "frame":
+        return pd.DataFrame()
+    if output == "batch":
+        from ml_pipeline.prediction_batch import PredictionBatch
+        return PredictionBatch.empty(plant_type)
+    return []
+
+def _format_output(df_weather, plant_type, plant_id, output):
+    frame = _to_prediction_frame(df_weather, plant_type, plant_id)
+
+    if output == "frame":
+        return frame
+    if output == "batch":
+        from ml_pipeline.prediction_batch import PredictionBatch
+        return PredictionBatch.from_frame(frame, plant_type)
+    return prediction_frame_to_records(frame, plant_type)
+
+def predict_hourly_generation(weather_data, plant_type="solar", plant_id=1, output="records", quantiles=None):
     """
     Predict hourly energy generation based on weather data
     
@@ -15,121 +391,109 @@ def predict_hourly_generation(weather_data, plant_type="solar", plant_id=1):
         weather_data (DataFrame): DataFrame with hourly weather data
         plant_type (str): 'solar' or 'wind'
         plant_id (int): ID of the plant
+        output (str): 'records' for a list of dicts with JSON-encoded weather,
+            'frame' for a columnar DataFrame (plant_id, time,
+            predicted_generation and weather columns) with no per-row objects,
+            or 'batch' for an array-backed PredictionBatch
+        quantiles (bool, optional): Also predict the P10/P50/P90 bands
+            (QUANTILE_COLUMNS); defaults to FORECAST_QUANTILES
     
     Returns:
-        list: List of hourly predictions with timestamps and generation values
+        list, DataFrame or PredictionBatch: Hourly predictions with timestamps
+            and generation values (empty on failure)
     """
     try:
-        if plant_type == "solar":
-            # Load model and scaler
-            model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                                'models', 'solar_power_rf_model.pkl')
-            print(f"Loading model from: {model_path}")
-            model_bundle = joblib.load(model_path)
-            scaler = model_bundle['scaler']
-            model = model_bundle['model']
-            
-            # Process the weather data
-            df_weather = weather_data.copy()
-            
-            # Adjust radiation values as per the provided example
-            df_weather['Radiation'] = df_weather['Radiation'] - np.median(df_weather['Radiation'])
-            
-            # Select feature columns in the same order used during training
-            features = ['WindSpeed', 'Sunshine', 'AirPressure', 'Radiation',
-                        'AirTemperature', 'RelativeAirHumidity', 'Month', 'Hour']
-            X_features = df_weather[features]
-            
-            # Scale input features
-            X_scaled = scaler.transform(X_features)
-            
-            # Predict
-            df_weather['predicted_generation'] = model.predict(X_scaled)
-            
-            # Apply condition: if Sunshine is 0.0 and Radiation is negative, set production to 0.0
-            df_weather.loc[(df_weather['Sunshine'] == 0.0) & (df_weather['Radiation'] < 0.0), 'predicted_generation'] = 0.0
-            
-            # Create list of hourly predictions
-            hourly_predictions = []
-            
-            for _, row in df_weather.iterrows():
-                # Create a dictionary with all weather data
-                weather_data_dict = {
-                    'WindSpeed': float(row['WindSpeed']),
-                    'Sunshine': float(row['Sunshine']),
-                    'AirPressure': float(row['AirPressure']),
-                    'Radiation': float(row['Radiation']),
-                    'AirTemperature': float(row['AirTemperature']),
-                    'RelativeAirHumidity': float(row['RelativeAirHumidity'])
-                }
-                
-                timestamp = row['time'].strftime('%Y-%m-%d %H:%M:%S')
-                
-                hourly_predictions.append({
-                    'plant_id': plant_id,
-                    'timestamp': timestamp,
-                    'weather_data': json.dumps(weather_data_dict),
-                    'predicted_generation': float(row['predicted_generation'])
-                })
-            
-            return hourly_predictions
-        
-        elif plant_type == "wind":
-            # Load the wind power prediction model
-            model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                              'models', 'wind_power_rf_model.pkl.gz')
-            print(f"Loading wind model from: {model_path}")
-            # Load the compressed model file
-            with gzip.open(model_path, 'rb') as f:
-                model = pickle.load(f)
-            
-            # Process the weather data for wind prediction
-            df_weather = weather_data.copy()
-            
-            # Select feature columns in the same order used during training
-            features = ['wind_speed', 'temperature', 'RH', 'pressure', 'gust', 'wind_dir_dev', 'precipitation']
-            X_features = df_weather[features]
-            
-            # Predict
-            df_weather['predicted_generation'] = model.predict(X_features)
-            
-            # Apply safety condition - no generation if wind speed is below 3 m/s or above 25 m/s (cut-in and cut-out speeds)
-            df_weather.loc[(df_weather['wind_speed'] < 3.0) | (df_weather['wind_speed'] > 25.0), 'predicted_generation'] = 0.0
-            
-            # Create list of hourly predictions
-            hourly_predictions = []
-            
-            for _, row in df_weather.iterrows():
-                # Create a dictionary with all weather data
-                weather_data_dict = {
-                    'wind_speed': float(row['wind_speed']),
-                    'temperature': float(row['temperature']),
-                    'RH': float(row['RH']),
-                    'pressure': float(row['pressure']),
-                    'gust': float(row['gust']),
-                    'wind_dir_dev': float(row['wind_dir_dev']),
-                    'precipitation': float(row['precipitation'])
-                }
-                
-                timestamp = row['time'].strftime('%Y-%m-%d %H:%M:%S')
-                
-                hourly_predictions.append({
-                    'plant_id': plant_id,
-                    'timestamp': timestamp,
-                    'weather_data': json.dumps(weather_data_dict),
-                    'predicted_generation': float(row['predicted_generation'])
-                })
-            
-            return hourly_predictions
+        df_weather = _prepare_weather_frame(weather_data, plant_type)
+        sun_down = _sun_down_for([weather_data], df_weather, plant_type)
+        if quantiles is None:
+            quantiles = forecast_quantiles()
+        df_weather = _predict_frame(df_weather, plant_type, sun_down, quantiles)
+        return _format_output(df_weather, plant_type, plant_id, output)
     except Exception as e:
         print(f"Error in predict_hourly_generation: {str(e)}")
         import traceback
         print(traceback.format_exc())
-        return []
+        return _empty_output(plant_type, output)
+
+def predict_hourly_generation_batch(weather_frames, plant_type="solar", output="records", quantiles=None, known=None):
+    """
+    Predict hourly energy generation for many plants of the same type at once.
+    All plants' weather is stacked into one feature matrix so the model is
+    called once for the whole fleet instead of once per plant.
+    
+    Args:
+        weather_frames (dict): Mapping of plant_id -> DataFrame with hourly weather data
+        plant_type (str): 'solar' or 'wind'
+        output (str): 'records', 'frame' or 'batch', see predict_hourly_generation.
+            With 'batch' every plant's PredictionBatch is a view into one
+            stacked batch for the whole fleet.
+        quantiles (bool, optional): Also predict the P10/P50/P90 bands
+            (QUANTILE_COLUMNS); defaults to FORECAST_QUANTILES
+        known (DataFrame, optional): Stored predictions with their input
+            fingerprints (load_input_fingerprints). When given, every row is
+            fingerprinted and rows whose fingerprint matches the stored one
+            skip the model and take the stored prediction; the output then
+            carries input_hash and reused per row.
+    
+    Returns:
+        dict: Mapping of plant_id -> hourly predictions (empty on failure)
+    """
+    results = {plant_id: _empty_output(plant_type, output) for plant_id in weather_frames}
+
+    # Apply per-plant adjustments first; a bad frame only drops that plant
+    prepared = {}
+    for plant_id, weather_data in weather_frames.items():
+        try:
+            prepared[plant_id] = _prepare_weather_frame(weather_data, plant_type)
+        except Exception as e:
+            print(f"Error preparing weather data for plant {plant_id}: {str(e)}")
+
+    if not prepared:
+        return results
+
+    try:
+        plant_ids = list(prepared.keys())
+        lengths = [len(prepared[plant_id]) for plant_id in plant_ids]
+
+        # One predict call over the stacked frames of every plant
+        stacked = pd.concat([prepared[plant_id] for plant_id in plant_ids], ignore_index=True)
+        sun_down = _sun_down_for([prepared[plant_id] for plant_id in plant_ids], stacked, plant_type)
+        if quantiles is None:
+            quantiles = forecast_quantiles()
+        if known is None:
+            stacked = _predict_frame(stacked, plant_type, sun_down, quantiles)
+            print(f"Predicted {len(stacked)} hourly {plant_type} rows for {len(plant_ids)} plants in one batch")
+        else:
+            stacked = _predict_changed_frame(stacked, plant_type, sun_down, quantiles,
+                                             np.repeat(plant_ids, lengths), known)
+            reused = int(stacked['reused'].sum())
+            print(f"Predicted {len(stacked) - reused} hourly {plant_type} rows for {len(plant_ids)} plants in one "
+                  f"batch, {reused} unchanged rows skipped")
+
+        # Split the stacked predictions back per plant
+        offsets = np.cumsum([0] + lengths)
+
+        if output == "batch":
+            from ml_pipeline.prediction_batch import PredictionBatch
+            fleet_frame = _to_prediction_frame(stacked, plant_type, np.repeat(plant_ids, lengths))
+            fleet = PredictionBatch.from_frame(fleet_frame, plant_type)
+            for i, plant_id in enumerate(plant_ids):
+                results[plant_id] = fleet[offsets[i]:offsets[i + 1]]
+            return results
+
+        for i, plant_id in enumerate(plant_ids):
+            df_plant = stacked.iloc[offsets[i]:offsets[i + 1]]
+            results[plant_id] = _format_output(df_plant, plant_type, plant_id, output)
+    except Exception as e:
+        print(f"Error in predict_hourly_generation_batch: {str(e)}")
+        import traceback
+        print(traceback.format_exc())
+
+    return results
 
 if __name__ == "__main__":
     # Test with sample weather data
-    from fetch_weather import fetch_weather_data, fetch_wind_weather_data
+    from ml_pipeline.fetch_weather import fetch_weather_data, fetch_wind_weather_data
     import pandas as pd
     import numpy as np
     
@@ -0,0 +1,218 @@
+import json
+import numpy as np
+import pandas as pd
+
+from ml_pipeline.predict_hourly import (SOLAR_WEATHER_COLUMNS, WIND_WEATHER_COLUMNS, QUANTILE_COLUMNS,
+                                        encode_weather_values)
+
+def weather_columns_for(plant_type):
+    return SOLAR_WEATHER_COLUMNS if plant_type == "solar" else WIND_WEATHER_COLUMNS
+
+class PredictionBatch:
+    """
+    Array-backed hourly predictions for one or many plants of one type.
+
+    Columns are parallel NumPy arrays: plant_ids (int32), timestamps
+    (datetime64[ns]), predictions (float32) and a (rows x features) float64
+    matrix of the weather values stored with each prediction. Weather values
+    stay float64 so the stored weather JSON is unchanged. bands is a
+    (rows x 3) float32 matrix of the P10/P50/P90 quantiles (QUANTILE_COLUMNS),
+    or None when they were not predicted. fingerprints (int64) are the rows'
+    input fingerprints (input_fingerprints) and reused (bool) marks rows whose
+    prediction was carried over from the stored one because their inputs had
+    not changed; both are None unless the refresh fingerprinted its inputs.
+
+    Slicing with batch[start:stop] returns a batch of views (no copy).
+    Boolean or index selection copies, as NumPy does.
+    """
+    __slots__ = ('plant_ids', 'timestamps', 'predictions', 'features', 'feature_names', 'plant_type', 'bands',
+                 'fingerprints', 'reused')
+
+    def __init__(self, plant_ids, timestamps, predictions, features, feature_names, plant_type="solar", bands=None,
+                 fingerprints=None, reused=None):
+        self.plant_ids = np.asarray(plant_ids, dtype=np.int32)
+        self.timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        self.predictions = np.asarray(predictions, dtype=np.float32)
+        self.features = np.asarray(features, dtype=np.float64).reshape(len(self.plant_ids), len(feature_names))
+        self.feature_names = tuple(feature_names)
+        self.plant_type = plant_type
+        self.bands = None
+        if bands is not None:
+            self.bands = np.asarray(bands, dtype=np.float32).reshape(len(self.plant_ids), len(QUANTILE_COLUMNS))
+        self.fingerprints = None if fingerprints is None else np.asarray(fingerprints, dtype=np.int64)
+        self.reused = None if reused is None else np.asarray(reused, dtype=bool)
+
+        if not (len(self.timestamps) == len(self.predictions) == len(self.plant_ids)):
+            raise ValueError("PredictionBatch columns must all have the same length")
+
+    @classmethod
+    def empty(cls, plant_type="solar"):
+        columns = weather_columns_for(plant_type)
+        return cls([], [], [], np.empty((0, len(columns))), columns, plant_type)
+
+    @classmethod
+    def from_frame(cls, frame, plant_type="solar"):
+        """
+        Build a batch from a columnar prediction frame (plant_id, time,
+        predicted_generation, the weather columns and optionally the
+        QUANTILE_COLUMNS, input_hash and reused)
+        """
+        columns = weather_columns_for(plant_type)
+        return cls(
+            frame['plant_id'].to_numpy(),
+            frame['time'].to_numpy(dtype='datetime64[ns]'),
+            frame['predicted_generation'].to_numpy(),
+            frame[columns].to_numpy(dtype=np.float64),
+            columns,
+            plant_type,
+            frame[QUANTILE_COLUMNS].to_numpy() if QUANTILE_COLUMNS[0] in frame else None,
+            frame['input_hash'].to_numpy() if 'input_hash' in frame else None,
+            frame['reused'].to_numpy() if 'reused' in frame else None
+        )
+
+    @classmethod
+    def from_records(cls, records, plant_type="solar"):
+        """
+        Build a batch from a list of hourly prediction dicts (the format
+        returned by predict_hourly_generation), parsing each string once
+        """
+        if not records:
+            return cls.empty(plant_type)
+
+        columns = weather_columns_for(plant_type)
+        timestamps = pd.to_datetime([pred['timestamp'] for pred in records], format='%Y-%m-%d %H:%M:%S')
+        weather = [json.loads(pred['weather_data']) for pred in records]
+        bands = None
+        if QUANTILE_COLUMNS[0] in records[0]:
+            bands = [[pred[column] for column in QUANTILE_COLUMNS] for pred in records]
+
+        return cls(
+            [pred['plant_id'] for pred in records],
+            timestamps.to_numpy(dtype='datetime64[ns]'),
+            [pred['predicted_generation'] for pred in records],
+            [[values[column] for column in columns] for values in weather],
+            columns,
+            plant_type,
+            bands
+        )
+
+    @classmethod
+    def concat(cls, batches, plant_type="solar"):
+        """
+        Stack batches of the same plant type into one (a copy). Bands,
+        fingerprints and reused flags are kept only if every batch has them.
+        """
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty(plant_type)
+
+        def stacked(column):
+            arrays = [getattr(batch, column) for batch in batches]
+            return None if any(array is None for array in arrays) else np.concatenate(arrays)
+
+        return cls(
+            np.concatenate([batch.plant_ids for batch in batches]),
+            np.concatenate([batch.timestamps for batch in batches]),
+            np.concatenate([batch.predictions for batch in batches]),
+            np.concatenate([batch.features for batch in batches]),
+            batches[0].feature_names,
+            batches[0].plant_type,
+            stacked('bands'),
+            stacked('fingerprints'),
+            stacked('reused')
+        )
+
+    def to_frame(self):
+        """
+        Columnar DataFrame in the layout of predict_hourly_generation(output="frame")
+        """
+        frame = pd.DataFrame(self.features, columns=list(self.feature_names))
+        if self.bands is not None:
+            for position, column in enumerate(QUANTILE_COLUMNS):
+                frame.insert(position, column, self.bands[:, position].astype(np.float64))
+        if self.fingerprints is not None:
+            frame['input_hash'] = self.fingerprints
+        if self.reused is not None:
+            frame['reused'] = self.reused
+        frame.insert(0, 'predicted_generation', self.predictions.astype(np.float64))
+        frame.insert(0, 'time', self.timestamps)
+        frame.insert(0, 'plant_id', self.plant_ids)
+        return frame
+
+    def to_records(self):
+        """
+        List of hourly prediction dicts, for callers expecting the old format
+        """
+        timestamps = pd.DatetimeIndex(self.timestamps).strftime('%Y-%m-%d %H:%M:%S').tolist()
+        weather_json = encode_weather_values(self.features, self.feature_names)
+
+        records = [
+            {
+                'plant_id': plant_id,
+                'timestamp': timestamp,
+                'weather_data': weather_data,
+                'predicted_generation': predicted
+            }
+            for plant_id, timestamp, weather_data, predicted in zip(
+                self.plant_ids.tolist(), timestamps, weather_json, self.predictions.astype(np.float64).tolist())
+        ]
+        if self.bands is not None:
+            for record, bands in zip(records, self.bands.astype(np.float64).tolist()):
+                record.update(zip(QUANTILE_COLUMNS, bands))
+        if self.fingerprints is not None:
+            for record, fingerprint in zip(records, self.fingerprints.tolist()):
+                record['input_hash'] = fingerprint
+        return records
+
+    def __len__(self):
+        return len(self.plant_ids)
+
+    def __getitem__(self, key):
+        return PredictionBatch(
+            self.plant_ids[key],
+            self.timestamps[key],
+            self.predictions[key],
+            self.features[key],
+            self.feature_names,
+            self.plant_type,
+            self.bands[key] if self.bands is not None else None,
+            self.fingerprints[key] if self.fingerprints is not None else None,
+            self.reused[key] if self.reused is not None else None
+        )
+
+    def __repr__(self):
+        return f"PredictionBatch({self.plant_type}, rows={len(self)}, plants={len(np.unique(self.plant_ids))})"
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays"""
+        optional = sum(array.nbytes for array in (self.bands, self.fingerprints, self.reused) if array is not None)
+        return self.plant_ids.nbytes + self.timestamps.nbytes + self.predictions.nbytes + self.features.nbytes + optional
+
+    def select(self, mask):
+        """Rows where mask is True (a copy)"""
+        return self[np.asarray(mask, dtype=bool)]
+
+    def split_by_plant(self):
+        """
+        Split into one batch per plant. Batches are views when each plant's
+        rows are contiguous (as produced by predict_hourly_generation_batch).
+
+        Returns:
+            dict: Mapping of plant_id -> PredictionBatch
+        """
+        if len(self) == 0:
+            return {}
+
+        plant_ids = self.plant_ids
+        batch = self
+        if (np.diff(plant_ids) != 0).sum() + 1 != len(np.unique(plant_ids)):
+            # Interleaved plants: one stable sort, then contiguous views
+            batch = self[np.argsort(plant_ids, kind='stable')]
+            plant_ids = batch.plant_ids
+
+        starts = np.concatenate([[0], np.flatnonzero(plant_ids[1:] != plant_ids[:-1]) + 1, [len(plant_ids)]])
+        return {
+            int(plant_ids[starts[i]]): batch[starts[i]:starts[i + 1]]
+            for i in range(len(starts) - 1)
+        }
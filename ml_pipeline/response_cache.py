@@ -0,0 +1,256 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from functools import wraps
+
+import numpy as np
+
+# Chart responses only change when the forecast pipeline writes predictions
+# (or a plant's threshold changes), which bumps the plant type's data
+# version. The TTL only bounds how long an entry outlives a missed bump.
+DEFAULT_TTL_SECONDS = 900
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# One version file per plant type, shared by the web workers and the job
+# workers on the host, holding the data version: the time_ns() of the last
+# bump (file mtimes can be too coarse to tell two quick bumps apart)
+DEFAULT_VERSION_DIR = '/tmp/forecast-versions'
+
+# Recent request latencies kept per outcome for the percentiles
+LATENCY_SAMPLES = 2048
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'stale': 0,
+    'expired': 0,
+    'stores': 0,
+    'not_modified': 0,
+    'invalidations': 0
+}
+_latencies = {'hit': deque(maxlen=LATENCY_SAMPLES), 'miss': deque(maxlen=LATENCY_SAMPLES)}
+
+def _ttl_seconds():
+    return float(os.environ.get('RESPONSE_CACHE_TTL', DEFAULT_TTL_SECONDS))
+
+def _max_entries():
+    return int(os.environ.get('RESPONSE_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+
+def _enabled():
+    return _max_entries() > 0
+
+def _version_path(plant_type):
+    version_dir = os.environ.get('RESPONSE_CACHE_VERSION_DIR', DEFAULT_VERSION_DIR)
+    return os.path.join(version_dir, f"{plant_type}.version")
+
+def bump_version(plant_type):
+    """
+    Mark a plant type's forecast data as changed, invalidating every cached
+    response built from it in all processes on the host
+
+    Returns:
+        int: The new data version
+    """
+    path = _version_path(plant_type)
+    version = time.time_ns()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write a temp file and rename, so readers always see a complete file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    with _lock:
+        _stats['invalidations'] += 1
+    return version
+
+def data_version(plant_type):
+    """
+    Current data version of a plant type, read from its version file
+
+    Returns:
+        int: Version (time_ns() of the last bump)
+    """
+    try:
+        with open(_version_path(plant_type)) as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return bump_version(plant_type)
+
+def invalidate(plant_type):
+    """
+    Bump a plant type's data version, logging instead of raising so a
+    failed invalidation never fails the write that triggered it. Entries
+    of the old version are dropped on their next lookup.
+    """
+    try:
+        bump_version(plant_type)
+    except OSError as e:
+        print(f"Could not invalidate cached {plant_type} chart responses: {str(e)}")
+
+def _store_memory(key, entry):
+    _memory[key] = entry
+    _memory.move_to_end(key)
+    while len(_memory) > _max_entries():
+        _memory.popitem(last=False)
+
+def get(key, version):
+    """
+    Look up a cached response built from the given data version
+
+    Args:
+        key (tuple): Cache key (user id, endpoint, plant_id, role, ...)
+        version (int): Current data_version() of the response's plant type
+
+    Returns:
+        dict: Entry with 'body', 'etag' and 'last_modified', or None
+    """
+    if not _enabled():
+        return None
+
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            _stats['misses'] += 1
+            return None
+        if entry['version'] != version:
+            del _memory[key]
+            _stats['stale'] += 1
+            _stats['misses'] += 1
+            return None
+        if now - entry['stored_at'] >= _ttl_seconds():
+            del _memory[key]
+            _stats['expired'] += 1
+            _stats['misses'] += 1
+            return None
+
+        _memory.move_to_end(key)
+        _stats['hits'] += 1
+        return entry
+
+def put(key, version, body):
+    """
+    Cache a response body under the data version it was built from
+
+    Args:
+        key (tuple): Cache key
+        version (int): data_version() read before the body was built, so a
+            write racing the build leaves the entry already stale
+        body (bytes): Serialized response
+
+    Returns:
+        dict: The entry, with its ETag (content hash) and Last-Modified
+            (the data version's time)
+    """
+    entry = {
+        'body': body,
+        'etag': hashlib.sha1(body).hexdigest(),
+        'last_modified': version / 1e9,
+        'version': version,
+        'stored_at': time.time()
+    }
+
+    if _enabled():
+        with _lock:
+            _store_memory(key, entry)
+            _stats['stores'] += 1
+    return entry
+
+def record_request(outcome, seconds, not_modified=False):
+    """
+    Record a cached endpoint's latency ('hit' or 'miss') and whether it
+    answered 304 Not Modified
+    """
+    with _lock:
+        _latencies[outcome].append(seconds)
+        if not_modified:
+            _stats['not_modified'] += 1
+
+def cached_response(plant_type, key):
+    """
+    Decorator serving a Flask JSON endpoint from the cache. Successful GET
+    responses (status 200 and not {'success': False}) are cached under
+    key() and the plant type's data version, and every response carries an
+    ETag and Last-Modified so browsers revalidate and get 304 Not Modified.
+    Entries are per logged-in user: a hit skips the view and with it the
+    view's own authorization checks, so only the user whose request built
+    an entry is ever served it.
+
+    Args:
+        plant_type (str): Plant type whose forecast data the response is built from
+        key (callable): Returns the cache key of the current request
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import current_app, request
+            from flask_login import current_user
+
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            start = time.perf_counter()
+            cache_key = (current_user.get_id(),) + tuple(key())
+            version = data_version(plant_type)
+            entry = get(cache_key, version)
+            outcome = 'hit'
+
+            if entry is None:
+                outcome = 'miss'
+                response = current_app.make_response(view(*args, **kwargs))
+                payload = response.get_json(silent=True) if response.is_json else None
+                if response.status_code != 200 or not isinstance(payload, dict) or payload.get('success') is False:
+                    record_request(outcome, time.perf_counter() - start)
+                    return response
+                entry = put(cache_key, version, response.get_data())
+
+            response = current_app.response_class(entry['body'], mimetype='application/json')
+            response.set_etag(entry['etag'])
+            response.last_modified = entry['last_modified']
+            # Per-user data: browsers may keep it but must revalidate every time
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response = response.make_conditional(request)
+
+            record_request(outcome, time.perf_counter() - start, response.status_code == 304)
+            return response
+        return wrapper
+    return decorator
+
+def cache_stats():
+    """
+    Return hit/miss counters, the hit ratio and p50/p95 latency of hits and misses
+
+    Returns:
+        dict: Cache statistics
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = len(_memory)
+        latencies = {outcome: list(samples) for outcome, samples in _latencies.items()}
+
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+    for outcome, samples in latencies.items():
+        if samples:
+            p50, p95 = np.percentile(samples, [50, 95])
+            stats[f'{outcome}_ms'] = {'p50': round(p50 * 1000, 3), 'p95': round(p95 * 1000, 3),
+                                      'samples': len(samples)}
+    stats['ttl_seconds'] = _ttl_seconds()
+    stats['max_entries'] = _max_entries()
+
+    return stats
@@ -0,0 +1,437 @@
+"""
+Train the solar and wind models from the bundled CSVs, replacing the
+notebooks under models/. The forest is fitted with n_jobs worker threads.
+--backend trains one of the alternative model backends (ml_pipeline.backends)
+instead: 'hgb' (histogram gradient boosting, --n-estimators boosting
+iterations) or, for wind, 'power_curve'.
+
+Each run writes a versioned artifact in the deployed format to
+models/versions/<plant_type>/<version>/, next to a manifest.json with:
+    - the feature spec (ordered columns, training ranges, target, the
+      inference-time adjustments and zero rules the model relies on)
+    - hyperparameters, data file checksum and library versions
+    - test accuracy (MAE / RMSE / R2, raw and with the zero rules)
+    - training time, artifact and tree sizes, and predict latency
+      (sklearn and flat engines for forests, the model's own predict
+      otherwise) for 1 row, one 5-day forecast and 10k rows
+
+so speed is tracked per model version alongside accuracy. --deploy copies the
+artifact over models/<deployed file> (repackaging it if packed artifacts are in
+use), where running workers pick it up through reload_if_changed.
+Versions of every backend share models/versions/<plant_type>/.
+
+    python -m ml_pipeline.train_models --type all --n-jobs -1
+    python -m ml_pipeline.train_models --type wind --n-estimators 200 --deploy
+    python -m ml_pipeline.train_models --type wind --backend power_curve --deploy
+    python -m ml_pipeline.train_models --list
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ml_pipeline.backends import BACKENDS, DEFAULT_BACKEND, PowerCurve
+from ml_pipeline.model_registry import (MODELS_DIR, MODEL_FILES, BACKEND_FILES, packed_manifest,
+                                        _estimate_model_bytes, _write_artifact)
+from ml_pipeline.predict_hourly import SOLAR_FEATURES, WIND_FEATURES, zero_generation_mask
+from ml_pipeline.flat_forest import FlatForest
+
+VERSIONS_DIR = os.path.join(MODELS_DIR, 'versions')
+
+# Training data and hyperparameters, as used by the original notebooks
+TRAINING_DATA = {
+    'solar': {
+        'path': os.path.join(MODELS_DIR, 'Solar Model', 'Solar_final_data_trainig.csv'),
+        'features': SOLAR_FEATURES,
+        'target': 'SystemProduction',
+        'test_size': 0.3
+    },
+    'wind': {
+        'path': os.path.join(MODELS_DIR, 'Wind Model', 'cleaned_wind_data.csv'),
+        'features': WIND_FEATURES,
+        'target': 'actual_output_kW',
+        'test_size': 0.2,
+        # Manufacturer curve output at each row's wind speed, for 'power_curve'
+        'theoretical': 'theoretical_output_kW'
+    },
+}
+
+# What predict_hourly does around the model, recorded in the feature spec
+INFERENCE_NOTES = {
+    'solar': {
+        'scaling': "StandardScaler stored as bundle['scaler'], applied before the forest",
+        'adjustments': "Radiation minus the median Radiation of each forecast",
+        'zero_rule': "Sunshine == 0 and Radiation < 0 -> 0.0"
+    },
+    'wind': {
+        'scaling': "StandardScaler as the first Pipeline step",
+        'adjustments': "none",
+        'zero_rule': "wind_speed < 3 or wind_speed > 25 -> 0.0"
+    },
+}
+
+# What the alternative backends do instead of the forest's scaling
+BACKEND_NOTES = {
+    'hgb': "no scaling; HistGradientBoostingRegressor on the raw features",
+    'power_curve': "only wind_speed is used, interpolated on the fitted power curve",
+}
+
+# Batch sizes timed for the manifest: one row, one plant's 5-day forecast, a fleet
+LATENCY_ROWS = (1, 120, 10_000)
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _feature_spec(plant_type, X, target, backend=DEFAULT_BACKEND):
+    """
+    Ordered feature columns with the ranges seen in training
+    """
+    notes = dict(INFERENCE_NOTES[plant_type])
+    if backend != DEFAULT_BACKEND:
+        notes['scaling'] = BACKEND_NOTES[backend]
+
+    return {
+        'features': [
+            {
+                'name': column,
+                'dtype': str(X[column].dtype),
+                'min': float(X[column].min()),
+                'max': float(X[column].max()),
+                'mean': float(X[column].mean())
+            }
+            for column in X.columns
+        ],
+        'target': target,
+        **notes
+    }
+
+def _fit(plant_type, X_train, y_train, n_estimators, max_depth, n_jobs, random_state, backend=DEFAULT_BACKEND,
+         theoretical_train=None):
+    """
+    Fit the scaler + forest in the deployed layout: a {'scaler', 'model'}
+    bundle for solar, a scaler + forest Pipeline for wind. Alternative
+    backends are a single estimator on the raw features.
+
+    Returns:
+        The fitted artifact
+    """
+    if backend == 'hgb':
+        model = HistGradientBoostingRegressor(max_iter=n_estimators, max_depth=max_depth, random_state=random_state)
+        return model.fit(X_train, y_train)
+    if backend == 'power_curve':
+        return PowerCurve.fit(X_train['wind_speed'], theoretical_train, y_train)
+
+    forest = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, n_jobs=n_jobs,
+                                   random_state=random_state)
+    if plant_type == 'solar':
+        scaler = StandardScaler()
+        forest.fit(scaler.fit_transform(X_train), y_train)
+        return {'scaler': scaler, 'model': forest}
+
+    pipeline = Pipeline([('scaler', StandardScaler()), ('rf', forest)])
+    pipeline.fit(X_train, y_train)
+    return pipeline
+
+def _estimator(artifact):
+    """
+    The estimator predict_hourly calls: the solar bundle's forest or the wind pipeline
+    """
+    return artifact['model'] if isinstance(artifact, dict) else artifact
+
+def _forest(artifact):
+    estimator = _estimator(artifact)
+    return estimator.steps[-1][1] if hasattr(estimator, 'steps') else estimator
+
+def _estimator_and_inputs(artifact, X):
+    """
+    The estimator predict_hourly calls and the input it passes for raw features X
+    """
+    if isinstance(artifact, dict):
+        return artifact['model'], artifact['scaler'].transform(X)
+    return artifact, X
+
+def _accuracy(plant_type, artifact, X_test, y_test):
+    estimator, inputs = _estimator_and_inputs(artifact, X_test)
+    raw = estimator.predict(inputs)
+    ruled = np.where(zero_generation_mask(X_test, plant_type), 0.0, raw)
+
+    metrics = {}
+    for name, predicted in (('raw', raw), ('with_zero_rule', ruled)):
+        metrics[name] = {
+            'mae': float(mean_absolute_error(y_test, predicted)),
+            'rmse': float(np.sqrt(mean_squared_error(y_test, predicted))),
+            'r2': float(r2_score(y_test, predicted)),
+            'bias': float(np.mean(predicted - y_test))
+        }
+    return metrics
+
+def _latency(artifact, X, repeats=5):
+    """
+    Best-of-repeats predict latency in milliseconds per batch size and engine,
+    scaling included (as in _predict_frame). Forests are timed with both
+    engines ('sklearn_ms', 'flat_ms'), other models with their predict ('predict_ms').
+    """
+    estimator = _estimator(artifact)
+    flat = FlatForest.from_model(estimator) if hasattr(_forest(artifact), 'estimators_') else None
+    scaler = artifact['scaler'] if isinstance(artifact, dict) else None
+
+    def best_ms(predict, batch):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict(scaler.transform(batch) if scaler is not None else batch)
+            best = min(best, time.perf_counter() - start)
+        return round(best * 1000, 3)
+
+    latency = {}
+    for rows in LATENCY_ROWS:
+        batch = X.iloc[np.arange(rows) % len(X)]
+        if flat is None:
+            latency[str(rows)] = {'predict_ms': best_ms(estimator.predict, batch)}
+            continue
+        latency[str(rows)] = {
+            'sklearn_ms': best_ms(estimator.predict, batch),
+            'flat_ms': best_ms(flat.predict, batch)
+        }
+    return latency
+
+def _predict_ms(timing):
+    # Forests report both engines; the sklearn one is what 'rf' uses by default
+    return timing.get('sklearn_ms', timing.get('predict_ms'))
+
+def _tree_stats(artifact):
+    model = _forest(artifact)
+    if isinstance(model, PowerCurve):
+        return {'trees': 0, 'nodes': len(model), 'max_depth': 0, 'tree_bytes': model.nbytes}
+    if hasattr(model, '_predictors'):
+        predictors = [predictor for iteration in model._predictors for predictor in iteration]
+        return {
+            'trees': len(predictors),
+            'nodes': int(sum(len(predictor.nodes) for predictor in predictors)),
+            'max_depth': int(max(predictor.get_max_depth() for predictor in predictors)),
+            'tree_bytes': _estimate_model_bytes(model)
+        }
+
+    trees = [tree.tree_ for tree in model.estimators_]
+    return {
+        'trees': len(trees),
+        'nodes': int(sum(tree.node_count for tree in trees)),
+        'max_depth': int(max(tree.max_depth for tree in trees)),
+        'tree_bytes': _estimate_model_bytes(_estimator(artifact))
+    }
+
+def train_model(plant_type, n_estimators=100, max_depth=None, n_jobs=-1, random_state=42, test_size=None,
+                data_path=None, version=None, predict_n_jobs=None, backend=DEFAULT_BACKEND):
+    """
+    Train, evaluate and save one versioned model
+
+    Args:
+        plant_type (str): 'solar' or 'wind'
+        n_estimators, max_depth: Forest hyperparameters (n_estimators is the
+            number of boosting iterations for 'hgb')
+        n_jobs (int): Threads used to fit the forest (-1 for all cores)
+        random_state (int): Seed for the split and the forest, for reproducible runs
+        test_size (float, optional): Held-out share, defaults to the notebook's
+        data_path (str, optional): Training CSV, defaults to the bundled one
+        version (str, optional): Version id, defaults to a UTC timestamp
+        predict_n_jobs (int, optional): n_jobs stored in the saved forest for
+            prediction (None = single-threaded, like one request per worker)
+        backend (str): Model backend to train, see ml_pipeline.backends
+
+    Returns:
+        dict: The version manifest (also written next to the artifact)
+    """
+    if plant_type not in TRAINING_DATA:
+        raise ValueError(f"Unknown plant type: {plant_type}")
+    if backend not in BACKENDS[plant_type]:
+        raise ValueError(f"Unknown {plant_type} model backend: {backend}")
+
+    spec = TRAINING_DATA[plant_type]
+    artifact_file = MODEL_FILES[plant_type] if backend == DEFAULT_BACKEND else BACKEND_FILES[f"{plant_type}/{backend}"]
+    data_path = data_path or spec['path']
+    version = version or datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    test_size = spec['test_size'] if test_size is None else test_size
+
+    df = pd.read_csv(data_path)
+    X = df[spec['features']]
+    y = df[spec['target']].to_numpy(dtype=np.float64)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+    theoretical_train = None
+    if backend == 'power_curve':
+        theoretical_train = df.loc[X_train.index, spec['theoretical']].to_numpy(dtype=np.float64)
+
+    print(f"Training {plant_type} {backend} model {version} on {len(X_train)} rows "
+          f"({n_estimators} trees, max_depth={max_depth}, n_jobs={n_jobs})")
+    start = time.perf_counter()
+    artifact = _fit(plant_type, X_train, y_train, n_estimators, max_depth, n_jobs, random_state, backend,
+                    theoretical_train)
+    training_seconds = time.perf_counter() - start
+
+    if backend == DEFAULT_BACKEND:
+        _forest(artifact).set_params(n_jobs=predict_n_jobs)
+
+    version_dir = os.path.join(VERSIONS_DIR, plant_type, version)
+    os.makedirs(version_dir, exist_ok=True)
+    artifact_path = os.path.join(version_dir, artifact_file)
+    _write_artifact(artifact, artifact_path)
+
+    manifest = {
+        'plant_type': plant_type,
+        'version': version,
+        'backend': backend,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'artifact': artifact_file,
+        'data': {
+            'path': os.path.relpath(data_path, MODELS_DIR),
+            'sha256': _sha256(data_path),
+            'rows': len(df),
+            'train_rows': len(X_train),
+            'test_rows': len(X_test)
+        },
+        'feature_spec': _feature_spec(plant_type, X, spec['target'], backend),
+        'params': {
+            'n_estimators': n_estimators,
+            'max_depth': max_depth,
+            'random_state': random_state,
+            'test_size': test_size,
+            'fit_n_jobs': n_jobs,
+            'predict_n_jobs': predict_n_jobs
+        },
+        'accuracy': _accuracy(plant_type, artifact, X_test, y_test),
+        'training_seconds': round(training_seconds, 3),
+        'size': {'artifact_bytes': os.path.getsize(artifact_path), **_tree_stats(artifact)},
+        'predict_latency': _latency(artifact, X_test),
+        'environment': {
+            'python': platform.python_version(),
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'cpus': os.cpu_count()
+        }
+    }
+    with open(os.path.join(version_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    accuracy = manifest['accuracy']['with_zero_rule']
+    latency = manifest['predict_latency']['120']
+    flat = f" (flat {latency['flat_ms']:.2f} ms)" if 'flat_ms' in latency else ""
+    print(f"Trained {plant_type} {backend} model {version} in {training_seconds:.2f}s: MAE {accuracy['mae']:.2f}, "
+          f"R2 {accuracy['r2']:.4f}, {manifest['size']['artifact_bytes'] / 1e6:.1f} MB, "
+          f"120-row predict {_predict_ms(latency):.2f} ms{flat} -> {version_dir}")
+
+    return manifest
+
+def deploy_version(plant_type, version):
+    """
+    Copy a trained version over the deployed artifact of its backend (and
+    repackage a forest when packed artifacts are in use). Workers reload it
+    via reload_if_changed.
+    """
+    version_dir = os.path.join(VERSIONS_DIR, plant_type, version)
+    try:
+        with open(os.path.join(version_dir, 'manifest.json')) as f:
+            artifact_file = json.load(f).get('artifact', MODEL_FILES[plant_type])
+    except (OSError, ValueError):
+        artifact_file = MODEL_FILES[plant_type]
+
+    source = os.path.join(version_dir, artifact_file)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"No {plant_type} model version {version} in {VERSIONS_DIR}")
+
+    target = os.path.join(MODELS_DIR, artifact_file)
+    temp_path = f"{target}.tmp-{os.getpid()}"
+    shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+    print(f"Deployed {plant_type} model {version} to {target}")
+
+    if artifact_file == MODEL_FILES[plant_type] and packed_manifest(plant_type) is not None:
+        from ml_pipeline.package_models import package_model
+        package_model(plant_type)
+
+def list_versions(plant_type):
+    """
+    Manifests of every trained version of a plant type, oldest first
+    """
+    directory = os.path.join(VERSIONS_DIR, plant_type)
+    if not os.path.isdir(directory):
+        return []
+
+    manifests = []
+    for version in sorted(os.listdir(directory)):
+        try:
+            with open(os.path.join(directory, version, 'manifest.json')) as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return manifests
+
+def _print_versions(plant_type):
+    print(f"\n{plant_type} model versions:")
+    print(f"{'version':<17}{'backend':>12}{'trees':>6}{'depth':>6}{'MAE':>10}{'R2':>8}{'train s':>9}{'MB':>7}"
+          f"{'1 row ms':>10}{'120 ms':>8}{'10k ms':>8}{'flat 120 ms':>12}")
+    for manifest in list_versions(plant_type):
+        accuracy = manifest['accuracy']['with_zero_rule']
+        latency = manifest['predict_latency']
+        size = manifest['size']
+        flat = latency['120'].get('flat_ms')
+        print(f"{manifest['version']:<17}{manifest.get('backend', DEFAULT_BACKEND):>12}{size['trees']:>6}"
+              f"{size['max_depth']:>6}{accuracy['mae']:>10.2f}{accuracy['r2']:>8.4f}"
+              f"{manifest['training_seconds']:>9.2f}{size['artifact_bytes'] / 1e6:>7.1f}"
+              f"{_predict_ms(latency['1']):>10.2f}{_predict_ms(latency['120']):>8.2f}"
+              f"{_predict_ms(latency['10000']):>8.2f}" + (f"{flat:>12.2f}" if flat is not None else f"{'-':>12}"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--type', dest='plant_type', choices=sorted(TRAINING_DATA) + ['all'], default='all')
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=sorted(BACKENDS['wind']),
+                        help="Model backend to train (power_curve is wind only)")
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--predict-n-jobs', type=int, default=None)
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--test-size', type=float, default=None)
+    parser.add_argument('--data', default=None, help="Training CSV (only with a single --type)")
+    parser.add_argument('--version', default=None)
+    parser.add_argument('--deploy', action='store_true', help="Deploy the trained version")
+    parser.add_argument('--list', action='store_true', help="List trained versions and exit")
+    args = parser.parse_args()
+
+    plant_types = sorted(TRAINING_DATA) if args.plant_type == 'all' else [args.plant_type]
+
+    if args.list:
+        for plant_type in plant_types:
+            _print_versions(plant_type)
+        return
+
+    if args.data and len(plant_types) > 1:
+        parser.error("--data needs a single --type")
+    if any(args.backend not in BACKENDS[plant_type] for plant_type in plant_types):
+        parser.error(f"--backend {args.backend} is not available for --type {args.plant_type}")
+
+    for plant_type in plant_types:
+        manifest = train_model(plant_type, args.n_estimators, args.max_depth, args.n_jobs, args.random_state,
+                               args.test_size, args.data, args.version, args.predict_n_jobs, args.backend)
+        if args.deploy:
+            deploy_version(plant_type, manifest['version'])
+
+if __name__ == "__main__":
+    main()
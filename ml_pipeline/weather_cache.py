@@ -0,0 +1,286 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import datetime
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Open-Meteo refreshes its forecasts roughly hourly, so an hour-old forecast
+# is as good as a new one
+DEFAULT_TTL_SECONDS = 3600
+
+# Coordinates are rounded to this many degrees. 0.01° (~1 km) is finer than
+# any of the forecast model grids, so nearby plants share one cache entry.
+DEFAULT_GRID_DEGREES = 0.01
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Each process deletes expired disk entries at most this often, on write
+DISK_PRUNE_INTERVAL_SECONDS = 300
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_last_prune = [0.0]
+
+_stats = {
+    'memory_hits': 0,
+    'disk_hits': 0,
+    'misses': 0,
+    'expired': 0,
+    'stores': 0,
+    'invalidations': 0,
+    'pruned': 0
+}
+
+def _ttl_seconds():
+    return float(os.environ.get('WEATHER_CACHE_TTL', DEFAULT_TTL_SECONDS))
+
+def _max_entries():
+    return int(os.environ.get('WEATHER_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+
+def _cache_dir():
+    # Optional on-disk tier shared by all gunicorn workers on the host. Entries
+    # are JSON, never unpickled, so a writable shared directory cannot inject code.
+    return os.environ.get('WEATHER_CACHE_DIR') or None
+
+def round_coordinates(latitude, longitude):
+    """
+    Round coordinates to the cache grid
+
+    Returns:
+        tuple: (latitude, longitude) rounded to the grid
+    """
+    grid = float(os.environ.get('WEATHER_CACHE_GRID', DEFAULT_GRID_DEGREES))
+    # Round again to the grid's own precision to strip float noise (0.07 * 100 = 7.000000000000001)
+    decimals = len(repr(grid).split('.')[1]) if '.' in repr(grid) else 0
+
+    return (round(round(latitude / grid) * grid, decimals),
+            round(round(longitude / grid) * grid, decimals))
+
+def cache_key(latitude, longitude, forecast_days, variables):
+    """
+    Build the cache key for a forecast request
+
+    Args:
+        latitude (float): Latitude (already rounded to the grid)
+        longitude (float): Longitude (already rounded to the grid)
+        forecast_days (int): Number of forecast days
+        variables (list): Hourly variables requested from the API
+
+    Returns:
+        tuple: Hashable cache key
+    """
+    return (latitude, longitude, int(forecast_days), ','.join(sorted(variables)))
+
+def _disk_path(key):
+    latitude, longitude, forecast_days, variables = key
+    digest = hashlib.sha1(variables.encode()).hexdigest()[:12]
+    return os.path.join(_cache_dir(), f"{latitude}_{longitude}_{forecast_days}_{digest}.json")
+
+def _read_disk(key):
+    """
+    Read a disk entry back into {'stored_at', 'value'}, restoring the frame's
+    dtypes, datetime.date columns and attrs
+    """
+    try:
+        with open(_disk_path(key)) as f:
+            payload = json.load(f)
+        frame = pd.DataFrame(payload['columns'], index=payload['index'])
+        for column, dtype in payload['dtypes'].items():
+            if dtype.startswith('datetime64'):
+                frame[column] = pd.to_datetime(frame[column], unit='ns').astype(dtype)
+            else:
+                frame[column] = frame[column].astype(dtype)
+        for column in payload['date_columns']:
+            frame[column] = frame[column].map(datetime.date.fromisoformat)
+        frame.attrs.update(payload['attrs'])
+        return {'stored_at': payload['stored_at'], 'value': frame}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _write_disk(key, entry):
+    """
+    Write an entry whose value is a DataFrame (the forecast frames
+    fetch_weather caches) as JSON: a list of values per column, timestamps
+    as integer nanoseconds and datetime.date values as ISO strings
+    """
+    cache_dir = _cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    frame = entry['value']
+    date_columns = [column for column in frame.columns
+                    if frame[column].dtype == object and len(frame)
+                    and type(frame[column].iloc[0]) is datetime.date]
+    columns = {}
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype.kind == 'M':
+            values = values.astype('datetime64[ns]').astype('int64')
+        elif column in date_columns:
+            values = values.map(datetime.date.isoformat)
+        columns[column] = values.tolist()
+    payload = {
+        'stored_at': entry['stored_at'],
+        'attrs': frame.attrs,
+        'dtypes': {column: str(dtype) for column, dtype in frame.dtypes.items() if dtype != object},
+        'date_columns': date_columns,
+        'index': frame.index.tolist(),
+        'columns': columns
+    }
+
+    # Write to a temp file and rename so other workers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, _disk_path(key))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def prune_disk():
+    """
+    Delete expired disk entries, temp files left by interrupted writes and
+    entries in the pickle format of earlier versions
+
+    Returns:
+        int: Number of files deleted
+    """
+    cache_dir = _cache_dir()
+    if not cache_dir:
+        return 0
+
+    cutoff = time.time() - _ttl_seconds()
+    removed = 0
+    for path in glob.glob(os.path.join(cache_dir, '*')):
+        if not path.endswith(('.json', '.tmp', '.pkl')):
+            continue
+        try:
+            if path.endswith('.pkl') or os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+
+    with _lock:
+        _stats['pruned'] += removed
+    return removed
+
+def _store_memory(key, entry):
+    _memory[key] = entry
+    _memory.move_to_end(key)
+    while len(_memory) > _max_entries():
+        _memory.popitem(last=False)
+
+def get(key):
+    """
+    Look up a cached value, checking memory first and then the shared disk tier
+
+    Returns:
+        object: The cached value, or None on a miss or expired entry
+    """
+    now = time.time()
+    ttl = _ttl_seconds()
+
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if now - entry['stored_at'] < ttl:
+                _memory.move_to_end(key)
+                _stats['memory_hits'] += 1
+                return entry['value']
+            del _memory[key]
+            _stats['expired'] += 1
+
+    if _cache_dir():
+        entry = _read_disk(key)
+        if entry is not None and now - entry['stored_at'] < ttl:
+            with _lock:
+                _store_memory(key, entry)
+                _stats['disk_hits'] += 1
+            return entry['value']
+
+    with _lock:
+        _stats['misses'] += 1
+    return None
+
+def put(key, value):
+    """
+    Store a value in the memory tier and, when configured, the disk tier
+    """
+    entry = {'stored_at': time.time(), 'value': value}
+
+    with _lock:
+        _store_memory(key, entry)
+        _stats['stores'] += 1
+
+    if _cache_dir():
+        try:
+            _write_disk(key, entry)
+        except Exception as e:
+            print(f"Could not write weather cache entry to disk: {str(e)}")
+
+        if entry['stored_at'] - _last_prune[0] >= DISK_PRUNE_INTERVAL_SECONDS:
+            _last_prune[0] = entry['stored_at']
+            prune_disk()
+
+def invalidate(latitude=None, longitude=None):
+    """
+    Drop cached forecasts, either for one location or everything
+
+    Args:
+        latitude (float, optional): Latitude of the location to drop
+        longitude (float, optional): Longitude of the location to drop
+
+    Returns:
+        int: Number of memory entries removed
+    """
+    if latitude is not None and longitude is not None:
+        latitude, longitude = round_coordinates(latitude, longitude)
+
+        def matches(key):
+            return key[0] == latitude and key[1] == longitude
+        disk_pattern = f"{latitude}_{longitude}_*.json"
+    else:
+        def matches(key):
+            return True
+        disk_pattern = "*.json"
+
+    with _lock:
+        keys = [key for key in _memory if matches(key)]
+        for key in keys:
+            del _memory[key]
+        _stats['invalidations'] += 1
+
+    if _cache_dir():
+        for path in glob.glob(os.path.join(_cache_dir(), disk_pattern)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    return len(keys)
+
+def cache_stats():
+    """
+    Return hit/miss counters and the current size of the memory tier
+
+    Returns:
+        dict: Cache statistics
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['memory_entries'] = len(_memory)
+
+    lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+    stats['hit_ratio'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+    stats['ttl_seconds'] = _ttl_seconds()
+    stats['disk_dir'] = _cache_dir()
+
+    return stats
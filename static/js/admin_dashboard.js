@@ -1062,6 +1062,25 @@ function renderWindHourlyChart(data) {
     }
 }
 
+// Queue a forecast refresh job and wait for it, showing progress on the button
+function queueRefresh(url, button) {
+    return fetch(url, { method: 'POST' })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message);
+            }
+            return waitForJob(data.status_url, job => {
+                button.lastChild.textContent = ' ' + jobProgressLabel(job);
+            });
+        });
+}
+
 // Initialize refresh button
 function initRefreshButton() {
     const refreshBtn = document.getElementById('refreshData');
@@ -1072,13 +1091,10 @@ function initRefreshButton() {
             this.innerHTML = '<svg class="animate-spin -ml-1 mr-2 h-5 w-5 text-white" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path></svg> Refreshing...';
             
             // Call API to refresh forecasts
-            fetch('/api/update_forecasts')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error('Network response was not ok');
-                    }
+            queueRefresh('/api/refresh_forecasts', this)
+                .then(() => {
                     console.log('Forecast update successful, reloading page');
-                    // Reload the page regardless of the response to get fresh data
+                    // Reload the page to get fresh data
                     window.location.reload();
                 })
                 .catch(error => {
@@ -1098,11 +1114,8 @@ function initRefreshButton() {
             const originalText = this.innerHTML;
             this.innerHTML = '<svg class="animate-spin -ml-1 mr-2 h-4 w-4 text-white" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path></svg> Refreshing...';
             
-            fetch('/api/update_solar_forecasts')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error('Network response was not ok');
-                    }
+            queueRefresh('/api/refresh_forecasts?type=solar', this)
+                .then(() => {
                     console.log('Solar forecast update successful, reloading page');
                     window.location.reload();
                 })
@@ -1123,11 +1136,8 @@ function initRefreshButton() {
             const originalText = this.innerHTML;
             this.innerHTML = '<svg class="animate-spin -ml-1 mr-2 h-4 w-4 text-white" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path></svg> Refreshing...';
             
-            fetch('/api/update_wind_forecasts')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error('Network response was not ok');
-                    }
+            queueRefresh('/api/refresh_forecasts?type=wind', this)
+                .then(() => {
                     console.log('Wind forecast update successful, reloading page');
                     window.location.reload();
                 })
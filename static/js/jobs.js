@@ -0,0 +1,36 @@
+// Poll a background job until it finishes.
+// Resolves with the job on success, rejects with an Error on failure.
+function waitForJob(statusUrl, onProgress, intervalMs = 1500) {
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch(statusUrl)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        throw new Error(data.message || 'Job not found');
+                    }
+                    const job = data.job;
+                    if (onProgress) {
+                        onProgress(job);
+                    }
+                    if (job.status === 'succeeded') {
+                        resolve(job);
+                    } else if (job.status === 'failed') {
+                        reject(new Error(job.error || 'Job failed'));
+                    } else {
+                        setTimeout(poll, intervalMs);
+                    }
+                })
+                .catch(reject);
+        };
+        poll();
+    });
+}
+
+// Label shown on a refresh button while its job is queued or running
+function jobProgressLabel(job) {
+    if (job.status === 'queued') {
+        return 'Queued...';
+    }
+    return `Refreshing... ${Math.round((job.progress || 0) * 100)}%`;
+}
@@ -573,6 +573,17 @@ document.addEventListener('DOMContentLoaded', function () {
             // Call the API to refresh data
             fetch(`/api/refresh-solar-data`)
                 .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        return data;
+                    }
+                    // The refresh runs as a background job; wait for it to finish
+                    return waitForJob(data.status_url, job => {
+                        this.lastChild.textContent = ' ' + jobProgressLabel(job);
+                    })
+                        .then(() => data)
+                        .catch(error => ({ success: false, message: error.message }));
+                })
                 .then(data => {
                     if (data.success) {
                         // Reload the page to show fresh data
@@ -0,0 +1,62 @@
+"""
+Chart response cache (ml_pipeline.response_cache) on a Flask endpoint with
+the login and plant-type checks of app.py's chart APIs
+"""
+import pytest
+from flask import Flask, jsonify, request
+from flask_login import LoginManager, UserMixin, current_user, login_required
+
+from ml_pipeline import response_cache
+
+class User(UserMixin):
+    def __init__(self, id, plant_type, role='user'):
+        self.id = id
+        self.plant_type = plant_type
+        self.role = role
+
+USERS = {'1': User(1, 'solar'), '2': User(2, 'wind')}
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('RESPONSE_CACHE_VERSION_DIR', str(tmp_path))
+    monkeypatch.setattr(response_cache, '_memory', response_cache.OrderedDict())
+
+    app = Flask(__name__)
+    login_manager = LoginManager(app)
+
+    @login_manager.request_loader
+    def load_user(request):
+        return USERS.get(request.headers.get('X-User'))
+
+    def cache_key():
+        return (request.endpoint, request.args.get('plant_id'), current_user.role)
+
+    @app.route('/api/solar_chart_data')
+    @login_required
+    @response_cache.cached_response('solar', cache_key)
+    def solar_chart_data():
+        if current_user.plant_type != 'solar' and current_user.role != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+        return jsonify({'plant_id': request.args.get('plant_id'), 'predictions': [1.0, 2.0]})
+
+    return app.test_client()
+
+def get(client, user):
+    return client.get('/api/solar_chart_data?plant_id=7', headers={'X-User': user})
+
+def test_cache_hit_for_same_user(client):
+    first = get(client, '1')
+    second = get(client, '1')
+
+    assert first.status_code == second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert response_cache.cache_stats()['entries'] == 1
+
+def test_forbidden_with_warm_cache(client):
+    assert get(client, '1').status_code == 200
+
+    # Another user's entry for the same plant must not bypass the view's check
+    response = get(client, '2')
+
+    assert response.status_code == 403
+    assert response.get_json() == {'error': 'Unauthorized'}